@@ -4,7 +4,7 @@ from ..helpers.qt_helper import QtHelper
 from ..helpers.file_filter import FileFilter
 from ..helpers.simple_dialogs import textinput_dialog
 from .path_bar import PathBar
-from lib import AppPaths, PathExt, Settings, is_ext_supported_file, is_ext_supported_archive, find_files_in_archive, natural_sort_key, get_callstack_str, FileConfig
+from lib import AppPaths, PathExt, Settings, SParamFile, is_ext_supported_file, is_ext_supported_archive, is_ext_sweepable, find_files_in_archive, natural_sort_key, get_callstack_str, FileConfig
 
 from PyQt6 import QtCore, QtGui, QtWidgets
 from PyQt6.QtCore import *
@@ -53,8 +53,9 @@ class FilesysBrowser(QWidget):
             self._is_toplevel = is_toplevel
             self._filter: FileFilter = filter
             
-            # assume any directory or archive has children; this allows us to postpone the directory scan to as late as possible
-            self._has_children = type in [FilesysBrowserItemType.Dir, FilesysBrowserItemType.Arch]
+            # assume any directory, archive, CITI file or bundle has children (CITI files may contain a sweep, and bundles many networks, which are shown as children);
+            #   this allows us to postpone the directory scan to as late as possible
+            self._has_children = type in [FilesysBrowserItemType.Dir, FilesysBrowserItemType.Arch] or self._is_sweepable()
             self._first_file: PathExt|None = None
             self._children_added = False
             
@@ -78,9 +79,16 @@ class FilesysBrowser(QWidget):
                 return '[...]'
             elif FileConfig.labels[self._path] is not None:
                 return FileConfig.labels[self._path] + f' ({self._path.final_name})'
+            elif self._path.is_sweep():
+                return self._path.sweep  # the parent item already shows the file name
             else:
                 return self._path.final_name
         
+        def _is_sweepable(self) -> bool:
+            if self._type != FilesysBrowserItemType.File or self._path.is_sweep():
+                return False
+            return bool(is_ext_sweepable(self._path.arch_path_suffix if self._path.is_in_arch() else self._path.suffix))
+        
         def refresh_name(self):
             super().setText(self._get_name())
 
@@ -115,19 +123,69 @@ class FilesysBrowser(QWidget):
                 return False
             self._children_added = True
             
-            if self._type == FilesysBrowserItemType.File or self._type == FilesysBrowserItemType.Elision:
+            if (self._type == FilesysBrowserItemType.File and not self._is_sweepable()) or self._type == FilesysBrowserItemType.Elision:
                 return False
 
+            for path,type in self._get_children(support_archives):
+                super().appendRow(self._make_row(path, type))
+            
+            return self._has_children
+        
+        def update_children(self, support_archives: bool) -> bool:
+            """ Adds and removes child rows, so that they match the directory/archive again; returns True if anything changed """
+            if not self._children_added:
+                return False
+            
+            desired = self._get_children(support_archives)
+            desired_keys = set(desired)
+            any_changed = False
+            
+            for row_index in reversed(range(super().rowCount())):
+                item = super().child(row_index, 0)
+                if not isinstance(item, FilesysBrowser.MyFileItem) or (item.path, item.type) not in desired_keys:
+                    super().removeRow(row_index)
+                    any_changed = True
+            
+            # the remaining rows are still in the desired order, so new rows only need to be inserted in the gaps
+            for row_index,(path,type) in enumerate(desired):
+                item = super().child(row_index, 0) if row_index < super().rowCount() else None
+                if item is None or (item.path, item.type) != (path, type):
+                    super().insertRow(row_index, self._make_row(path, type))
+                    any_changed = True
+            
+            return any_changed
+        
+        def _make_row(self, path: PathExt, type: FilesysBrowserItemType) -> list[QStandardItem]:
+            if type == FilesysBrowserItemType.File:
+                return [FilesysBrowser.MyFileItem(self._model, path, FilesysBrowserItemType.File), QStandardItem('')]
+            elif type == FilesysBrowserItemType.Elision:
+                return [FilesysBrowser.MyFileItem(self._model, path, FilesysBrowserItemType.Elision), QStandardItem('Some files were hidden by filtering')]
+            else:
+                return [FilesysBrowser.MyFileItem(self._model, path, type, filter=self._filter)]
+        
+        def _get_children(self, support_archives: bool) -> list[tuple[PathExt,FilesysBrowserItemType]]:
+            """ Returns the children to show, in the order they are shown """
             if self._type == FilesysBrowserItemType.Dir:
                 children = [PathExt(p) for p in self._path.iterdir()]
             elif self._type == FilesysBrowserItemType.Arch:
                 children = [p for p in find_files_in_archive(str(self._path)) if is_ext_supported_file(p.arch_path_suffix)] if support_archives else []
+            elif self._is_sweepable():
+                try:
+                    children = SParamFile.find_sweep(self._path)
+                except Exception as ex:
+                    logging.warning(f'Unable to read the sweep of <{self._path.full_path}> ({ex})')
+                    children = []
             else:
                 children = []
             
             self._has_children = len(children) > 0
+            self._first_file = None
+            result = []
 
-            if self._type == FilesysBrowserItemType.Arch:
+            if self._type == FilesysBrowserItemType.File:
+                # slices of a swept CITI file are always shown in the order of the file
+                result = [(path, FilesysBrowserItemType.File) for path in children]
+            elif self._type == FilesysBrowserItemType.Arch:
                 filtered_out_any = False
                 for path in children:
                     if not self._filter.matches(path):
@@ -135,9 +193,9 @@ class FilesysBrowser(QWidget):
                         continue
                     if self._first_file is None:
                         self._first_file = path
-                    super().appendRow((FilesysBrowser.MyFileItem(self._model, path, FilesysBrowserItemType.File), QStandardItem('')))
+                    result.append((path, FilesysBrowserItemType.File))
                 if filtered_out_any:
-                    super().appendRow((FilesysBrowser.MyFileItem(self._model, self._path, FilesysBrowserItemType.Elision), QStandardItem('Some files were hidden by filtering')))
+                    result.append((self._path, FilesysBrowserItemType.Elision))
             else:
                 dirs = [p for p in children if p.is_dir()]
                 files = [p for p in children if p.is_file()]
@@ -148,16 +206,16 @@ class FilesysBrowser(QWidget):
                         continue
                     if self._first_file is None:
                         self._first_file = file
-                    super().appendRow((FilesysBrowser.MyFileItem(self._model, file, FilesysBrowserItemType.File), QStandardItem('')))
+                    result.append((file, FilesysBrowserItemType.File))
                 if filtered_out_any:
-                    super().appendRow((FilesysBrowser.MyFileItem(self._model, self._path, FilesysBrowserItemType.Elision), QStandardItem('Some files were hidden by filtering')))
+                    result.append((self._path, FilesysBrowserItemType.Elision))
                 if support_archives:
                     for arch in sorted([p for p in files if is_ext_supported_archive(p.suffix)], key=lambda p: natural_sort_key(p.final_name)):
-                        super().appendRow(FilesysBrowser.MyFileItem(self._model, arch, FilesysBrowserItemType.Arch, filter=self._filter))
+                        result.append((arch, FilesysBrowserItemType.Arch))
                 for dir in sorted(dirs, key=lambda p: natural_sort_key(p.final_name)):
-                    super().appendRow(FilesysBrowser.MyFileItem(self._model, dir, FilesysBrowserItemType.Dir, filter=self._filter))
+                    result.append((dir, FilesysBrowserItemType.Dir))
             
-            return self._has_children
+            return result
                 
         @override
         def hasChildren(self) -> bool:
@@ -403,6 +461,7 @@ class FilesysBrowser(QWidget):
                     if not do_select:
                         # de-select, otherwise the next multi-selection that the user does might behave in an unexpected way
                         self._ui_filesys_view.selectionModel().select(item.index(), QItemSelectionModel.SelectionFlag.Deselect | QItemSelectionModel.SelectionFlag.Rows)
+                    recurse(item)  # slices of a swept CITI file
                 else:
                     if item.path in selected_paths:
                         # request to select a dir/arch -> try to select 1st file instead
@@ -618,6 +677,55 @@ class FilesysBrowser(QWidget):
         self.selectionChanged.emit()  # trigger a re-draw
 
 
+    @property
+    def watched_paths(self) -> list[PathExt]:
+        """ All directories and archives whose contents are currently shown """
+        result = []
+        def recurse(parent: FilesysBrowser.MyFileItem):
+            for row_index in range(parent.rowCount()):
+                item = parent.child(row_index, 0)
+                if not isinstance(item, FilesysBrowser.MyFileItem):
+                    continue
+                if item.type in [FilesysBrowserItemType.Dir, FilesysBrowserItemType.Arch] and item._children_added:
+                    result.append(item.path)
+                    recurse(item)
+        recurse(self._ui_filesys_model.invisibleRootItem())
+        return result
+
+
+    def update_directory(self, path: PathExt):
+        """ Updates the children of a directory, archive or swept CITI file, without touching the rest of the tree """
+        items = []
+        def recurse(parent: FilesysBrowser.MyFileItem):
+            for row_index in range(parent.rowCount()):
+                item = parent.child(row_index, 0)
+                if not isinstance(item, FilesysBrowser.MyFileItem):
+                    continue
+                if item.type in [FilesysBrowserItemType.Dir, FilesysBrowserItemType.Arch, FilesysBrowserItemType.File] and item.path == path:
+                    items.append(item)
+                recurse(item)
+        recurse(self._ui_filesys_model.invisibleRootItem())
+        if len(items) < 1:
+            return
+        
+        selected_before = set(self.selected_files)
+        any_changed = False
+        try:
+            self._inhibit_triggers = True
+            for item in items:
+                if item.update_children(self._show_archives):
+                    any_changed = True
+        finally:
+            self._inhibit_triggers = False
+        if not any_changed:
+            return
+        
+        self._ui_filesys_view.header().resizeSections(QHeaderView.ResizeMode.ResizeToContents)
+        self.filesChanged.emit()
+        if set(self.selected_files) != selected_before:
+            self.selectionChanged.emit()
+
+
     def refresh(self):
         # TODO: re-select previously selected items
 
@@ -0,0 +1,61 @@
+from lib import SParamFile, LoadHandle
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+
+class FileLoader(QObject):
+    """
+    Loads files with SParamFile.load_async(), so that the GUI thread does not have to wait, and loading can be cancelled.
+
+    The callbacks of the load handle are called from a background thread, so they are forwarded as signals; connected
+      slots in the GUI thread are called via the Qt event loop. <progressChanged> is emitted with (bytes parsed, total bytes),
+      <fileLoaded> after each file, and <finished> when all files are loaded, or loading was cancelled.
+    """
+
+
+    progressChanged = pyqtSignal(object, object)
+    fileLoaded = pyqtSignal(object)
+    finished = pyqtSignal()
+
+
+    def __init__(self, parent: QObject|None = None):
+        super().__init__(parent)
+        self._handle: LoadHandle|None = None
+        self._files: list[SParamFile] = []
+        self._reduced: dict|None = None
+
+
+    @property
+    def busy(self) -> bool:
+        return self._handle is not None and not self._handle.done
+
+
+    @property
+    def cancelled(self) -> bool:
+        """ Returns True if loading of the last files was cancelled """
+        return self._handle is not None and self._handle.cancelled
+
+
+    @property
+    def files(self) -> list[SParamFile]:
+        """ Returns the files that are being loaded """
+        return list(self._files) if self.busy else []
+
+
+    def load(self, files: list[SParamFile], reduced: dict|None = None):
+        """
+        Starts loading <files>, unless they are being loaded already; loading of other files is cancelled. If <reduced> is
+          given, only the reduced networks are prepared (see SParamFile.load_async()).
+        """
+        if self.busy and self._reduced == reduced and all(any(file is f for f in self._files) for file in files):
+            return
+        self.cancel()
+        self._files, self._reduced = list(files), reduced
+        self._handle = SParamFile.load_async(files, self.progressChanged.emit, self.fileLoaded.emit, reduced)
+        self._handle.add_done_callback(self.finished.emit)
+
+
+    def cancel(self):
+        if self._handle is not None:
+            self._handle.cancel()
@@ -0,0 +1,145 @@
+from lib import SParamFile, NetworkMemory
+
+import heapq
+import itertools
+import logging
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+
+class FilePreloader(QObject):
+    """
+    Loads files in a pool of background threads, so that the GUI thread does not have to wait for parsing.
+
+    Files are loaded in the order of their priority (lower value first), and in the order they were queued.
+      After each file is loaded, <fileLoaded> is emitted; since the signal is emitted from a worker thread,
+      connected slots in the GUI thread are called via the Qt event loop.
+
+    Each worker takes up to <batch_size> files at once and passes them to SParamFile.load_many(), which
+      parses large batches in a process pool.
+
+    Files that are only visible are not loaded any more once the memory budget for loaded networks is used up,
+      because they would just unload each other; selected files are always loaded, unless they are excluded (see exclude()).
+    """
+
+
+    PRIORITY_SELECTED = 0
+    PRIORITY_VISIBLE = 1
+
+    BATCH_SIZE = 32
+
+
+    fileLoaded = pyqtSignal(object)
+
+
+    def __init__(self, parent: QObject|None = None):
+        super().__init__(parent)
+        self._queue: list[tuple[int,int,SParamFile]] = []
+        self._queued_priorities: dict[int,int] = {}  # id(file) -> priority
+        self._excluded: set[int] = set()  # id(file)
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._stop = False
+        self._busy = 0
+        self._batch_size = 1
+
+
+    @property
+    def n_workers(self) -> int:
+        return len(self._threads)
+
+
+    @property
+    def idle(self) -> bool:
+        with self._condition:
+            return len(self._queued_priorities) == 0 and self._busy == 0
+
+
+    def start(self, n_workers: int, batch_size: int = BATCH_SIZE):
+        self.stop()
+        with self._condition:
+            self._stop = False
+            self._batch_size = max(1, batch_size)
+        for i in range(n_workers):
+            thread = threading.Thread(target=self._worker, name=f'FilePreloader-{i}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        logging.debug(f'Started file preloader with {n_workers} worker(s)')
+
+
+    def stop(self):
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+    def exclude(self, files: list[SParamFile]):
+        """ Files that must not be loaded (e.g. because only a reduced network is plotted), until exclude() is called again; they are dropped from the queue """
+        with self._condition:
+            self._excluded = set(id(file) for file in files)
+
+
+    def enqueue(self, files: list[SParamFile], priority: int = PRIORITY_VISIBLE):
+        """ Adds files to the queue; files that are already queued are re-queued, if the new priority is higher """
+        if len(self._threads) < 1:
+            return
+        with self._condition:
+            for file in files:
+                if file.loaded or file.error or id(file) in self._excluded:
+                    continue
+                if id(file) in self._queued_priorities and self._queued_priorities[id(file)] <= priority:
+                    continue
+                self._queued_priorities[id(file)] = priority
+                heapq.heappush(self._queue, (priority, next(self._counter), file))
+            self._condition.notify_all()
+
+
+    def clear(self):
+        """ Discards all files that are not yet being loaded """
+        with self._condition:
+            self._queue = []
+            self._queued_priorities = {}
+
+
+    def _worker(self):
+        while True:
+            batch: list[SParamFile] = []
+            batch_priority = FilePreloader.PRIORITY_VISIBLE
+            with self._condition:
+                while not self._stop and len(self._queue) == 0:
+                    self._condition.wait()
+                if self._stop:
+                    return
+                while len(self._queue) > 0 and len(batch) < self._batch_size:
+                    priority, _, file = heapq.heappop(self._queue)
+                    if self._queued_priorities.get(id(file)) != priority:
+                        continue  # outdated entry, the file was re-queued with a higher priority
+                    del self._queued_priorities[id(file)]
+                    if id(file) in self._excluded:
+                        continue
+                    batch.append(file)
+                    batch_priority = priority
+                    if priority != FilePreloader.PRIORITY_VISIBLE:
+                        break  # do not let high-priority files wait for a whole batch
+                self._busy += 1
+
+            try:
+                if batch_priority == FilePreloader.PRIORITY_VISIBLE and NetworkMemory.full:
+                    continue
+                try:
+                    if len(batch) == 1:
+                        batch[0].preload()
+                    else:
+                        SParamFile.load_many(batch, call_hooks=False)
+                except Exception as ex:
+                    logging.warning(f'Pre-loading {len(batch)} file(s) failed ({ex})')
+                for file in batch:
+                    self.fileLoaded.emit(file)
+            finally:
+                with self._condition:
+                    self._busy -= 1
@@ -0,0 +1,107 @@
+from lib import PathExt, is_ext_supported_file, is_ext_supported_archive
+
+import os
+import logging
+from typing import Callable
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+
+
+class FileWatcher(QObject):
+    """
+    Watches directories and archives for changes, by periodically comparing snapshots of their contents.
+
+    The paths to watch are queried from <get_paths> before every poll, so that only the currently expanded
+      directories and archives are scanned. When the listing of a directory changes (files added, removed or renamed),
+      <directoryChanged> is emitted for that directory; when files were modified in-place (including archives),
+      <filesModified> is emitted with all modified paths.
+
+    Polling is used instead of QFileSystemWatcher, because the latter does not report files that are overwritten
+      in-place on all platforms, and also cannot watch the contents of archives.
+    """
+
+
+    directoryChanged = pyqtSignal(PathExt)
+    filesModified = pyqtSignal(list)
+
+
+    def __init__(self, get_paths: Callable[[],list[PathExt]], parent: QObject|None = None):
+        super().__init__(parent)
+        self._get_paths = get_paths
+        self._snapshots: dict[PathExt,dict[str,tuple[int,int]]] = {}
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.poll)
+
+
+    @property
+    def active(self) -> bool:
+        return self._timer.isActive()
+
+
+    def start(self, interval_s: float):
+        """ Starts polling every <interval_s> seconds; zero stops polling """
+        self.stop()
+        if interval_s <= 0:
+            return
+        self._timer.start(int(interval_s * 1000))
+        logging.debug(f'Watching files every {interval_s} s')
+
+
+    def stop(self):
+        self._timer.stop()
+        self._snapshots = {}
+
+
+    @staticmethod
+    def _take_snapshot(path: PathExt) -> dict[str,tuple[int,int]]:
+        """ Returns {name: (size, mtime)} of all relevant entries of a directory, or of the archive itself """
+        if path.is_dir():
+            snapshot = {}
+            for entry in os.scandir(str(path)):
+                if entry.is_dir():
+                    snapshot[entry.name] = (-1, 0)
+                else:
+                    suffix = os.path.splitext(entry.name)[1]
+                    if is_ext_supported_file(suffix) or is_ext_supported_archive(suffix):
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+            return snapshot
+        else:
+            stat = os.stat(str(path))
+            return { '': (stat.st_size, stat.st_mtime_ns) }
+
+
+    def poll(self):
+        changed_dirs: list[PathExt] = []
+        modified_files: set[PathExt] = set()
+
+        paths = self._get_paths()
+        for path in list(self._snapshots.keys()):
+            if path not in paths:
+                del self._snapshots[path]
+
+        for path in paths:
+            try:
+                snapshot = FileWatcher._take_snapshot(path)
+            except Exception as ex:
+                logging.debug(f'Unable to watch <{path}> ({ex})')
+                self._snapshots.pop(path, None)
+                continue  # probably deleted; the parent directory will report that
+
+            previous = self._snapshots.get(path)
+            self._snapshots[path] = snapshot
+            if previous is None or previous == snapshot:
+                continue
+
+            if previous.keys() != snapshot.keys():
+                changed_dirs.append(path)
+            for name,stamp in snapshot.items():
+                if name in previous and previous[name] != stamp:
+                    modified_files.add(PathExt(os.path.join(str(path), name)) if name else path)
+
+        for path in changed_dirs:
+            logging.debug(f'Directory <{path}> has changed')
+            self.directoryChanged.emit(path)
+        if len(modified_files) > 0:
+            logging.debug(f'{len(modified_files)} file(s) have been modified')
+            self.filesModified.emit(sorted(modified_files))
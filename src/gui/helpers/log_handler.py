@@ -4,14 +4,21 @@ from lib.settings import Settings
 
 import dataclasses
 import logging
+import threading
 import time
 from typing import override, Callable
+from PyQt6.QtCore import QObject, pyqtSignal
 
 
 
 class LogHandler(logging.StreamHandler):
 
 
+    class _Relay(QObject):
+        """ Forwards notifications from worker threads to the main thread, because observers may update the GUI """
+        notify = pyqtSignal(object)
+
+
     @dataclasses.dataclass
     class Record:
         timestamp: float
@@ -30,6 +37,8 @@ class LogHandler(logging.StreamHandler):
         self._records: list[LogHandler.Record] = []
         self._observers: list[Callable[tuple[LogHandler.Record],None]] = []
         self._t_start = time.monotonic()
+        self._relay = LogHandler._Relay()
+        self._relay.notify.connect(self._notify_observers)
         super().__init__(logging.DEBUG)
     
 
@@ -68,6 +77,13 @@ class LogHandler(logging.StreamHandler):
 
 
     def _notify(self, record: LogHandler.Record|None = None):
+        if threading.current_thread() is threading.main_thread():
+            self._notify_observers(record)
+        else:
+            self._relay.notify.emit(record)
+
+
+    def _notify_observers(self, record: LogHandler.Record|None = None):
         for i in reversed(range(len(self._observers))):
             try:
                 self._observers[i](record)
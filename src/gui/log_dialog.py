@@ -1,7 +1,7 @@
 from .log_dialog_ui import LogDialogUi
 from .helpers.log_handler import LogHandler
-from .helpers.simple_dialogs import okcancel_dialog
-from lib import Settings, AppPaths
+from .helpers.simple_dialogs import okcancel_dialog, save_file_dialog, exception_dialog
+from lib import Settings, AppPaths, LoadStats, SiValue, CsvSeparator
 import logging
 
 
@@ -54,3 +54,49 @@ class LogDialog(LogDialogUi):
         if not okcancel_dialog('Clear Log', 'All log entries will be deleted.', detailed_text=f'You can still find the whole log in <{AppPaths.get_log_path()}>'):
             return
         LogHandler.inst().clear()
+
+
+    def on_tab_change(self):
+        if self.ui_stats_tab_active:
+            self.update_stats()
+
+
+    def on_refresh_stats(self):
+        self.update_stats()
+
+
+    def update_stats(self):
+        HEADERS = ['File', 'Total', 'Extract', 'Parse', 'Validate', 'Size', 'Points', 'Ports', 'Cache', 'Error']
+        def fmt_t(t: float) -> str:
+            return str(SiValue(t, 's'))
+        
+        records = LoadStats.query(order_by='t_total', descending=True)
+        rows = [[
+            record.path, fmt_t(record.t_total), fmt_t(record.t_extract), fmt_t(record.t_parse), fmt_t(record.t_validate),
+            str(SiValue(record.bytes_read, 'B')) if record.bytes_read > 0 else '',
+            f'{record.n_points:,.0f}' if record.n_points is not None else '',
+            str(record.n_ports) if record.n_ports is not None else '',
+            'hit' if record.cache_hit else 'miss',
+            record.error or '',
+        ] for record in records]
+        t_total = sum([record.t_total for record in records])
+        n_hits = sum([1 for record in records if record.cache_hit])
+        summary = f'{len(records)} file(s) loaded in {SiValue(t_total, "s")}, {n_hits} from the cache'
+        self.ui_set_stats(HEADERS, rows, summary)
+
+
+    def on_export_stats(self):
+        filename = save_file_dialog(self, title='Export Load Statistics', filetypes=(('CSV','.csv'), ('All Files','*')))
+        if not filename:
+            return
+        SEPARATORS = { CsvSeparator.Tab: '\t', CsvSeparator.Comma: ',', CsvSeparator.Semicolon: ';' }
+        try:
+            with open(filename, 'w', newline='') as fp:
+                fp.write(LoadStats.to_csv(separator=SEPARATORS[Settings.csv_separator]))
+        except Exception as ex:
+            exception_dialog('Export Failed', f'Unable to export load statistics to <{filename}>', detailed_text=str(ex))
+
+
+    def on_clear_stats(self):
+        LoadStats.clear()
+        self.update_stats()
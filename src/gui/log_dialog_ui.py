@@ -40,10 +40,36 @@ class LogDialogUi(QDialog):
         self._ui_clear_button = QPushButton('Clear Log')
         self._ui_clear_button.clicked.connect(self.on_clear)
 
-        self.setLayout(QtHelper.layout_v(
+        self._ui_stats_table = QTableWidget()
+        self._ui_stats_table.setMinimumSize(200, 100)
+        self._ui_stats_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self._ui_stats_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self._ui_stats_table.verticalHeader().setVisible(False)
+        self._ui_stats_label = QLabel()
+        self._ui_stats_refresh_button = QPushButton('Refresh')
+        self._ui_stats_refresh_button.clicked.connect(self.on_refresh_stats)
+        self._ui_stats_export_button = QPushButton('Export CSV...')
+        self._ui_stats_export_button.setToolTip('Save the load statistics of all files as a CSV file')
+        self._ui_stats_export_button.clicked.connect(self.on_export_stats)
+        self._ui_stats_clear_button = QPushButton('Clear Statistics')
+        self._ui_stats_clear_button.clicked.connect(self.on_clear_stats)
+
+        self._ui_tabs = QTabWidget()
+        log_widget = QWidget()
+        log_widget.setLayout(QtHelper.layout_v(
             self._ui_logtext,
             QtHelper.layout_h('Level:', self._ui_level_combo, self._ui_linewrap_check, ..., self._ui_clear_button)
         ))
+        self._ui_tabs.addTab(log_widget, 'Log')
+        stats_widget = QWidget()
+        stats_widget.setLayout(QtHelper.layout_v(
+            self._ui_stats_table,
+            QtHelper.layout_h(self._ui_stats_label, ..., self._ui_stats_refresh_button, self._ui_stats_export_button, self._ui_stats_clear_button)
+        ))
+        self._ui_tabs.addTab(stats_widget, 'Load Statistics')
+        self._ui_tabs.currentChanged.connect(self.on_tab_change)
+
+        self.setLayout(QtHelper.layout_v(self._ui_tabs))
 
         self.resize(800, 600)
     
@@ -69,6 +95,23 @@ class LogDialogUi(QDialog):
         self._ui_logtext.setPlainText(text)
     
 
+    @property
+    def ui_stats_tab_active(self) -> bool:
+        return self._ui_tabs.currentIndex() == 1
+
+
+    def ui_set_stats(self, headers: list[str], rows: list[list[str]], summary: str):
+        self._ui_stats_table.clear()
+        self._ui_stats_table.setColumnCount(len(headers))
+        self._ui_stats_table.setRowCount(len(rows))
+        self._ui_stats_table.setHorizontalHeaderLabels(headers)
+        for i,row in enumerate(rows):
+            for j,text in enumerate(row):
+                self._ui_stats_table.setItem(i, j, QTableWidgetItem(text))
+        self._ui_stats_table.resizeColumnsToContents()
+        self._ui_stats_label.setText(summary)
+    
+
     def _on_linewrap_toggled(self):
         if self._ui_linewrap_check.isChecked():
             self._ui_logtext.setLineWrapMode(QPlainTextEdit.LineWrapMode.WidgetWidth)
@@ -81,3 +124,11 @@ class LogDialogUi(QDialog):
         pass
     def on_clear(self):
         pass
+    def on_tab_change(self):
+        pass
+    def on_refresh_stats(self):
+        pass
+    def on_export_stats(self):
+        pass
+    def on_clear_stats(self):
+        pass
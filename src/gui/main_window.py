@@ -1,5 +1,8 @@
 from .main_window_ui import MainWindowUi
 from .helpers.log_handler import LogHandler
+from .helpers.file_preloader import FilePreloader
+from .helpers.file_loader import FileLoader
+from .helpers.file_watcher import FileWatcher
 from .helpers.file_filter import FileFilter
 from .helpers.simple_dialogs import info_dialog, warning_dialog, error_dialog, exception_dialog, okcancel_dialog, yesno_dialog, open_directory_dialog, open_file_dialog, save_file_dialog, custom_buttons_dialog, textinput_dialog
 from .helpers.help import show_help
@@ -17,13 +20,13 @@ from .about_dialog import AboutDialog
 from lib.si import SiFormat
 from lib import Clipboard
 from lib import AppPaths
-from lib import group_delay, v2db, start_process, shorten_path, is_ext_supported_archive, is_ext_supported_file, find_files_in_archive, get_unique_id, any_common_elements, string_to_enum, enum_to_string, is_running_from_binary, choose_smart_db_scale, open_file_in_default_viewer, shorten_string_list, natural_sort_key
+from lib import group_delay, v2db, start_process, shorten_path, is_ext_supported_archive, is_ext_supported_file, is_ext_sweepable, find_files_in_archive, get_unique_id, any_common_elements, string_to_enum, enum_to_string, is_running_from_binary, choose_smart_db_scale, open_file_in_default_viewer, shorten_string_list, natural_sort_key
 from lib import SiValue
-from lib import SParamFile
+from lib import SParamFile, ZipFilePool, NetworkMemory, QualityMetrics
 from lib import PlotHelper
 from lib import ExpressionParser, DefaultAction
 from lib import PathExt
-from lib import Settings, PlotType, PhaseProcessing, PhaseUnit, CursorSnap, ColorAssignment, Parameters, YQuantity, TdrResponse, SmithNorm, LegendPos, FileConfig, TdrResponse
+from lib import Settings, PlotType, PhaseProcessing, PhaseUnit, CursorSnap, ColorAssignment, Parameters, YQuantity, TdrResponse, SmithNorm, LegendPos, FileConfig, TdrResponse, CsvSeparator
 from lib import TDR
 from lib.expressions.sparams import NumberType
 from lib.expressions.templates import get_expression_templates, ExpressionTemplate, ExpressionTemplateGroup
@@ -93,6 +96,7 @@ class MainWindow(MainWindowUi):
         self._last_cursor_x = [0, 0]
         self._last_cursor_trace = ['', '']
         self._smartscale_set_y = False
+        self._quick_look_range: tuple[float|None,float|None]|None = None
         self._ref_path_for_template: str|None = None
         self._file_slice_filter: FileFilter|None = None
         self.restore_window_dimensions = False
@@ -101,12 +105,28 @@ class MainWindow(MainWindowUi):
         
         LogHandler.inst().attach(self.on_log_entry)
 
+        self.file_preloader = FilePreloader(self)
+        self.file_preloader.fileLoaded.connect(self.on_file_preloaded)  # started once the initial selection is known (see finish_initialization())
+
+        self.file_loader = FileLoader(self)
+        self.file_loader.progressChanged.connect(self.on_file_load_progress)
+        self.file_loader.fileLoaded.connect(self.on_file_loaded)
+        self.file_loader.finished.connect(self.on_file_loading_finished)
+
+        self.quality_report_loader = FileLoader(self)  # independent of the files to plot, so that neither cancels the other
+        self.quality_report_loader.progressChanged.connect(self.on_quality_report_progress)
+        self.quality_report_loader.fileLoaded.connect(self.on_file_loaded)
+        self.quality_report_loader.finished.connect(self.on_quality_report_loaded)
+        self.quality_report_request: tuple[PathExt,list[SParamFile]]|None = None
+
+        self.file_watcher = FileWatcher(lambda: self.ui_filesys_browser.watched_paths, self)
+        self.file_watcher.directoryChanged.connect(self.on_watched_directory_changed)
+        self.file_watcher.filesModified.connect(self.on_watched_files_modified)
+        self.file_watcher.start(Settings.file_watch_interval_s)
+
         self.clear_load_counter()
-        def before_load_sparamfile(path: PathExt) -> bool:
-            return self.before_load_sparamfile(path)
         def after_load_sparamfile(path: PathExt) -> bool:
             return self.after_load_sparamfile(path)
-        SParamFile.before_load = before_load_sparamfile
         SParamFile.after_load = after_load_sparamfile
 
         self.ui_set_window_title(Info.AppName)
@@ -171,6 +191,10 @@ class MainWindow(MainWindowUi):
     
 
     def on_close(self):
+        self.file_watcher.stop()
+        self.file_loader.cancel()
+        self.quality_report_loader.cancel()
+        self.file_preloader.stop()
         dim = self.ui_get_dimensions()
         if dim.is_windowed:  # only save if not maximized or minimized
             Settings.main_win_width = dim.width
@@ -314,27 +338,89 @@ class MainWindow(MainWindowUi):
         else:
             self.ui_filesys_browser.select_first_file()
         
+        # selected files must not be pre-loaded for a quick look, so pre-loading only starts now
+        self.file_preloader.start(Settings.preload_workers)
+        self.preload_files()
+        
         if self.restore_window_dimensions:
             self.ui_set_dimensions(width=Settings.main_win_width, height=Settings.main_win_height, splitter_pos=Settings.main_win_splitter_pos)
 
 
     def clear_load_counter(self):
+        if self.file_loader.busy or self.quality_report_loader.busy:
+            return  # still loading; keep the abort button
         self.ui_show_abort_button(False)
         self.sparamfile_load_t_start = -1
         self.sparamfile_load_aborted = False
 
 
-    def before_load_sparamfile(self, path: PathExt) -> bool:
-        if self.sparamfile_load_aborted:
-            return False
-        if self.sparamfile_load_t_start < 0:
+    def load_selected_files(self, files: list[SParamFile], reduced: dict|None = None):
+        """ Loads the files (or only their reduced networks, see SParamFile.load_async()) in the background; the plot is updated after each file """
+        if not self.file_loader.busy:
             self.sparamfile_load_t_start = time.monotonic()
-        else:
-            t_elapsed = time.monotonic() - self.sparamfile_load_t_start
-            if t_elapsed >= Settings.warn_timeout_s:
-                self.ui_show_abort_button(True)
-                self.ui_update()
-        return True
+        self.file_loader.load(files, reduced)
+
+
+    def on_file_load_progress(self, done: int, total: int):
+        if not self.file_loader.busy:
+            return
+        if self.sparamfile_load_t_start >= 0 and time.monotonic() - self.sparamfile_load_t_start >= Settings.warn_timeout_s:
+            self.ui_show_abort_button(True)
+        n_files = len(self.file_loader.files)
+        percent = f' ({100*done/total:.0f}%)' if total > 0 else ''
+        self.ui_show_status_message(f'Loading {n_files} file{"s" if n_files!=1 else ""}{percent}...')
+
+
+    def on_file_loaded(self, file: SParamFile):
+        if self.files.get(file.path) is not file:
+            return  # file was discarded in the meantime
+        self.set_file_status(file.path)
+        if file.path in self.ui_filesys_browser.selected_files:
+            self.update_params_size()
+            self.schedule_plot_update()
+
+
+    def on_file_loading_finished(self):
+        if not self.quality_report_loader.busy:
+            self.ui_show_abort_button(False)
+        self.schedule_plot_update()
+
+
+    def start_quality_report(self, path: PathExt, files: list[SParamFile]):
+        """ Loads the <files> in the background, and shows their quality report when they are loaded """
+        self.quality_report_request = (path, files)
+        self.ui_show_abort_button(True)
+        self.quality_report_loader.load(files)
+        self.ui_show_status_message(f'Loading {len(files)} file{"s" if len(files)!=1 else ""} for the quality report...')
+
+
+    def on_quality_report_progress(self, done: int, total: int):
+        if not self.quality_report_loader.busy:
+            return
+        n_files = len(self.quality_report_loader.files)
+        percent = f' ({100*done/total:.0f}%)' if total > 0 else ''
+        self.ui_show_status_message(f'Loading {n_files} file{"s" if n_files!=1 else ""} for the quality report{percent}...')
+
+
+    def on_quality_report_loaded(self):
+        if self.quality_report_loader.busy or self.quality_report_request is None:
+            return  # a newer report is still loading
+        path, files = self.quality_report_request
+        self.quality_report_request = None
+        if not self.file_loader.busy:
+            self.ui_show_abort_button(False)
+        if self.quality_report_loader.cancelled:
+            self.ui_show_status_message('Quality report was cancelled')
+            return
+        self.ui_show_status_message()
+        
+        SEPARATORS = { CsvSeparator.Tab: '\t', CsvSeparator.Comma: ',', CsvSeparator.Semicolon: ';' }
+        try:
+            csv = QualityMetrics.to_csv(QualityMetrics.report(files), separator=SEPARATORS[Settings.csv_separator])  # files are loaded already
+        except Exception as ex:
+            exception_dialog('Quality Report Failed', f'Unable to calculate the quality metrics of <{path}>', detailed_text=str(ex))
+            return
+        TextDialog(self).show_modal_dialog('Quality Report', text=csv, save_filetypes=[('CSV-Files', '.csv'), 'All Files', '*'])
 
 
     def set_file_status(self, path: PathExt):
@@ -744,6 +830,10 @@ class MainWindow(MainWindowUi):
     def reload_all_files(self):
         try:
             self.ready = False
+            self.file_preloader.clear()
+            self.file_loader.cancel()
+            self.quality_report_loader.cancel()
+            ZipFilePool.clear()
             self.ui_filesys_browser.refresh()
             self.files.clear()
             self.update_params_size()
@@ -759,6 +849,8 @@ class MainWindow(MainWindowUi):
                     return f'{file.nw.number_of_ports}-port, {SiValue(min(file.nw.f),"Hz")} to {SiValue(max(file.nw.f),"Hz")}'
                 elif file.error:
                     return '[loading failed]'
+                elif (probe := file.probe) is not None:
+                    return f'{probe.n_ports}-port, {SiValue(probe.f_start,"Hz")} to {SiValue(probe.f_stop,"Hz")}'
             return '[not loaded]'
         except:
             return '[loading failed]'
@@ -801,6 +893,8 @@ class MainWindow(MainWindowUi):
     
     def on_abort(self):
         self.sparamfile_load_aborted = True
+        self.file_loader.cancel()
+        self.quality_report_loader.cancel()
     
 
     def on_about(self):
@@ -1136,6 +1230,26 @@ class MainWindow(MainWindowUi):
             self.ui_xaxis_range.both_are_wildcard = True
         else:
             self.ui_xaxis_range.low, self.ui_xaxis_range.high = lo, hi
+        if self._quick_look_range is not None and self._quick_look_range != self.get_quick_look_range():
+            self.schedule_plot_update()  # zoomed or panned a quick-look plot; load the visible range
+    
+
+    def get_quick_look_range(self) -> tuple[float|None,float|None]:
+        """ Returns the frequency range to load for a quick-look plot, which is the visible range plus a margin """
+        if self.ui_xaxis_range.low_is_wildcard or self.ui_xaxis_range.high_is_wildcard:
+            return None, None
+        margin = (self.ui_xaxis_range.high - self.ui_xaxis_range.low) * 0.05
+        return self.ui_xaxis_range.low - margin, self.ui_xaxis_range.high + margin
+
+
+    def get_quick_look_args(self) -> dict|None:
+        """ Returns the arguments for SParamFile.load_reduced() if the selected files are plotted from reduced networks (quick look), otherwise None """
+        if Settings.quick_look_points <= 0 or self.ui_param_selector.useExpressions():
+            return None
+        if self.ui_plot_selector.plotType() != PlotType.Cartesian or self.ui_plot_selector.y2Quantity() == YQuantity.GroupDelay:
+            return None
+        f_start, f_stop = self.get_quick_look_range()
+        return dict(f_start=f_start, f_stop=f_stop, max_points=Settings.quick_look_points)
     
 
     def on_user_change_yaxis(self, lo: float, hi: float):
@@ -1230,13 +1344,26 @@ class MainWindow(MainWindowUi):
         except:
             pass
             
+        if 'preload_workers' in attributes:
+            self.file_preloader.start(Settings.preload_workers)
+            self.preload_files()
+        elif 'quick_look_points' in attributes:
+            self.preload_files()  # selected files are not pre-loaded for a quick look
+            
+        if 'file_watch_interval_s' in attributes:
+            self.file_watcher.start(Settings.file_watch_interval_s)
+            
+        if 'single_precision' in attributes:
+            self.reload_all_files()  # loaded files still have the previous precision
+            
         if any_common_elements(('plot_cursor_readouts'), attributes):
             self.update_cursor_readout()
             self.schedule_plot_update()
             
         if any_common_elements(('show_legend','phase_unit','plot_unit','plot_unit2','hide_single_item_legend','shorten_legend_items',
                 'log_x','log_y','expression','window_type','window_arg','tdr_shift','tdr_impedance','tdr_minsize',
-                'plot_mark_points','color_assignment','treat_all_as_complex','singlefile_individualcolor', 'show_grid', 'legend_position'), attributes):
+                'plot_mark_points','color_assignment','treat_all_as_complex','singlefile_individualcolor', 'show_grid', 'legend_position',
+                'quick_look_points'), attributes):
             self.schedule_plot_update()
     
     
@@ -1270,18 +1397,27 @@ class MainWindow(MainWindowUi):
                 self.add_to_most_recent_paths(str(new_path))
                 self.ui_filesys_browser.change_root(toplevel_path, new_path)
             return chroot
+        def get_files_in_path(file_path: PathExt) -> list[PathExt]:
+            if file_path.is_dir():
+                return [p for p in file_path.iterdir() if p.is_file() and is_ext_supported_file(p.suffix)]
+            elif (file_path.is_file() and not file_path.is_in_arch() and is_ext_supported_archive(path.suffix)) or (file_path.is_in_arch()):
+                return [p for p in find_files_in_archive(str(file_path)) if is_ext_supported_file(p.arch_path_suffix)]
+            else:
+                return [p for p in file_path.parent.iterdir() if p.is_file() and is_ext_supported_file(p.suffix)]
         def make_selall(file_path: PathExt):
             def selall():
-                if file_path.is_dir():
-                    files_in_path = [p for p in file_path.iterdir() if p.is_file() and is_ext_supported_file(p.suffix)]
-                elif (file_path.is_file() and not file_path.is_in_arch() and is_ext_supported_archive(path.suffix)) or (file_path.is_in_arch()):
-                    files_in_path = [p for p in find_files_in_archive(str(file_path)) if is_ext_supported_file(p.arch_path_suffix)]
-                else:
-                    files_in_path = [p for p in file_path.parent.iterdir() if p.is_file() and is_ext_supported_file(p.suffix)]
+                files_in_path = get_files_in_path(file_path)
                 if len(files_in_path) < 1:
                     return
                 self.ui_filesys_browser.selected_files = [*files_in_path, *self.ui_filesys_browser.selected_files]
             return selall
+        def make_quality_report(file_path: PathExt):
+            def quality_report():
+                files = [self.files.get(p) or SParamFile(p) for p in get_files_in_path(file_path)]
+                if len(files) < 1:
+                    return
+                self.start_quality_report(file_path, files)
+            return quality_report
         def make_copy_path(path: PathExt):
             def copypath():
                 Clipboard.copy_string(str(path))
@@ -1378,6 +1514,7 @@ class MainWindow(MainWindowUi):
                     menu.append((None, None))
             menu.append((f'Select All Files in Here', make_selall(path)))
             if not (self.ui_filesys_browser.simplified() and Settings.simplified_no_expressions):
+                menu.append((f'Quality Report...', make_quality_report(path)))
                 menu.append((None, None))
                 menu.append((f'Copy Path', make_copy_path(path)))
                 menu.append((f'Open With Default Application', make_open_in_default_app(path)))
@@ -1403,6 +1540,59 @@ class MainWindow(MainWindowUi):
                 self.files[browser_path] = SParamFile(browser_path)
                 # show preliminary status
                 self.ui_filesys_browser.update_status(browser_path, self.get_file_prop_str(self.files[browser_path]))
+        
+        self.preload_files()
+
+
+    def on_watched_directory_changed(self, path: PathExt):
+        # updates the tree, which then triggers on_filesys_files_changed()
+        self.ui_filesys_browser.update_directory(path)
+
+
+    def on_watched_files_modified(self, paths: list[PathExt]):
+        selected_paths = self.ui_filesys_browser.selected_files
+        any_selected_modified = False
+        for path in paths:
+            if is_ext_supported_archive(path.suffix) or is_ext_sweepable(path.suffix):
+                self.ui_filesys_browser.update_directory(path)  # members, sweep slices or bundled networks might have been added or removed
+            
+            # discard the modified files (including archive members and sweep slices), so that they are loaded again
+            for file_path in [p for p in self.files.keys() if PathExt(str(p)) == path]:
+                logging.debug(f'File <{file_path.full_path}> was modified, re-loading')
+                self.files[file_path] = SParamFile(file_path)
+                self.set_file_status(file_path)
+                if file_path in selected_paths:
+                    any_selected_modified = True
+        
+        self.preload_files()
+        if any_selected_modified:
+            self.update_params_size()
+            self.schedule_plot_update()
+
+
+    def get_plotted_files(self) -> list[SParamFile]:
+        """ Returns the files that the plot needs: the selected files, or all files that the expressions can reach (e.g. via `nws()`) """
+        files = self.get_selected_files()
+        if self.ui_param_selector.useExpressions():
+            files = ExpressionParser.get_reachable_files(self.ui_expression, list(self.files.values()), files, self.get_nw_name_for_template(self._ref_path_for_template))
+        return files
+
+
+    def preload_files(self):
+        # selected files are loaded by the (cancellable) file loader, once the plot is updated; for a quick look, they are not loaded completely at all
+        selected_files = self.get_selected_files()
+        NetworkMemory.pin(self.get_plotted_files())
+        self.file_preloader.exclude(selected_files if self.get_quick_look_args() is not None else [])
+        self.file_preloader.enqueue(list(self.files.values()), FilePreloader.PRIORITY_VISIBLE)
+    
+
+    def on_file_preloaded(self, file: SParamFile):
+        if self.files.get(file.path) is not file:
+            return  # file was discarded in the meantime
+        self.set_file_status(file.path)
+        if file.path in self.ui_filesys_browser.selected_files:
+            self.update_params_size()
+            self.schedule_plot_update()
     
 
     def on_filesys_toplevels_changed(self, paths: list[str]):
@@ -1410,6 +1600,7 @@ class MainWindow(MainWindowUi):
 
 
     def on_filesys_selection_changed(self):
+        self.preload_files()
         self.update_params_size()
         self.schedule_plot_update()
     
@@ -1716,6 +1907,11 @@ class MainWindow(MainWindowUi):
         size = 0
         for file in self.get_selected_files():
             try:
+                if not file.loaded and (probe := file.probe) is not None:
+                    size = max(size, probe.n_ports)
+                    continue
+                if not file.loaded:
+                    continue  # do not block the GUI; will be called again once the file is loaded
                 size = max(size, file.nw.number_of_ports)
             except:
                 pass
@@ -1737,6 +1933,29 @@ class MainWindow(MainWindowUi):
         
         if not self.ready:
             return
+        
+        pending_files = []
+        quick_look_args = self.get_quick_look_args()
+        if figure is None:
+            files = self.get_plotted_files()
+            NetworkMemory.pin(files)  # otherwise, loading all files that expressions can reach might unload them again over and over
+            loading_reduced = False
+            if quick_look_args is not None:  # never for expressions, which might need the complete networks
+                # only the reduced networks are prepared in the background (see SParamFile.load_reduced()); files are only loaded completely
+                #   if that failed, after the reduced networks of the others are prepared (the loader runs one job at a time)
+                pending_files = [file for file in files if not file.has_reduced(**quick_look_args) and not file.error]
+                files = [file for file in files if file.has_reduced(**quick_look_args) and file.load_reduced(**quick_look_args) is None]
+                if len(pending_files) > 0 and not self.sparamfile_load_aborted:
+                    self.load_selected_files(pending_files, reduced=quick_look_args)
+                    loading_reduced = True
+            pending_full = [file for file in files if not file.loaded and not file.error]
+            pending_files += pending_full
+            if len(pending_full) > 0 and not loading_reduced and not self.sparamfile_load_aborted:
+                # do not block the GUI; the plot is updated again after each file, so it shows the files that are already loaded
+                self.load_selected_files(pending_full)
+                if self.ui_param_selector.useExpressions():
+                    self.ui_show_status_message(f'Loading {len(pending_full)} file{"s" if len(pending_full)!=1 else ""}...')
+                    return  # expressions might need all files
 
         if figure is None:
             figure = self.ui_plot.figure
@@ -1833,7 +2052,18 @@ class MainWindow(MainWindowUi):
                 nonlocal all_plot_kwargs
                 all_plot_kwargs.append(dict(f=f, sp=sp, z0=z0, name=name, style=style, color=color, width=width, opacity=opacity, original_files=original_files, param_kind=param_kind, number_type=number_type))
                     
-            selected_files = self.get_selected_files()
+            selected_files = [file for file in self.get_selected_files() if file not in pending_files]
+            if quick_look_args is not None:
+                # plot a reduced version of the files; when zoomed in, only the visible range is loaded, so the details show up again
+                self._quick_look_range = quick_look_args['f_start'], quick_look_args['f_stop']
+                selected_files = []
+                for file in self.get_selected_files():
+                    if file not in pending_files:
+                        selected_files.append(file.reduced_copy(**quick_look_args))
+                    elif (previous := file.last_reduced_copy()) is not None:
+                        selected_files.append(previous)  # e.g. while the visible range is loaded after zooming
+            else:
+                self._quick_look_range = None
 
             plot_kwargs_rl, plot_kwargs_il = {}, {}
             if self.ui_semitrans_traces:
@@ -1955,13 +2185,13 @@ class MainWindow(MainWindowUi):
             if use_expressions:
 
                 Settings.expression = self.ui_expression
-                result = expression_parser.eval(self.ui_expression)
+                result = expression_parser.eval(self.ui_expression, memoize=True)
                 param_selector_is_in_use = result.default_actions_used
 
             else:
 
                 try:
-                    expression_parser.eval(self.generated_expressions)
+                    expression_parser.eval(self.generated_expressions, memoize=True)
                 except Exception as ex:
                     logging.error(f'Unable to parse expressions: {ex} (trace: {traceback.format_exc()})')
                     self.ui_plot.clear()
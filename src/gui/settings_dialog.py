@@ -2,7 +2,7 @@ from .settings_dialog_ui import SettingsDialogUi, SettingsTab
 from .helpers.simple_dialogs import okcancel_dialog, open_file_dialog, error_dialog
 from .helpers.qt_helper import QtHelper
 from .components.plot_widget import PlotWidget
-from lib import Settings, PhaseUnit, CsvSeparator, CursorSnap, ColorAssignment, LogNegativeHandling, MainWindowLayout, LargeMatrixBehavior, GuiColorScheme
+from lib import Settings, NetworkCache, NetworkMemory, PhaseUnit, CsvSeparator, CursorSnap, ColorAssignment, LogNegativeHandling, MainWindowLayout, LargeMatrixBehavior, GuiColorScheme
 from lib.utils import is_windows, window_has_argument, enum_to_string, string_to_enum, is_valid_binary, start_process, find_default_editors, is_valid_binary
 import pathlib
 import logging
@@ -81,6 +81,7 @@ class SettingsDialog(SettingsDialogUi):
             self.ui_cursor_snap = enum_to_string(Settings.cursor_snap, SettingsDialog.CURSOR_SNAP_NAMES)
             self.ui_comment_expr = Settings.comment_existing_expr
             self.ui_dynamic_template_ref = Settings.dynamic_template_references
+            self.ui_exprthreads = Settings.expression_threads
             self.ui_extract_zip = Settings.extract_zip
             self.ui_warn_timeout = Settings.warn_timeout_s
             self.ui_ext_ed = Settings.ext_editor_cmd
@@ -99,6 +100,15 @@ class SettingsDialog(SettingsDialogUi):
             self.ui_simplified_browser = Settings.simplified_browser
             self.ui_selecttocheck = Settings.select_file_to_check
             self.ui_maxhist = Settings.path_history_maxsize
+            self.ui_cache = Settings.network_cache
+            self.ui_cachesize = Settings.network_cache_size_mb
+            self.ui_preload = Settings.preload_workers
+            self.ui_bulkload = Settings.bulk_load_processes
+            self.ui_memory = Settings.network_memory_mb
+            self.ui_watch = Settings.file_watch_interval_s
+            self.ui_single_precision = Settings.single_precision
+            self.ui_quicklook = Settings.quick_look_points
+            self.ui_set_memory_usage(f'Currently used: {NetworkMemory.usage/1024/1024:,.0f} MB, peak: {NetworkMemory.peak/1024/1024:,.0f} MB')
             self.ui_restore_geometry = Settings.restore_window_geometry
             self.ui_fixed_plot_size = Settings.plot_export_fixed
             self.ui_fixed_plot_width = Settings.plot_export_width
@@ -169,6 +179,10 @@ class SettingsDialog(SettingsDialogUi):
     
     def on_template_ref_changed(self):
         Settings.dynamic_template_references = self.ui_dynamic_template_ref
+    
+    
+    def on_exprthreads_changed(self):
+        Settings.expression_threads = self.ui_exprthreads
 
 
     def on_ext_ed_change(self):
@@ -249,6 +263,34 @@ class SettingsDialog(SettingsDialogUi):
     def on_maxhist_change(self):
         Settings.path_history_maxsize = self.ui_maxhist
 
+    def on_cache_changed(self):
+        Settings.network_cache = self.ui_cache
+
+    def on_cachesize_changed(self):
+        Settings.network_cache_size_mb = self.ui_cachesize
+
+    def on_preload_changed(self):
+        Settings.preload_workers = self.ui_preload
+
+    def on_bulkload_changed(self):
+        Settings.bulk_load_processes = self.ui_bulkload
+
+    def on_memory_changed(self):
+        Settings.network_memory_mb = self.ui_memory
+
+    def on_watch_changed(self):
+        Settings.file_watch_interval_s = self.ui_watch
+
+    def on_single_precision_changed(self):
+        Settings.single_precision = self.ui_single_precision
+
+    def on_quicklook_changed(self):
+        Settings.quick_look_points = self.ui_quicklook
+
+    def on_clear_cache(self):
+        if okcancel_dialog('Clear Cache', f'All cached files ({NetworkCache.get_size()/1024/1024:,.1f} MB) will be removed.', informative_text='Files will be parsed again the next time they are loaded.'):
+            NetworkCache.clear()
+
     def on_reset_all_settings(self):
         if okcancel_dialog('Reset all Settings', 'All settings will be reset to their default value.', informative_text='This action cannot be undone.'):
             Settings.reset()
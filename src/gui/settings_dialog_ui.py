@@ -146,6 +146,56 @@ class SettingsDialogUi(QDialog):
         self._ui_maxhist_spin.setMaximum(30)
         self._ui_maxhist_spin.setToolTip('Maximum number of directories in file history (in main window main menu)')
         self._ui_maxhist_spin.valueChanged.connect(self.on_maxhist_change)
+        self._ui_cache_check = QCheckBox('Cache Parsed Files')
+        self._ui_cache_check.setToolTip('Keeps a binary copy of every loaded file in the cache directory, so that loading the same (unmodified) file again is much faster.')
+        self._ui_cache_check.toggled.connect(self.on_cache_changed)
+        self._ui_cachesize_spin = QSpinBox()
+        self._ui_cachesize_spin.setMinimum(16)
+        self._ui_cachesize_spin.setMaximum(1024*1024)
+        self._ui_cachesize_spin.setSingleStep(256)
+        self._ui_cachesize_spin.setSuffix(' MB')
+        self._ui_cachesize_spin.setToolTip('Maximum size of the cache; when the cache grows larger, the least recently used files are removed from the cache.')
+        self._ui_cachesize_spin.valueChanged.connect(self.on_cachesize_changed)
+        self._ui_clearcache_btn = QtHelper.make_button(self, 'Clear Cache', self.on_clear_cache)
+        self._ui_clearcache_btn.setToolTip('Remove all files from the cache.')
+        self._ui_preload_spin = QSpinBox()
+        self._ui_preload_spin.setMinimum(0)
+        self._ui_preload_spin.setMaximum(32)
+        self._ui_preload_spin.setSpecialValueText('Off')
+        self._ui_preload_spin.setToolTip('Number of background threads that load the files shown in the filesystem browser, so that the GUI does not have to wait. Selected files are loaded first. If off, files are loaded when they are needed.')
+        self._ui_preload_spin.valueChanged.connect(self.on_preload_changed)
+        self._ui_bulkload_spin = QSpinBox()
+        self._ui_bulkload_spin.setMinimum(0)
+        self._ui_bulkload_spin.setMaximum(256)
+        self._ui_bulkload_spin.setSpecialValueText('Auto')
+        self._ui_bulkload_spin.setToolTip('Number of processes that parse files when many files are loaded at once. "Auto" uses one process per CPU core; 1 parses all files in the application process.')
+        self._ui_bulkload_spin.valueChanged.connect(self.on_bulkload_changed)
+        self._ui_memory_spin = QSpinBox()
+        self._ui_memory_spin.setMinimum(0)
+        self._ui_memory_spin.setMaximum(1024*1024)
+        self._ui_memory_spin.setSingleStep(256)
+        self._ui_memory_spin.setSuffix(' MB')
+        self._ui_memory_spin.setSpecialValueText('Unlimited')
+        self._ui_memory_spin.setToolTip('Maximum memory for loaded files; when more memory is needed, the least recently used files are unloaded, and loaded again when they are needed. Files that are currently selected are never unloaded.')
+        self._ui_memory_spin.valueChanged.connect(self.on_memory_changed)
+        self._ui_memory_label = QLabel()
+        self._ui_watch_spin = QSpinBox()
+        self._ui_watch_spin.setMinimum(0)
+        self._ui_watch_spin.setMaximum(3600)
+        self._ui_watch_spin.setSuffix(' s')
+        self._ui_watch_spin.setSpecialValueText('Off')
+        self._ui_watch_spin.setToolTip('Interval to check the files shown in the filesystem browser for changes; new, removed and modified files are updated automatically. If off, use "Reload All Files" instead.')
+        self._ui_watch_spin.valueChanged.connect(self.on_watch_changed)
+        self._ui_single_precision_check = QCheckBox('Single-Precision Storage')
+        self._ui_single_precision_check.setToolTip('Keeps loaded files in single precision, which halves the memory they need. Matrix inversions, cascading and eigenvalues are still calculated in double precision. Changing this reloads all files.')
+        self._ui_single_precision_check.toggled.connect(self.on_single_precision_changed)
+        self._ui_quicklook_spin = QSpinBox()
+        self._ui_quicklook_spin.setMinimum(0)
+        self._ui_quicklook_spin.setMaximum(1000000)
+        self._ui_quicklook_spin.setSingleStep(500)
+        self._ui_quicklook_spin.setSpecialValueText('Off')
+        self._ui_quicklook_spin.setToolTip('Plots only about this many points per file, keeping the minimum and maximum of every parameter, which makes plotting huge files much faster. When zoomed in, only the visible frequency range is loaded, so details show up again. Expressions, time-domain, Smith and polar plots always use all points.')
+        self._ui_quicklook_spin.valueChanged.connect(self.on_quicklook_changed)
         files_widget.setLayout(
             QtHelper.layout_v(
                 self._ui_extract_zip_check,
@@ -153,6 +203,12 @@ class SettingsDialogUi(QDialog):
                 QtHelper.layout_h('CSV Separator:', self._ui_csvsep_combo, ...),
                 QtHelper.layout_h('Export Phase Unit:', self._ui_deg_radio, self._ui_rad_radio, ...),
                 QtHelper.layout_h('Max. History Size:', self._ui_maxhist_spin, ...),
+                QtHelper.layout_h(self._ui_cache_check, 'Max. Size:', self._ui_cachesize_spin, self._ui_clearcache_btn, ...),
+                QtHelper.layout_h('Background Loading Threads:', self._ui_preload_spin, 'Parsing Processes:', self._ui_bulkload_spin, ...),
+                QtHelper.layout_h('Memory for Loaded Files:', self._ui_memory_spin, self._ui_memory_label, ...),
+                self._ui_single_precision_check,
+                QtHelper.layout_h('Quick-Look Plot Points:', self._ui_quicklook_spin, ...),
+                QtHelper.layout_h('Watch Files for Changes Every', self._ui_watch_spin, ...),
                 ...
             )
         )
@@ -168,10 +224,17 @@ class SettingsDialogUi(QDialog):
         self._ui_dynamic_template_radio = QRadioButton('Dynamic')
         self._ui_dynamic_template_radio.setToolTip('Templates that operate on specific networks use `sel_nws()` to dynamically refer to any selected network.')
         self._ui_dynamic_template_radio.toggled.connect(self.on_template_ref_changed)
+        self._ui_exprthreads_spin = QSpinBox()
+        self._ui_exprthreads_spin.setMinimum(0)
+        self._ui_exprthreads_spin.setMaximum(256)
+        self._ui_exprthreads_spin.setSpecialValueText('Auto')
+        self._ui_exprthreads_spin.setToolTip('Number of threads that apply an operation to many networks at once (e.g. de-embedding or impedance conversion). "Auto" uses one thread per CPU core; 1 processes one network after the other.')
+        self._ui_exprthreads_spin.valueChanged.connect(self.on_exprthreads_changed)
         expr_widget.setLayout(
             QtHelper.layout_v(
                 self._ui_comment_expr_combo,
                 QtHelper.layout_h('Template References', self._ui_static_template_radio, self._ui_dynamic_template_radio, ...),
+                QtHelper.layout_h('Parallel Threads:', self._ui_exprthreads_spin, ...),
                 ...
             )
         )
@@ -458,6 +521,14 @@ class SettingsDialogUi(QDialog):
             self._ui_static_template_radio.setChecked(True)
 
     
+    @property
+    def ui_exprthreads(self) -> int:
+        return self._ui_exprthreads_spin.value()
+    @ui_exprthreads.setter
+    def ui_exprthreads(self, value: int):
+        self._ui_exprthreads_spin.setValue(value)
+
+    
     @property
     def ui_extract_zip(self) -> bool:
         return self._ui_extract_zip_check.isChecked()
@@ -466,6 +537,74 @@ class SettingsDialogUi(QDialog):
         self._ui_extract_zip_check.setChecked(value)
 
     
+    @property
+    def ui_cache(self) -> bool:
+        return self._ui_cache_check.isChecked()
+    @ui_cache.setter
+    def ui_cache(self, value: bool):
+        self._ui_cache_check.setChecked(value)
+
+    
+    @property
+    def ui_cachesize(self) -> int:
+        return self._ui_cachesize_spin.value()
+    @ui_cachesize.setter
+    def ui_cachesize(self, value: int):
+        self._ui_cachesize_spin.setValue(value)
+
+    
+    @property
+    def ui_preload(self) -> int:
+        return self._ui_preload_spin.value()
+    @ui_preload.setter
+    def ui_preload(self, value: int):
+        self._ui_preload_spin.setValue(value)
+
+    
+    @property
+    def ui_bulkload(self) -> int:
+        return self._ui_bulkload_spin.value()
+    @ui_bulkload.setter
+    def ui_bulkload(self, value: int):
+        self._ui_bulkload_spin.setValue(value)
+
+    
+    @property
+    def ui_memory(self) -> int:
+        return self._ui_memory_spin.value()
+    @ui_memory.setter
+    def ui_memory(self, value: int):
+        self._ui_memory_spin.setValue(value)
+
+
+    @property
+    def ui_watch(self) -> int:
+        return self._ui_watch_spin.value()
+    @ui_watch.setter
+    def ui_watch(self, value: int):
+        self._ui_watch_spin.setValue(value)
+
+
+    @property
+    def ui_single_precision(self) -> bool:
+        return self._ui_single_precision_check.isChecked()
+    @ui_single_precision.setter
+    def ui_single_precision(self, value: bool):
+        self._ui_single_precision_check.setChecked(value)
+
+
+    @property
+    def ui_quicklook(self) -> int:
+        return self._ui_quicklook_spin.value()
+    @ui_quicklook.setter
+    def ui_quicklook(self, value: int):
+        self._ui_quicklook_spin.setValue(value)
+
+
+    def ui_set_memory_usage(self, text: str):
+        self._ui_memory_label.setText(text)
+
+    
     @property
     def ui_restore_geometry(self) -> bool:
         return self._ui_restore_geometry_check.isChecked()
@@ -574,6 +713,8 @@ class SettingsDialogUi(QDialog):
         pass
     def on_template_ref_changed(self):
         pass
+    def on_exprthreads_changed(self):
+        pass
     def on_ext_ed_change(self):
         pass
     def on_browse_ext_ed(self):
@@ -620,6 +761,24 @@ class SettingsDialogUi(QDialog):
         pass
     def on_maxhist_change(self):
         pass
+    def on_cache_changed(self):
+        pass
+    def on_cachesize_changed(self):
+        pass
+    def on_clear_cache(self):
+        pass
+    def on_preload_changed(self):
+        pass
+    def on_bulkload_changed(self):
+        pass
+    def on_memory_changed(self):
+        pass
+    def on_watch_changed(self):
+        pass
+    def on_single_precision_changed(self):
+        pass
+    def on_quicklook_changed(self):
+        pass
     def on_reset_all_settings(self):
         pass
     def on_restore_geometry_changed(self):
@@ -3,7 +3,7 @@ from .helpers.simple_dialogs import save_file_dialog, error_dialog, exception_di
 from .settings_dialog import SettingsDialog, SettingsTab
 from .helpers.help import show_help
 from .text_dialog import TextDialog
-from lib import SParamFile, PlotData, SiValue, SiFormat, AppPaths, Clipboard, SiRange, SiFormat, start_process, Settings, PhaseUnit, CsvSeparator
+from lib import SParamFile, PlotData, SiValue, SiFormat, AppPaths, Clipboard, SiRange, SiFormat, start_process, Settings, PhaseUnit, CsvSeparator, FrequencyIndex
 import dataclasses
 import io
 import pathlib
@@ -405,10 +405,9 @@ class TabularDialog(TabularDialogUi):
             ycols, ycol_datas = ycols_filtered, ycol_datas_filtered
         self.ui_indicate_param_filter_error(False)
         
-        mask = (xcol_data >= filter_x0) & (xcol_data <= filter_x1)
-        xcol_data = xcol_data[mask]
-        for i in range(len(ycol_datas)):
-            ycol_datas[i] = ycol_datas[i][mask]
+        in_range = FrequencyIndex.get(xcol_data).range(filter_x0, filter_x1)
+        xcol_data = xcol_data[in_range]
+        ycol_datas = [ycol_data[in_range] for ycol_data in ycol_datas]
         
         return TabularDataset(dataset.name, dataset.xcol, ycols, xcol_data, ycol_datas, dataset.is_spar)
 
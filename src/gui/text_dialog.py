@@ -1,7 +1,7 @@
 from .text_dialog_ui import TextDialogUi
 from .settings_dialog import SettingsDialog
 from .helpers.simple_dialogs import save_file_dialog, error_dialog
-from lib import Clipboard, AppPaths, start_process, PathExt, Settings, ArchiveFileLoader
+from lib import Clipboard, AppPaths, start_process, PathExt, Settings, read_file_from_archive
 
 
 class TextDialog(TextDialogUi):
@@ -22,9 +22,7 @@ class TextDialog(TextDialogUi):
         def load_file_contents(path: PathExt):
             if path.is_in_arch():
                 try:
-                    with ArchiveFileLoader(str(path), path.arch_path) as extracted_path:
-                        with open(extracted_path, 'r') as fp:
-                            return fp.read()
+                    return read_file_from_archive(str(path), path.arch_path).decode(errors='replace')
                 except Exception as ex:
                     raise RuntimeError(f'Unable to extract and load <{path.arch_path}> from archive <{str(path)}> ({ex})')
             else:
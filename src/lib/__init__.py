@@ -1,19 +1,22 @@
-from .sparam_helpers import get_sparam_name, get_port_index
+from .sparam_helpers import get_sparam_name, get_port_index, FrequencyIndex
 from .si import SiValue, SiFormat, SiRange
 from .path_ext import PathExt
 from .sparam_file import SParamFile
+from .load_handle import LoadHandle
+from .touchstone_reader import TouchstoneReader
+from .file_probe import FileProbe
 from .plot_data import PlotData, PlotDataQuantity
 from .plot import PlotHelper
 from .appsettings import AppSettings
-from .utils import get_unique_short_filename, shorten_path, is_ext_supported, is_ext_supported_file, is_ext_supported_archive
+from .utils import get_unique_short_filename, shorten_path, is_ext_supported, is_ext_supported_file, is_ext_supported_archive, is_ext_citi, is_ext_bundle, is_ext_sweepable
 from .utils import group_delay, v2db, db2v, choose_smart_db_scale
 from .utils import get_unique_id, any_common_elements, window_has_argument, factorize_int
 from .utils import natural_sort_key, format_minute_seconds, string_to_enum, enum_to_string, strip_common
 from .utils import get_next_1_10_100, get_next_1_3_10, get_next_1_2_5_10
-from .utils import find_files_in_archive, load_file_from_archive
+from .utils import find_files_in_archive, load_file_from_archive, read_file_from_archive, read_file_chunked
 from .utils import file_pattern_to_regex, make_filename_matcher
 from .utils import is_windows, get_callstack_str, open_file_in_default_viewer, start_process, is_running_from_binary, is_valid_binary, find_default_editors
-from .utils import ArchiveFileLoader
+from .utils import ArchiveFileLoader, ZipFilePool
 from .expressions import ExpressionParser, DefaultAction
 from .apppaths import AppPaths
 from .bodefano import BodeFano
@@ -23,7 +26,12 @@ from .clipboard import Clipboard
 from .settings import SParamViewerAppSettings, Settings, PlotType, SmithNorm, TdrResponse, YQuantity, PhaseProcessing, PhaseUnit, CsvSeparator, CursorSnap, ColorAssignment, Parameters, LogNegativeHandling, MainWindowLayout, LargeMatrixBehavior, GuiColorScheme, LegendPos, TdrDcExtrapolation, TdrResponse
 from .lock import Lock
 from .file_config import FileConfig
+from .network_cache import NetworkCache
+from .network_memory import NetworkMemory
+from .load_stats import LoadStats, LoadRecord
+from .quality_metrics import QualityMetrics, QualityRecord
 from .tdr import TDR
 from .network_ext import NetworkExt, NetworkExtPort, NetworkExtPortMode
 from .citi.citireader import CitiReader
 from .citi.citiwriter import CitiWriter
+from .network_bundle import NetworkBundleReader, NetworkBundleWriter
@@ -1,5 +1,5 @@
-from CITIfile import read_citifile
 from ..network_ext import NetworkExt
+from ..load_stats import LoadStats
 
 import numpy as np
 import skrf
@@ -12,30 +12,168 @@ from typing import Any
 
 
 class CitiReader:
+    """
+    Native reader for CITI files.
 
-    def __init__(self, filename: str):
+    All packages are parsed in a single pass over the in-memory text; the VAR_LIST/SEG_LIST and BEGIN/END blocks
+      are converted to arrays with NumPy in bulk, and comments are collected on the way.
+    """
+
+
+    def __init__(self, filename: str, contents: str|bytes|None = None):
+        """ Reads <filename> from disk, unless <contents> is given; <filename> is then only used for the network name """
         self.filename = filename
         try:
-            self._citi = read_citifile(self.filename)
+            if contents is None:
+                with LoadStats.phase('extract'), open(filename, 'rb') as fp:
+                    contents = fp.read()
+                LoadStats.add_bytes(len(contents))
+            with LoadStats.phase('parse'):
+                if isinstance(contents, bytes):
+                    contents = CitiReader._decode(contents)
+                self._parse(contents)
         except Exception as ex:
-            # when reading a zero-byte file, the error is just "invalid agrument"; raise a more meaningful message instead
+            # when reading a zero-byte file, the error is just "no headers found"; add the filename to the message
             raise RuntimeError(f'Unable to open file <{filename}> ({ex})')
-        self.comments = self._get_comments()
+
+    @staticmethod
+    def _decode(data: bytes) -> str:
+        try:
+            return data.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return data.decode('ISO-8859-1')
+
+    @staticmethod
+    def _parse_values(block: str, dtype: type, count: int) -> np.ndarray:
+        """ Converts a block of values (one per line; complex values as "re,im") into an array """
+        if dtype is complex:
+            values = np.fromstring(block.replace(',', ' '), dtype=np.float64, sep=' ')
+            if len(values) != 2*count:
+                raise ValueError(f'Expected {count} complex values, got {len(values)/2:g}')
+            return values.view(np.complex128)
+        values = np.fromstring(block, dtype=np.float64, sep=' ')
+        if len(values) != count:
+            raise ValueError(f'Expected {count} values, got {len(values)}')
+        return values
+
+    @staticmethod
+    def _parse_segments(block: str) -> np.ndarray:
+        """ Converts a block of "SEG <start> <stop> <count>" lines into an array """
+        segments = []
+        for line in block.splitlines():
+            tokens = line.split()
+            if len(tokens) == 4 and tokens[0] == 'SEG':
+                segments.append(np.linspace(float(tokens[1]), float(tokens[2]), int(tokens[3])))
+        if len(segments) < 1:
+            raise ValueError('Empty segment list')
+        return np.concatenate(segments)
+
+    def _parse(self, text: str):
+        self._coords: dict[str,np.ndarray] = {}
+        self._data: dict[str,tuple[np.ndarray,list[str]]] = {}  # name -> (array, names of the dimensions)
+        self._header_comments: list[str] = []  # "#"-comments outside of packages
+        self.comments: list[str] = []
+
+        n_packages = 0
+        in_package = False
+        vars: list[tuple[str,type,int]] = []  # (name, type, length) of all variables of the current package
+        pending_vars: list[tuple[str,type,int]] = []  # variables that still wait for their values
+        pending_data: list[tuple[str,type,list[str],list[int]]] = []  # data variables (name, type, dimensions, shape) that still wait for their values
+        
+        def find_block_end(pos: int, keyword: str) -> int:
+            # blocks may be empty, so the search starts at the newline that ends the block's first line
+            end = text.find('\n' + keyword, pos - 1)
+            if end < 0:
+                raise ValueError(f'Missing {keyword}')
+            return end
+
+        pos = 0
+        while pos < len(text):
+            end = text.find('\n', pos)
+            if end < 0:
+                end = len(text)
+            line = text[pos:end]
+            pos = end + 1
+
+            if line.startswith('!') or line.startswith('#'):
+                self.comments.append(line[1:].strip())
+                if line.startswith('#') and not in_package:
+                    self._header_comments.append(line[1:].strip())
+                continue
+
+            tokens = line.split()
+            if len(tokens) < 1:
+                in_package = False  # packages end with an empty line
+                continue
+            keyword = tokens[0]
+            
+            if keyword == 'CITIFILE':
+                n_packages += 1
+                in_package = True
+                vars, pending_vars, pending_data = [], [], []
+            elif not in_package:
+                continue
+            
+            elif keyword == 'VAR' and len(tokens) >= 3:
+                var = (tokens[1], float if tokens[-2]=='MAG' else complex, int(tokens[-1]))
+                vars.append(var)
+                pending_vars.append(var)
+            
+            elif keyword == 'DATA' and len(tokens) >= 2:
+                pending_data.append((tokens[1], float if tokens[-1]=='MAG' else complex, [name for name,_,_ in vars], [length for _,_,length in vars]))
+            
+            elif keyword == 'VAR_LIST_BEGIN':
+                if len(pending_vars) < 1:
+                    raise ValueError('VAR_LIST_BEGIN without a matching VAR')
+                name, dtype, length = pending_vars.pop(0)
+                block_end = find_block_end(pos, 'VAR_LIST_END')
+                self._coords[name] = CitiReader._parse_values(text[pos:block_end], dtype, length)
+                pos = block_end + 1
+            
+            elif keyword == 'SEG_LIST_BEGIN':
+                if len(pending_vars) < 1:
+                    raise ValueError('SEG_LIST_BEGIN without a matching VAR')
+                name, dtype, length = pending_vars.pop(0)
+                block_end = find_block_end(pos, 'SEG_LIST_END')
+                values = CitiReader._parse_segments(text[pos:block_end])
+                if len(values) != length:
+                    raise ValueError(f'Expected {length} values for variable "{name}", got {len(values)}')
+                self._coords[name] = values.astype(dtype)
+                pos = block_end + 1
+            
+            elif keyword == 'BEGIN':
+                if len(pending_data) < 1:
+                    raise ValueError('BEGIN without a matching DATA')
+                name, dtype, dims, shape = pending_data.pop(0)
+                block_end = find_block_end(pos, 'END')
+                values = CitiReader._parse_values(text[pos:block_end], dtype, int(np.prod(shape)))
+                self._data[name] = (values.reshape(shape), dims)
+                pos = block_end + 1
+        
+        if n_packages < 1:
+            raise RuntimeError('No CITI file headers found')
+        for name,(_,dims) in self._data.items():
+            for dim in dims:
+                if dim not in self._coords:
+                    raise ValueError(f'No values given for variable "{dim}" of data variable "{name}"')
 
     @property
     def datas(self) -> list[str]:
-        return [name for name in self._citi.data_vars]
+        return list(self._data.keys())
 
     @property
-    def coords(self) -> dict[str,list[Any]]:
-        return {name: self._citi.coords[name] for name in self._citi.coords}
+    def coords(self) -> dict[str,np.ndarray]:
+        return dict(self._coords)
 
     @property
     def coord_names(self) -> list[str]:
         return 
 
     def guess_frequency_coord_name(self) -> str:
-        coord_names = [name for name in self._citi.coords]
+        return CitiReader.guess_frequency_name(list(self._coords.keys()))
+
+    @staticmethod
+    def guess_frequency_name(coord_names: list[str]) -> str:
         coord_names_lower = [name.lower() for name in coord_names]
         candidates = ['frequency', 'freq', 'f']
         for candidate in candidates:
@@ -45,19 +183,30 @@ class CitiReader:
                 for coord_name in coord_names:
                     if match == coord_name.lower():
                         return coord_name
-        raise RuntimeError(f'Unable to guess the frequency coordinate of CITI files (names are {self.coord_names})')
+        raise RuntimeError(f'Unable to guess the frequency coordinate of CITI files (names are {coord_names})')
 
-    def _get_comments(self) -> list[str]:
-        try:
-            comments = []
-            with open(self.filename, 'r') as fp:
-                for line in fp.readlines():
-                    if line.startswith('!') or line.startswith('#'):
-                        comments.append(line[1:].strip())
-            return comments
-        except Exception as ex:
-            logging.error(f'Unable to read comments form {self.filename} ({ex})')
-            return []
+    @staticmethod
+    def parse_sparam_name(name: str) -> "tuple[int,int]|tuple[None,None]":
+        """ Returns (egress port, ingress port) of a data variable name like "S[2,1]", or (None, None) if it is not an S-parameter """
+        if (m := re.match(r'S?([0-9,; ]+)', name, re.IGNORECASE)):
+            params = m.group(1)
+        elif (m := re.match(r'S\(([0-9,; ]+)\)', name, re.IGNORECASE)):
+            params = m.group(1)
+        elif (m := re.match(r'S\[([0-9,; ]+)\]', name, re.IGNORECASE)):
+            params = m.group(1)
+        elif (m := re.match(r'S\{([0-9,; ]+)\}', name, re.IGNORECASE)):
+            params = m.group(1)
+        else:
+            return None, None
+
+        if (m := re.match(r'([0-9]+)[,; ]([0-9]+)', params, re.IGNORECASE)):
+            return int(m.group(1)), int(m.group(2))
+        elif (m := re.match(r'([0-9])([0-9])', params, re.IGNORECASE)):
+            return int(m.group(1)), int(m.group(2))
+        elif (m := re.match(r'([0-9][0-9][0-9])([0-9][0-9][0-9])', params, re.IGNORECASE)):
+            return int(m.group(1)), int(m.group(2))
+        else:
+            return None, None
 
     def get_network(self, frequency_coord: "str|None", at_coords: dict[str,Any], select_default: bool = False) -> "tuple[NetworkExt,str]":
 
@@ -82,48 +231,25 @@ class CitiReader:
 
         f = None
         s_dict = {}
-        highest_port = 0
-
-        def parse_sparam_name(name):
-            if (m := re.match(r'S?([0-9,; ]+)', data_name, re.IGNORECASE)):
-                params = m.group(1)
-            elif (m := re.match(r'S\(([0-9,; ]+)\)', data_name, re.IGNORECASE)):
-                params = m.group(1)
-            elif (m := re.match(r'S\[([0-9,; ]+)\]', data_name, re.IGNORECASE)):
-                params = m.group(1)
-            elif (m := re.match(r'S\{([0-9,; ]+)\}', data_name, re.IGNORECASE)):
-                params = m.group(1)
-            else:
-                return None, None
-
-            if (m := re.match(r'([0-9]+)[,; ]([0-9]+)', params, re.IGNORECASE)):
-                return int(m.group(1)), int(m.group(2))
-            elif (m := re.match(r'([0-9])([0-9])', params, re.IGNORECASE)):
-                return int(m.group(1)), int(m.group(2))
-            elif (m := re.match(r'([0-9][0-9][0-9])([0-9][0-9][0-9])', params, re.IGNORECASE)):
-                return int(m.group(1)), int(m.group(2))
-            else:
-                return None, None
-
-        variable_mapping = {}
-        for data_name in self.datas:
+        variable_mapping, highest_port = self._get_sparam_mapping()
+        for data_name,dict_key in variable_mapping.items():
 
-            egress_port, ingress_port = parse_sparam_name(data_name)
-            if egress_port is None or ingress_port is None:
-                continue
-            variable_mapping[data_name] = (egress_port, ingress_port)
-            
-            dict_key = (egress_port,ingress_port)
-            highest_port = max(highest_port, max(egress_port, ingress_port))
-
-            data = self._citi.data_vars[data_name].sel(**at_coords)
-            s_dict[dict_key] = np.array(data)
+            data, dims = self._data[data_name]
+            index, remaining_dims = [], []
+            for dim in dims:
+                if dim in at_coords:
+                    matches = np.flatnonzero(self._coords[dim] == at_coords[dim])
+                    if len(matches) < 1:
+                        raise RuntimeError(f'Value {at_coords[dim]} not found in CITI coordinate "{dim}"')
+                    index.append(matches[0])
+                else:
+                    index.append(slice(None))
+                    remaining_dims.append(dim)
+            s_dict[dict_key] = data[tuple(index)]
         
-            if len(data.indexes.variables) != 1:
-                raise RuntimeError(f'Expected CITI data variable to have exactly one index, but got {len(data.indexes)}; please make sure you provide the appropriate amount of coordinates')
-            for key in data.indexes.variables.keys():
-                f = np.array(self._citi.coords[key])
-                break
+            if len(remaining_dims) != 1:
+                raise RuntimeError(f'Expected CITI data variable to have exactly one index, but got {len(remaining_dims)}; please make sure you provide the appropriate amount of coordinates')
+            f = np.array(self._coords[remaining_dims[0]])
         
         if f is None:
             raise RuntimeError(f'CITI file contains not usable data')
@@ -134,22 +260,84 @@ class CitiReader:
         for (ep,ip),s in s_dict.items():
             s_matrix[:,ep-1,ip-1] = s
         
+        nw = NetworkExt(f=f, f_unit='Hz', name=self._get_name(at_coords), s=s_matrix, comments=self._get_comment())
+        return nw, self._get_metadata(frequency_coord, at_coords, variable_mapping)
+
+    def get_networks(self, frequency_coord: "str|None" = None) -> "list[tuple[dict[str,Any],NetworkExt,str]]":
+        """
+        Returns (coordinate values, network, metadata) for every combination of the coordinates that the S-parameters are swept
+          over (i.e. all coordinates except frequency), in the order of the coordinates in the file.
+        
+        The whole S-matrix is built as one stacked array, and all networks share the same frequency object and hold views
+          into that array, so getting all slices is not more expensive than getting one.
+        """
+
+        if frequency_coord is None:
+            frequency_coord = self.guess_frequency_coord_name()
+        
+        variable_mapping, highest_port = self._get_sparam_mapping()
+        if highest_port < 1:
+            raise RuntimeError(f'Highest port number in CITI file is {highest_port}, expected 1 or more')
+        
+        swept_coords = []
+        for data_name in variable_mapping.keys():
+            _, dims = self._data[data_name]
+            if frequency_coord not in dims:
+                raise RuntimeError(f'CITI data variable "{data_name}" does not depend on the frequency coordinate "{frequency_coord}"')
+            swept_coords.extend([dim for dim in dims if dim != frequency_coord and dim not in swept_coords])
+        swept_coords = [name for name in self._coords.keys() if name in swept_coords]
+        swept_shape = [len(self._coords[name]) for name in swept_coords]
+        f = np.array(self._coords[frequency_coord])
+
+        # variables that do not depend on all swept coordinates are broadcast along the missing ones
+        s_stack = np.full([*swept_shape,len(f),highest_port,highest_port], np.nan, dtype=complex)
+        for data_name,(ep,ip) in variable_mapping.items():
+            data, dims = self._data[data_name]
+            data = data.transpose([dims.index(name) for name in swept_coords if name in dims] + [dims.index(frequency_coord)])
+            s_stack[...,ep-1,ip-1] = data.reshape([len(self._coords[name]) if name in dims else 1 for name in swept_coords] + [len(f)])
+        s_stack = s_stack.reshape([-1,len(f),highest_port,highest_port])
+
+        comment = self._get_comment()
+        frequency = None
+        result = []
+        for k,index in enumerate(np.ndindex(*swept_shape)):
+            at_coords = {name: self._coords[name][i] for name,i in zip(swept_coords, index)}
+            nw = NetworkExt(f=f, f_unit='Hz', name=self._get_name(at_coords), s=s_stack[k], comments=comment)
+            # skrf copies the arrays on construction; replace them by the shared ones
+            if frequency is None:
+                frequency = nw.frequency
+            nw._frequency, nw._s = frequency, s_stack[k]
+            result.append((at_coords, nw, self._get_metadata(frequency_coord, at_coords, variable_mapping)))
+        return result
+
+    def _get_sparam_mapping(self) -> "tuple[dict[str,tuple[int,int]],int]":
+        """ Returns {data variable name: (egress port, ingress port)} of all S-parameters, and the highest port number """
+        variable_mapping = {}
+        highest_port = 0
+        for data_name in self.datas:
+            egress_port, ingress_port = CitiReader.parse_sparam_name(data_name)
+            if egress_port is None or ingress_port is None:
+                continue
+            variable_mapping[data_name] = (egress_port, ingress_port)
+            highest_port = max(highest_port, max(egress_port, ingress_port))
+        return variable_mapping, highest_port
+
+    def _get_name(self, at_coords: dict[str,Any]) -> str:
         name = os.path.splitext(os.path.split(self.filename)[1])[0]
         for k,v in at_coords.items():
             name += f', {k}={v}'
-        
+        return name
+
+    def _get_comment(self) -> str:
         comments = []
-        
-        citi_comment = self._citi.attrs.get('comments', '')
-        if citi_comment:
-            comments.extend([comment for comment in str(citi_comment).splitlines() if comment])
-        
+        comments.extend([comment for comment in self._header_comments if comment])
         comments.extend(self.comments)
-        
+        return '\n'.join([comment for comment in comments if comment])
+
+    def _get_metadata(self, frequency_coord: str, at_coords: dict[str,Any], variable_mapping: dict[str,tuple[int,int]]) -> str:
         metadata_lines = []
         metadata_lines.append('CITI coordinates:')
-        for cname in self._citi.coords:
-            cdata = self._citi.coords[cname].data
+        for cname,cdata in self._coords.items():
             usage_str = 'used as frequency coordinate' if frequency_coord==cname else 'ignored'
             coord_sel_str = ''
             if cname in at_coords:
@@ -157,13 +345,8 @@ class CitiReader:
             metadata_lines.append(f'- "{cname}": {len(cdata)} × {cdata.dtype}, {usage_str}{coord_sel_str}')
         
         metadata_lines.append('CITI data variables:')
-        for vname in self._citi.data_vars:
-            vdata = self._citi.data_vars[vname]
+        for vname,(vdata,_) in self._data.items():
             usage_str = f'used as S-parameter [{variable_mapping[vname][0]},{variable_mapping[vname][1]}]' if vname in variable_mapping else 'ignored'
             metadata_lines.append(f'- "{vname}": {len(vdata)} × {vdata.dtype}, {usage_str}')
         
-        comment = '\n'.join([comment for comment in comments if comment])
-        metadata = '\n'.join(metadata_lines)
-
-        nw = NetworkExt(f=f, f_unit='Hz', name=name, s=s_matrix, comments=comment)
-        return nw, metadata
+        return '\n'.join(metadata_lines)
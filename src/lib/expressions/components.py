@@ -37,6 +37,10 @@ class ParametricNetwork(Network):
         return result
 
 
+    def _subexpression_key(self, anchors: list) -> None:
+        return None  # the network is re-calculated for the networks it is combined with, so results cannot be shared
+
+
 
 class R(ParametricNetwork):
     
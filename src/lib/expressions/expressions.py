@@ -4,18 +4,25 @@ from importlib.resources import path
 from ..sparam_file import SParamFile, PathExt
 from ..sparam_helpers import parse_quick_param
 from ..utils import natural_sort_key, make_filename_matcher
+from ..settings import Settings
 from .networks import Networks
 from .sparams import SParam, SParams, NumberType
 from .components import Components
+from .subexpressions import Subexpressions
 from .helpers import DefaultAction
 
 import os
+import ast
 import math
 import cmath
+import types
+import weakref
+import threading
 import numpy as np
 import logging
 import dataclasses
-from typing import Callable
+import collections
+from typing import Callable, Any
 
 
 SliderFnType = Callable[[bool,int|None,int|None],int]
@@ -27,6 +34,33 @@ class ExpressionParser:
     @dataclasses.dataclass
     class Result:
         default_actions_used: bool
+        from_memo: bool = False
+
+
+    @dataclasses.dataclass
+    class _Memo:
+        key: tuple
+        files: list[weakref.ref]
+        queries: list[tuple[str,tuple,Any]]  # (function name, arguments, returned value)
+        plot_calls: list[tuple]
+        log_messages: list[tuple[str,int,str]]  # (logger name, level, message)
+        default_actions_used: bool
+
+
+    class _LogRecorder(logging.Handler):
+        """ Records the messages that the evaluating thread logs, so that they can be logged again when the evaluation is replayed """
+        def __init__(self):
+            super().__init__()
+            self.thread = threading.get_ident()
+            self.messages: list[tuple[str,int,str]] = []
+        def emit(self, record: logging.LogRecord):
+            if record.thread == self.thread:
+                self.messages.append((record.name, record.levelno, record.getMessage()))
+
+
+    MAX_COMPILED = 64
+    _compiled: collections.OrderedDict[str,types.CodeType] = collections.OrderedDict()
+    _memo: ExpressionParser._Memo|None = None
 
 
     def __init__(self,
@@ -42,22 +76,145 @@ class ExpressionParser:
         self._available_networks = available_networks
         self._selected_networks = selected_networks
         self._ref_nw_name = ref_nw_name
-        self._slider_fn = slider_fn
+        self._default_actions = default_actions
+        self._plot_fn = plot_fn
+        self._slider_fn = self._recorded('slider', slider_fn)
+        self._plot_calls: list[tuple] = []
+        self._queries: list[tuple[str,tuple,Any]] = []
+
+        def record_plot(*args):
+            self._plot_calls.append(args)
+            plot_fn(*args)
         
-        SParam.setup(plot_fn)
-        Networks.setup(default_actions, slicer_fn)
+        SParam.setup(record_plot)
+        Networks.setup(default_actions, self._recorded('slicer', slicer_fn))
+
+
+    def _recorded(self, name: str, fn: Callable|None) -> Callable|None:
+        """ Wraps a GUI callback, so that its results can be checked again before a memoized evaluation is replayed """
+        if fn is None:
+            return None
+        def wrapper(*args):
+            result = fn(*args)
+            self._queries.append((name, args, result))
+            return result
+        return wrapper
 
     
-    def eval(self, code: str) -> ExpressionParser.Result:
+    def eval(self, code: str, memoize: bool = False) -> ExpressionParser.Result:
+        """
+        Evaluates <code>. With <memoize>, the plot calls and log messages of the last evaluation are replayed instead, if the code,
+          the files and the values returned by the slider/slicer are the same, so that a cosmetic change does not recalculate everything.
+        """
 
+        names = tuple(file.name for file in [*self._available_networks, *self._selected_networks])  # labels are used in the trace names
+        # the only setting that the evaluation depends on is <verbose>, which adds log messages; the plot settings are applied by the
+        #   plot function, which is called again on replay, and single precision only affects the networks, which are compared below
+        key = (code, self._ref_nw_name, repr(self._default_actions), len(self._available_networks), names, Settings.verbose)
+        self._plot_calls, self._queries = [], []
+        if memoize and self._replay_memo(key):
+            return ExpressionParser.Result(ExpressionParser._memo.default_actions_used, from_memo=True)
+
+        self._plot_calls, self._queries = [], []
         Networks.get_and_clear_default_actions_used()
         vars = self.get_vars()
-        exec(code, vars, vars)
+        log_recorder = ExpressionParser._LogRecorder()
+        logging.getLogger().addHandler(log_recorder)
+        Subexpressions.begin()  # common subexpressions of the script are only evaluated once
+        try:
+            exec(ExpressionParser._compile(code), vars, vars)
+        finally:
+            Subexpressions.end()
+            logging.getLogger().removeHandler(log_recorder)
         default_actions_used = Networks.get_and_clear_default_actions_used()
 
+        if memoize:
+            files = [weakref.ref(obj) for obj in self._get_file_identities()]
+            ExpressionParser._memo = ExpressionParser._Memo(key, files, self._queries, self._plot_calls, log_recorder.messages, default_actions_used)
+        
         return ExpressionParser.Result(default_actions_used)
 
 
+    @staticmethod
+    def _compile(code: str) -> types.CodeType:
+        compiled = ExpressionParser._compiled.get(code)
+        if compiled is not None:
+            ExpressionParser._compiled.move_to_end(code)
+            return compiled
+        compiled = compile(code, '<expression>', 'exec')
+        ExpressionParser._compiled[code] = compiled
+        while len(ExpressionParser._compiled) > ExpressionParser.MAX_COMPILED:
+            ExpressionParser._compiled.popitem(last=False)
+        return compiled
+
+
+    @staticmethod
+    def get_reachable_files(code: str, available_networks: list[SParamFile], selected_networks: list[SParamFile], ref_nw_name: str|None) -> list[SParamFile]:
+        """
+        Returns the files that <code> may access, so that they can be loaded before the evaluation: the selected files, and the
+          available files that match the patterns of nws(), nw() and saved_nw(). If a pattern cannot be determined without
+          evaluating the code (e.g. a variable), all available files are returned.
+        """
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return list(selected_networks)  # the evaluation fails anyway
+        
+        all_files = [*selected_networks, *[file for file in available_networks if file not in selected_networks]]
+        GLOBAL_FUNCTIONS = ['nws', 'nw', 'saved_nw']
+        calls = {id(node.func): node for node in ast.walk(tree) if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)}
+        patterns = []
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Name) or node.id not in GLOBAL_FUNCTIONS:
+                continue
+            if node.id == 'saved_nw':
+                if ref_nw_name is not None:
+                    patterns.append(ref_nw_name)
+                continue
+            call = calls.get(id(node))
+            if call is None:
+                return all_files  # e.g. passed as a function
+            args = [*call.args, *[keyword.value for keyword in call.keywords]]
+            if len(args) != 1 or not isinstance(args[0], ast.Constant) or not isinstance(args[0].value, str):
+                return all_files  # e.g. nws() or a variable
+            patterns.append(args[0].value)
+        
+        matchers = [make_filename_matcher(pattern) for pattern in patterns]
+        return [file for file in all_files if file in selected_networks or any(matcher(file.path) for matcher in matchers)]
+
+
+    @staticmethod
+    def clear_memo():
+        ExpressionParser._memo = None
+
+
+    def _get_file_identities(self) -> list:
+        """ Returns the loaded network of each file (or the file itself, if not loaded); a re-loaded or reduced file has a new network """
+        return [file._nw if file._nw is not None else file for file in [*self._available_networks, *self._selected_networks]]
+
+
+    def _replay_memo(self, key: tuple) -> bool:
+        memo = ExpressionParser._memo
+        if memo is None or memo.key != key:
+            return False
+        
+        identities = self._get_file_identities()
+        if len(identities) != len(memo.files) or any(ref() is not obj for ref,obj in zip(memo.files, identities)):
+            return False
+        
+        # the GUI must show the same slider/slicer as before, and they must be at the same position
+        callbacks = dict(slider=self._slider_fn, slicer=Networks._slicer_fn)
+        for name,args,result in memo.queries:
+            if callbacks[name] is None or callbacks[name](*args) != result:
+                return False
+
+        for name,level,message in memo.log_messages:
+            logging.getLogger(name).log(level, message)
+        for args in memo.plot_calls:
+            self._plot_fn(*args)
+        return True
+
+
     def get_vars(self) -> tuple[dict,dict]:
 
         def _select_networks(network_list: "list[SParamFile]", pattern: str|None, single: bool):
@@ -77,6 +234,7 @@ class ExpressionParser:
                         logging.info(f'The pattern "{pattern}" didn\'t match any networks; returning empty Networks object)')
             
             nws = sorted(nws, key=lambda nw: natural_sort_key(nw.path.final_name))
+            SParamFile.load_many(nws)  # parse all files at once, which is a lot faster when there are many of them
             return Networks(nws)
 
         def sel_nws(pattern: str|None = None) -> Networks:
@@ -4,18 +4,25 @@ import warnings
 from ..sparam_file import SParamFile, PathExt
 from ..bodefano import BodeFano
 from ..circles import StabilityCircle, NoiseCircle, BilateralPowerGainCircle
-from ..sparam_helpers import get_sparam_name, get_port_index, parse_quick_param
+from ..sparam_helpers import get_sparam_name, get_port_index, parse_quick_param, InterpolationTable, FrequencyIndex
 from .sparams import SParam, SParams, NumberType
 from .helpers import format_call_signature, DefaultAction
-from ..utils import sanitize_filename, get_subset, p2db
+from .subexpressions import Subexpressions, shared
+from ..utils import sanitize_filename, get_subset, p2db, is_ext_sweepable, is_ext_bundle
 from ..citi import CitiWriter
+from ..network_bundle import NetworkBundleWriter
 from ..si import SiValue
 from ..settings import Settings
 from ..network_ext import NetworkExt
+from ..quality_metrics import QualityMetrics
 from info import Info
 
 import math
+import copy
 import skrf
+import functools
+import threading
+import concurrent.futures
 import numpy as np
 import logging
 import re
@@ -33,15 +40,18 @@ class Network:
     def __init__(self, nw: "Network|NetworkExt|SParamFile" = None, name: str = None, original_files: "set[PathExt]" = None):
         self._nw: NetworkExt = None
         self.original_files: set[PathExt] = original_files or set()
+        self._file_path: PathExt|None = None  # only set if the network was loaded from a file, and not modified since
         
         if isinstance(nw, SParamFile):
             self._nw = nw.nw
             self.original_files.add(nw.path)
+            self._file_path = nw.path
             if name is None:
                 name = nw.name
         elif isinstance(nw, Network):
             self._nw = nw._nw
             self.original_files |= nw.original_files
+            self._file_path = nw._file_path
             if name is None:
                 name = nw._name
         elif isinstance(nw, NetworkExt):
@@ -54,8 +64,6 @@ class Network:
             raise ValueError(f'Invalid type to init Network object (<{nw}>)')
         
         self._name = name
-        
-        self._postponed_operations = []
     
 
     def _ready(self) -> bool:
@@ -64,33 +72,37 @@ class Network:
 
     def _ensure_ready(self) -> bool:
         assert self._ready(), 'Network is not ready'
-        self._run_postponed_operations()
-
-
-    def _run_postponed_operations(self):
-        assert self._ready(), 'Network is not ready'
-
-        # swap lists to avoid an infinite recursion...
-        operations_to_run, self._postponed_operations = self._postponed_operations, []
 
-        for method, args, kwargs in operations_to_run:
-            result = method(self, *args, **kwargs)
-            self._nw = result._nw
-            self._name = result._name
-            self.original_files = result.original_files
-        
 
     def _postponable(method):
+        # if the network is not ready yet (e.g. a parametric network), the result is a node that applies the method when the network is calculated
+        @functools.wraps(method)
         def wrapper(self: "Network", *args, **kwargs):
             if self._ready():
                 return method(self, *args, **kwargs)
             else:
-                import copy
-                obj = copy.deepcopy(self)
-                obj._postponed_operations.append((method, args, kwargs))
-                return obj
+                return PostponedNetwork(self, method, args, kwargs)
         return wrapper
 
+
+    def _subexpression_key(self, anchors: list) -> tuple|None:
+        if not self._ready():
+            return None  # e.g. a parametric network, which depends on the networks it is combined with
+        anchors.append(self._nw)
+        return ('Network', id(self._nw), self._name, str(self._file_path), frozenset(str(path) for path in self.original_files))
+
+
+    def _frozen(self) -> "Network":
+        """
+        Returns a copy whose S-matrix is read-only, because it is shared (see Subexpressions); the network itself is not modified,
+          since it might also be referenced elsewhere (e.g. it might be the network of a loaded file)
+        """
+        if not self._ready():
+            return self
+        result = copy.copy(self)
+        result._nw = self._nw.read_only_copy()
+        return result
+
     
     def _calculate(self, f: np.ndarray, z0: float):
         # to be implemented in derived classes; calling this should calculate and update the network (`self.nw`) based on the given frequency and reference impedance
@@ -150,17 +162,7 @@ class Network:
 
     @staticmethod
     def _get_interpolated_sparams(nw: NetworkExt, f: np.ndarray) -> NetworkExt:
-        
-        def interpolate_param(current_s: np.ndarray, current_f: np.ndarray, new_f: np.ndarray) -> np.ndarray:
-            current_mag, current_pha = np.abs(current_s), np.unwrap(np.angle(current_s))
-            interp_mag = np.interp(new_f, current_f, current_mag)
-            interp_pha = np.interp(new_f, current_f, current_pha)
-            return interp_mag * np.exp(1j*interp_pha)
-        
-        s_new = np.ndarray([len(f),nw.nports,nw.nports], dtype=complex)
-        for ep in range(nw.nports):
-            for ip in range(nw.nports):
-                s_new[:,ep,ip] = interpolate_param(nw.s[:,ep,ip], nw.f, f)
+        s_new = InterpolationTable.get(nw.f, f)(nw.s.astype(complex, copy=False))  # all parameters at once, in magnitude and unwrapped phase
         return NetworkExt(s=s_new, name=nw.name, z0=nw.z0[0,:], f=f, f_unit='Hz')
 
     
@@ -238,38 +240,37 @@ class Network:
     
 
     def z(self, egress_port = None, ingress_port = None, *, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> list[SParam]:
-        nw_transformed = self.nw.copy()
-        nw_transformed.s = self.nw.z
-        obj_transformed = Network(nw_transformed, self.name, original_files=self.original_files)
-        return obj_transformed._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='Z')
+        return self._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='Z', matrix=self._converted('z'))  # converted in double precision, which matters for the matrix inversion
     
 
     def y(self, egress_port = None, ingress_port = None, *, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> list[SParam]:
-        nw_transformed = self.nw.copy()
-        nw_transformed.s = self.nw.y
-        obj_transformed = Network(nw_transformed, self.name, original_files=self.original_files)
-        return obj_transformed._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='Y')
+        return self._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='Y', matrix=self._converted('y'))
     
 
     def abcd(self, egress_port = None, ingress_port = None, *, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> list[SParam]:
-        nw_transformed = self.nw.copy()
-        nw_transformed.s = self.nw.a
-        obj_transformed = Network(nw_transformed, self.name, original_files=self.original_files)
-        return obj_transformed._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='ABCD')
+        return self._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='ABCD', matrix=self._converted('a'))
     
 
     def t(self, egress_port = None, ingress_port = None, *, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> list[SParam]:
-        nw_transformed = self.nw.copy()
-        nw_transformed.s = self.nw.t
-        obj_transformed = Network(nw_transformed, self.name, original_files=self.original_files)
-        return obj_transformed._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='T')
+        return self._get_param(egress_port, ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name, param_prefix='T', matrix=self._converted('t'))
     
 
-    def _get_param(self, egress_port = None, ingress_port = None, *, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None, param_prefix: str) -> list[SParam]:
+    def _converted(self, param: str) -> np.ndarray:
+        # shared by all calls on the same network while a script is evaluated (e.g. z(1,1) and z(2,1)), but not kept afterwards,
+        #   because the network might be the one of a loaded file, whose memory is limited (see NetworkMemory)
+        nw = self.nw
+        return Subexpressions.cached(('converted', id(nw), id(nw.s), id(nw.z0), param), [nw, nw.s, nw.z0], lambda: nw.converted(param))
+
+
+    def _get_param(self, egress_port = None, ingress_port = None, *, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None, param_prefix: str, matrix: np.ndarray|None = None) -> list[SParam]:
+        """ Returns the selected parameters from <matrix> (default: the S-matrix), which has the same shape as the S-matrix """
 
         result = []
         if not self.nw:
             return result
+        if matrix is None:
+            matrix = self.nw.s
+        dtype = np.complex64 if matrix.dtype == np.complex64 else complex
 
         ep_filter, ip_filter = None, None
         match (egress_port, ingress_port):
@@ -312,9 +313,8 @@ class Network:
                     param_label = name
                 else:
                     param_label = param_name
-                param_value = self.nw.s[:,ep-1,ip-1].astype(complex)
-
-                result.append(SParam(f'{self.name} {param_label}', self.nw.f, param_value, self.nw.z0[0,ep-1], original_files=self.original_files, param_type=param_name, number_type=NumberType.VectorLike))
+                param = SParam(f'{self.name} {param_label}', self.nw.f, matrix[:,ep-1,ip-1], self.nw.z0[0,ep-1], original_files=self.original_files, param_type=param_name, number_type=NumberType.VectorLike)
+                result.append(param._chained_copy(lambda s: s.astype(dtype)))  # copied from the matrix when it is needed, together with the following element-wise operations
         return result
     
 
@@ -351,34 +351,40 @@ class Network:
         raise ValueError('Interpolate(): invalid argument')
     
     
+    def sweep(self) -> "list[Network]":
+        self._ensure_ready()
+        path = self._file_path
+        if path is None:
+            raise RuntimeError(f'Network <{self._name}> was not loaded from a file, or was modified')
+        if path.is_sweep() or not is_ext_sweepable(path.arch_path_suffix if path.is_in_arch() else path.suffix):
+            return [self]  # not a swept file or bundle, so the network is the only slice
+        result = []
+        for label,nw,_ in SParamFile.read_sweep(path):
+            network = Network(nw, name=f'{self._name}, {label}', original_files={path})
+            network._file_path = PathExt(str(path), arch_path=path.arch_path, sweep=label)
+            result.append(network)
+        return result
+
+
     def interpolate(self, f_start_or_vector_or_reference: "np.ndarray|float|Network", f_stop: float = None, f_step: float = None, n: int = None, scale='lin')-> "Network":
         f = Network._get_interpolation_frequency(f_start_or_vector_or_reference=f_start_or_vector_or_reference, f_stop=f_stop, f_step=f_step, n=n, scale=scale)
         return self._interpolate(f)
 
 
     def crop_f(self, f_start: "float|None" = None, f_end: "float|None" = None) -> "Network":
-        f_start = -1e99 if f_start is None else f_start
-        f_end   = +1e99 if f_end   is None else f_end
-        idx0, idx1 = +1_000_000, -1_000_000
-        for idx,f in enumerate(self.nw.f):
-            if f>=f_start:
-                idx0 = min(idx,idx0)
-            if f<=f_end:
-                idx1 = max(idx,idx1)
-        assert 0<=idx0<len(self.nw.f) and 0<=idx1<len(self.nw.f), f'Expected indices to be within range of network, got {idx0}/{idx1} and length {len(self.nw.f)}'
-        if idx0<0 or idx1>=len(self.nw.f):
+        idx = FrequencyIndex.get(self.nw.f).range(f_start, f_end)
+        new_f = self.nw.f[idx]
+        if len(new_f) < 1:
             raise Exception('Network.crop_f(): frequency out of range')
-        new_f = self.nw.f[idx0:idx1+1]
-        new_s = self.nw.s[idx0:idx1+1,:,:]
-        new_nw = NetworkExt(name=self.name, f=new_f, s=new_s, f_unit='Hz', z0=self.nw.z0[0,:])
+        new_nw = NetworkExt(name=self.name, f=new_f, s=self.nw.s[idx,:,:], f_unit='Hz', z0=self.nw.z0[idx,:])
         return Network(new_nw, original_files=self.original_files)
     
 
     def at_f(self, f: float) -> "Network":
-        idx = np.argmin(np.abs(f - self.nw.f))
+        idx = FrequencyIndex.get(self.nw.f).nearest(f)
         new_f = self.nw.f[idx]
         new_s = self.nw.s[idx,:,:]
-        new_z0 = self.nw.s[idx,:]
+        new_z0 = self.nw.z0[idx,:]
         new_nw = NetworkExt(name=self.name, f=new_f, s=new_s, f_unit='Hz', z0=new_z0)
         return Network(new_nw, original_files=self.original_files)
 
@@ -427,7 +433,64 @@ class Network:
     def k(self):
         if self.nw.number_of_ports != 2:
             raise RuntimeError(f'Network.k(): cannot calculate stability factor of {self.name} (only valid for 2-port networks)')
-        return SParam(f'{self.name} k', self.nw.f, self.nw.stability, self.nw.z0[0,0], original_files=self.original_files, param_type='k', number_type=NumberType.PlainScalar)
+        return self._metric_sparam('k', 'k', Network._k_metric(self.nw.s), NumberType.PlainScalar)
+
+
+    def _metric_sparam(self, label: str, param_type: str, values: np.ndarray, number_type: NumberType) -> SParam:
+        return SParam(f'{self.name} {label}', self.nw.f, values, self.nw.z0[0,0], original_files=self.original_files, param_type=param_type, number_type=number_type)
+
+
+    # The metrics below are calculated from S-matrices of shape (..., frequencies, ports, ports), so that they can be calculated
+    #   for a stack of networks at once (see Networks._stack())
+
+    @staticmethod
+    def _k_metric(s: np.ndarray) -> np.ndarray:
+        # same as skrf.Network.stability
+        delta = s[...,0,0]*s[...,1,1] - s[...,0,1]*s[...,1,0]
+        denom = 2 * np.abs(s[...,0,1]) * np.abs(s[...,1,0])
+        num = 1 - np.abs(s[...,0,0])**2 - np.abs(s[...,1,1])**2 + np.abs(delta)**2
+        return np.divide(num, denom, out=np.full(num.shape, np.inf), where=denom!=0)
+
+
+    @staticmethod
+    def _mu_metric(s: np.ndarray, mu: int) -> np.ndarray:
+        # see https://eng.libretexts.org/Bookshelves/Electrical_Engineering/Electronics/Microwave_and_RF_Design_V%3A_Amplifiers_and_Oscillators_(Steer)/02%3A_Linear_Amplifiers/2.06%3A_Amplifier_Stability
+        if mu==1:
+            p1,p2 = 0,1
+        else:
+            p1,p2 = 1,0
+        delta = np.abs(s[...,0,0]*s[...,1,1] - s[...,0,1]*s[...,1,0])
+        return (1 - np.abs(s[...,p1,p1]**2)) / (np.abs(s[...,p2,p2]-np.conjugate(s[...,p1,p1])*delta) + np.abs(s[...,1,0]*s[...,0,1]))
+
+
+    @staticmethod
+    def _enforce_passivity_smatrix(s: np.ndarray, margin: float = 0.0) -> np.ndarray:
+        """
+        Returns a copy of the S-matrices <s> (shape (...,ports,ports)) where all singular values are limited to 1-<margin>, i.e. the nearest passive
+          S-matrices; the singular value decomposition is only calculated for matrices which are not passive
+        """
+        s_h = np.conjugate(np.swapaxes(s, -1, -2))
+        max_gain = np.linalg.eigvalsh(np.matmul(s_h, s))[...,-1]  # squared highest singular value
+        violating = max_gain > (1 - margin)**2
+        result = np.array(s, dtype=complex)
+        if np.any(violating):
+            u, sigma, vh = np.linalg.svd(result[violating])
+            result[violating] = np.matmul(u * np.minimum(sigma, 1 - margin)[...,np.newaxis,:], vh)
+        return result
+
+
+    @staticmethod
+    def _cascade_smatrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """ Cascades the 2-port S-matrices <a> and <b>, assuming the same reference impedance at all ports """
+        a11, a12, a21, a22 = a[...,0,0], a[...,0,1], a[...,1,0], a[...,1,1]
+        b11, b12, b21, b22 = b[...,0,0], b[...,0,1], b[...,1,0], b[...,1,1]
+        bounce = 1 / (1 - a22*b11)  # waves bouncing between both networks
+        result = np.empty(np.broadcast_shapes(a.shape, b.shape), dtype=complex)
+        result[...,0,0] = a11 + a12*b11*a21*bounce
+        result[...,0,1] = a12*b12*bounce
+        result[...,1,0] = b21*a21*bounce
+        result[...,1,1] = b22 + b21*a22*b12*bounce
+        return result
     
 
     def _delta(self) -> np.ndarray:
@@ -613,89 +676,43 @@ class Network:
             raise RuntimeError(f'Network.mu(mu): cannot calculate stability factor of {self.name} (only valid for 2-port networks)')
         if mu!=1 and mu!=2:
             raise RuntimeError(f'Network.mu(mu): argument mu must be 1 or 2')
-        # see https://eng.libretexts.org/Bookshelves/Electrical_Engineering/Electronics/Microwave_and_RF_Design_V%3A_Amplifiers_and_Oscillators_(Steer)/02%3A_Linear_Amplifiers/2.06%3A_Amplifier_Stability
-        if mu==1:
-            p1,p2 = 0,1
-        else:
-            p1,p2 = 1,0
-        stability_factor = (1 - np.abs(self.nw.s[:,p1,p1]**2)) / (np.abs(self.nw.s[:,p2,p2]-np.conjugate(self.nw.s[:,p1,p1])*self._delta()) + np.abs(self.nw.s[:,1,0]*self.nw.s[:,0,1]))
-        return SParam(f'{self.name} µ{mu}', self.nw.f, stability_factor, self.nw.z0[0,0], original_files=self.original_files, param_type=f'µ{mu}', number_type=NumberType.PlainScalar)
+        return self._metric_sparam(f'µ{mu}', f'µ{mu}', Network._mu_metric(self.nw.s, mu), NumberType.PlainScalar)
     
 
     def losslessness(self):
-        s = self.nw.s
-        
-        # A network is lossless if S^T x S* = U (see e.g. Pozar, 4.3). This function returns, per frequency,
-        #   the highest element of the matrix |S^T ⋅ S * - U|, i.e. if the result is 0, the network is lossless
-
-        st = np.transpose(s, (0,2,1))
-        sc = np.conjugate(s)
-        prod = np.matmul(st, sc)
-        target = np.eye(self.nw.nports)
-        errors = np.abs(prod - target)
-        result_metric = np.max(errors, axis=(1,2))  # should be zero if lossless
-        
-        return SParam(f'{self.name} Losslessness', self.nw.f, result_metric, self.nw.z0[0,0], original_files=self.original_files, param_type=f'losslessness', number_type=NumberType.PlainScalar)
+        return self._metric_sparam('Losslessness', 'losslessness', QualityMetrics.losslessness(self.nw.full_precision().s), NumberType.PlainScalar)
     
 
     def passivity(self):
-        s = self.nw.s
-        
-        # A network is passive if λ >= 0 for all eigenvalues λ of U - S^H ⋅ S (see <https://ibis.org/summits/nov10b/tseng.pdf> and also
-        #   <https://www.simberian.com/Presentations/Shlepnev_S_ParameterQualityMetrics_July2014_final.pdf>)
-        # This function returns, per frequency, max(0,λ) of the highest eigenvector λ, i.e. if the result is zero, the network is reciprocal.
-        s_h = np.conjugate(np.transpose(s, (0,2,1)))
-        prod = np.eye(self.nw.nports) - np.matmul(s_h, s)
+        return self._metric_sparam('Passivity', 'passivity', QualityMetrics.passivity(self.nw.full_precision().s), NumberType.PlainScalar)
+    
 
-        result_metric = np.zeros([len(self.nw.f)], dtype=float)
-        for idx in range(len(self.nw.f)):  # for each frequency
-            prod_submat = prod[idx,:,:]
-            eigenvalues = np.real(np.linalg.eigvals(prod_submat))
-            passivity_error = np.maximum(0, -eigenvalues)
-            worst_error = np.max(passivity_error)
-            result_metric[idx] = worst_error
-        
-        return SParam(f'{self.name} Passivity', self.nw.f, result_metric, self.nw.z0[0,0], original_files=self.original_files, param_type=f'passivity', number_type=NumberType.PlainScalar)
+    def enforce_passivity(self, margin: float = 0.0) -> "Network":
+        assert 0 <= margin < 1, f'Expected margin to be in the range 0..1, got {margin}'
+        nw = self.nw.copy()
+        nw.s = Network._enforce_passivity_smatrix(nw.s, margin)
+        return Network(nw, self.name, original_files=self.original_files)
     
 
     def reciprocity(self):
         if self.nw.nports < 2:
             raise RuntimeError(f'Network.reciprocity(): cannot calculate reciprocity of {self.name} (only valid for 2-port or higher networks)')
-        s = self.nw.s
-        
-        # A network is reciprocal if S^T = S (see e.g. Pozar, 1.9), This function returns, per frequency,
-        #   the highest element of the matrix |S^T-S|, i.e. if the result is zero, the network is reciprocal.
-
-        st = np.transpose(s, (0,2,1))
-        diff = st - s
-        absdiff = np.abs(diff)
-        result_metric = np.max(absdiff, axis=(1,2))  # should be zero if reciprocal
-
-        return SParam(f'{self.name} Reciprocity', self.nw.f, result_metric, self.nw.z0[0,0], original_files=self.original_files, param_type=f'reciprocity', number_type=NumberType.PlainScalar)
+        return self._metric_sparam('Reciprocity', 'reciprocity', QualityMetrics.reciprocity(self.nw.s), NumberType.PlainScalar)
     
 
     def symmetry(self):
         if self.nw.nports < 2:
             raise RuntimeError(f'Network.symmetry(): cannot calculate reciprocity of {self.name} (only valid for 2-port or higher networks)')
-        s = self.nw.s
-        
-        # I define a network as symmetric if it is reciprocal, and additionally Sii=Sjj=Skk..., This function returns, per frequency,
-        #   the highest element of the matrix |S^T-S|, plus the highest difference between any diagonal elements; i.e. if the result
-        #   is zero, the network is symmetric.
-
-        st = np.transpose(s, (0,2,1))
-        diff = st - s
-        absdiff = np.abs(diff)
-        result_metric_ij = np.max(absdiff, axis=(1,2))  # should be zero if reciprocal
-
-        result_metric_ii = np.zeros([len(self.nw.f)], dtype=float)
-        for i in range(self.nw.nports):
-            for j in range(self.nw.nports):
-                result_metric_ii = np.maximum(result_metric_ii, np.abs(s[:,i,i]-s[:,j,j]))
+        return self._metric_sparam('Symmetry', 'symmetry', QualityMetrics.symmetry(self.nw.s), NumberType.PlainScalar)
+    
 
-        result_metric = result_metric_ij + result_metric_ii
+    def causality(self):
+        return self._metric_sparam('Causality', 'causality', QualityMetrics.causality(self.nw.s), NumberType.PlainScalar)
+    
 
-        return SParam(f'{self.name} Symmetry', self.nw.f, result_metric, self.nw.z0[0,0], original_files=self.original_files, param_type=f'symmetry', number_type=NumberType.PlainScalar)
+    def quality(self) -> list[SParam]:
+        metrics = QualityMetrics.calculate(self.nw.s)
+        return [self._metric_sparam(name.capitalize(), name, values, NumberType.PlainScalar) for name,values in metrics.items()]
     
 
     def half(self, method: str = 'IEEE370NZC', side: int = 1) -> "Network":
@@ -727,7 +744,7 @@ class Network:
     
 
     def invert(self) -> "Network":
-        return Network(self.nw.inv, name='!'+self.name, original_files=self.original_files)
+        return Network(self.nw.full_precision().inv, name='!'+self.name, original_files=self.original_files)
 
     
     def add_pr(self, resistance: float, port: int = 1) -> "Network":
@@ -868,16 +885,24 @@ class Network:
         return Network(nw_renumbered, original_files=self.original_files)
 
 
+    def _get_export_nw(self) -> NetworkExt:
+        nw = self.nw.copy()
+        nw.comments = (nw.comments or '') + f'\nExported from {Info.AppName} {Info.AppVersionStr}'
+        return nw
+
+
     def save(self, filename: str):
         
-        nw = self.nw.copy()
-        nw.comments += f'\nExported from {Info.AppName} {Info.AppVersionStr}'
+        nw = self._get_export_nw()
         
         ext = os.path.splitext(filename)[1].lower()
         
         if ext=='.cti' or ext=='.citi':
             CitiWriter().write(nw, filename)
         
+        elif is_ext_bundle(ext):
+            NetworkBundleWriter.write([nw], filename)
+        
         elif m := re.match(r'\.s([0-9])+p', ext):
             n = int(m.group(1))
             if n != nw.nports:
@@ -897,6 +922,37 @@ class Network:
 
 
 
+class PostponedNetwork(Network):
+    """
+    The result of a method (see Network._postponable()) on a network that is not ready yet, e.g. a parametric network. It refers to
+      that source network, and applies the method whenever the source is calculated; so the operations on a parametric network
+      form a graph, which is evaluated when the frequencies and the reference impedance are known.
+    """
+
+    def __init__(self, source: Network, method: Callable, args: tuple, kwargs: dict):
+        super().__init__(None, original_files=set(source.original_files))
+        self._source, self._method, self._args, self._kwargs = source, method, args, kwargs
+
+
+    def _calculate(self, f: np.ndarray, z0: float):
+        self._source._calculate(f, z0)
+        if not self._source._ready():
+            return
+        result = self._method(self._source, *self._args, **self._kwargs)
+        self._nw, self._name, self.original_files = result._nw, result._name, result.original_files
+
+
+    def _interpolate(self, f: np.ndarray) -> "PostponedNetwork":
+        result = PostponedNetwork(self._source, self._method, self._args, self._kwargs)
+        result._calculate(f=f, z0=50)
+        return result
+
+
+    def _subexpression_key(self, anchors: list) -> None:
+        return None  # like the source, the result depends on the networks it is combined with
+
+
+
 class Networks:
 
     
@@ -942,6 +998,90 @@ class Networks:
         self.nws = [cast(nw) for nw in nws]
 
 
+    def _subexpression_key(self, anchors: list) -> tuple|None:
+        keys = [nw._subexpression_key(anchors) for nw in self.nws]
+        return None if any(key is None for key in keys) else ('Networks', *keys)
+
+
+    def _freeze(self):
+        self.nws = [nw._frozen() for nw in self.nws]
+
+
+    STACK_MIN_SIZE = 2
+
+
+    def _stack(self) -> tuple[np.ndarray,np.ndarray,np.ndarray]|None:
+        """
+        Returns (S, f, z0), where S holds the S-matrices of all networks as one array of shape (networks, frequencies, ports, ports), so that
+          an operation can be calculated for all networks at once. Only possible if all networks have the same frequencies, reference
+          impedances and ports (as is typical for Monte-Carlo runs), otherwise None is returned, and the networks must be processed one-by-one.
+
+        The result is a copy of all S-matrices, so it is not kept; repeated operations on the same networks are shared anyway (see Subexpressions).
+        """
+        if len(self.nws) < 1 or not all(nw._ready() for nw in self.nws):
+            return None
+        
+        first = self.nws[0].nw
+        f, z0, ports = first.f, first.z0, [str(p) for p in first.ports]
+        for network in self.nws[1:]:
+            nw = network.nw
+            if nw.s.shape != first.s.shape or not np.array_equal(nw.f, f) or not np.array_equal(nw.z0, z0) or [str(p) for p in nw.ports] != ports:
+                return None
+        
+        return np.stack([network.nw.s for network in self.nws]).astype(complex, copy=False), f, z0
+
+
+    def _stacked_binary_op(self, others: "Networks", operation_fn: Callable, operator_str: str, cascade: bool = False) -> "Networks|None":
+        """
+        Applies <operation_fn> to the stacked S-matrices of both operands (see _stack()); returns None if that is not possible. For
+          <cascade>, the networks must also be single-ended 2-ports with the same reference impedance at both ports.
+        """
+        if not isinstance(others, Networks) or max(len(self.nws), len(others.nws)) < Networks.STACK_MIN_SIZE:
+            return None
+        if len(self.nws) != len(others.nws) and len(self.nws) != 1 and len(others.nws) != 1:
+            return None
+        stack_a, stack_b = self._stack(), others._stack()
+        if stack_a is None or stack_b is None:
+            return None
+        (s_a, f, z0), (s_b, f_b, z0_b) = stack_a, stack_b
+        if s_a.shape[1:] != s_b.shape[1:] or not np.array_equal(f, f_b) or not np.array_equal(z0, z0_b):
+            return None
+        if cascade:
+            if s_a.shape[-1] != 2 or not np.all(z0 == z0.flat[0]):
+                return None
+            if not self.nws[0].nw.is_singleended or [str(p) for p in self.nws[0].nw.ports] != [str(p) for p in others.nws[0].nw.ports]:
+                return None
+
+        s_result = operation_fn(s_a, s_b)  # shapes are broadcast if one operand has a single network
+        result = []
+        for i,(a,b) in enumerate(zip(*Networks._broadcast(self, others))):
+            nw = a.nw.with_s(s_result[i])  # keeps the metadata (e.g. comments), like the operations on single networks
+            result.append(Network(nw, f'{a.name}{operator_str}{b.name}', original_files=a.original_files|b.original_files))
+        return Networks(nws=result)
+
+
+    def _stacked_unary_op(self, operation_fn: Callable) -> "Networks|None":
+        """ Applies <operation_fn> to the stacked S-matrices of all networks (see _stack()); returns None if that is not possible """
+        if len(self.nws) < Networks.STACK_MIN_SIZE or (stacked := self._stack()) is None:
+            return None
+        s_result = operation_fn(stacked[0])
+        result = []
+        for i,network in enumerate(self.nws):
+            result.append(Network(network.nw.with_s(s_result[i]), network.name, original_files=network.original_files))
+        return Networks(nws=result)
+
+
+    def _stacked_metric(self, metric_fn: Callable, label: str, param_type: str, number_type: NumberType, min_ports: int = 1, max_ports: int|None = None) -> SParams|None:
+        """ Calculates <metric_fn> for the stacked S-matrices of all networks (see _stack()); returns None if that is not possible """
+        if len(self.nws) < Networks.STACK_MIN_SIZE:
+            return None
+        stacked = self._stack()
+        if stacked is None or stacked[0].shape[-1] < min_ports or (max_ports is not None and stacked[0].shape[-1] > max_ports):
+            return None  # let the networks raise their warnings one-by-one
+        values = metric_fn(stacked[0])
+        return SParams(sps=[network._metric_sparam(label, param_type, values[i], number_type) for i,network in enumerate(self.nws)])
+
+
     def _calculate(self, f: np.ndarray, z0: float):
         for nw in self.nws:
             nw._calculate(f, z0)
@@ -969,17 +1109,78 @@ class Networks:
         raise ValueError(f'Cannot broadcast Networks of size {len(a.nws)} and {len(b.nws)}')
 
 
-    def _unary_op(self, fn, return_type, *args, **kwargs):
-        result = []
-        for nw in self.nws:
+    MIN_NETWORKS_FOR_PARALLEL = 4
+
+    _thread_pool: concurrent.futures.ThreadPoolExecutor|None = None
+    _thread_pool_workers: int = 0
+    _worker_state = threading.local()
+
+
+    @staticmethod
+    def _get_thread_pool(workers: int) -> concurrent.futures.ThreadPoolExecutor:
+        if Networks._thread_pool is None or Networks._thread_pool_workers != workers:
+            if Networks._thread_pool is not None:
+                Networks._thread_pool.shutdown(wait=False)
+            Networks._thread_pool = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix='Networks')
+            Networks._thread_pool_workers = workers
+        return Networks._thread_pool
+
+
+    @staticmethod
+    def _get_parallel_workers(calls: "list[tuple]", return_type) -> int:
+        """ Returns the number of threads for <calls> of a per-network operation (see Settings.expression_threads); 1 if they must run one-by-one """
+        if return_type not in (Networks, SParams):
+            return 1  # e.g. plots, which must be created in order
+        if len(calls) < Networks.MIN_NETWORKS_FOR_PARALLEL or getattr(Networks._worker_state, 'active', False):
+            return 1  # not worth it, or already running in a worker (which must not wait for other workers of the same pool)
+        if any(isinstance(operand, Network) and type(operand)._calculate is not Network._calculate for call in calls for operand in call):
+            return 1  # e.g. a parametric network, which is re-calculated for each network it is combined with
+        workers = Settings.expression_threads if Settings.expression_threads > 0 else (os.cpu_count() or 1)
+        return min(workers, len(calls))
+
+
+    @staticmethod
+    def _apply(fn, calls: "list[tuple]", return_type, *args, **kwargs) -> "Generator[tuple[Network,object,Exception|None]]":
+        """
+        Calls <fn>(*call, *<args>, **<kwargs>) for each of the <calls>, and yields (first operand, result, exception) per call,
+          in the order of the calls. The calls run in a pool of threads if possible (see _get_parallel_workers()); that pays
+          off because most operations spend their time in NumPy/LAPACK, which does not hold the GIL.
+        """
+        def run(call: tuple):
             try:
-                r = fn(nw, *args, **kwargs)
-                if hasattr(r, '__len__'):
-                    result.extend(r)
-                else:
-                    result.append(r)
+                return call[0], fn(*call, *args, **kwargs), None
             except Exception as ex:
+                return call[0], None, ex
+        
+        def run_in_worker(call: tuple):
+            Networks._worker_state.active = True
+            try:
+                return run(call)
+            finally:
+                Networks._worker_state.active = False
+
+        workers = Networks._get_parallel_workers(calls, return_type)
+        if workers < 2:
+            yield from map(run, calls)
+            return
+        
+        # catch_warnings() (e.g. in Network.half()) is not thread-safe, so blocks in different workers might restore each other's
+        #   filters; restore the filters of the calling thread when all workers are done
+        with warnings.catch_warnings():
+            futures = [Networks._get_thread_pool(workers).submit(run_in_worker, call) for call in calls]
+            outcomes = [future.result() for future in futures]
+        yield from outcomes
+
+
+    def _unary_op(self, fn, return_type, *args, **kwargs):
+        result = []
+        for nw,r,ex in Networks._apply(fn, [(nw,) for nw in self.nws], return_type, *args, **kwargs):
+            if ex is not None:
                 logging.warning(f'Method <{format_call_signature(fn,*args,**kwargs)})> on {nw} failed ({ex}), ignoring')
+            elif hasattr(r, '__len__'):
+                result.extend(r)
+            else:
+                result.append(r)
         if return_type == Networks:
             return Networks(nws=result)
         elif return_type == SParams:
@@ -990,15 +1191,13 @@ class Networks:
 
     def _binary_op(self, fn, others, return_type, *args, **kwargs):
         result = []
-        for nw,other in zip(*Networks._broadcast(self, others)):
-            try:
-                r = fn(nw, other, *args, **kwargs)
-                if hasattr(r, '__len__'):
-                    result.extend(r)
-                else:
-                    result.append(r)
-            except Exception as ex:
+        for nw,r,ex in Networks._apply(fn, list(zip(*Networks._broadcast(self, others))), return_type, *args, **kwargs):
+            if ex is not None:
                 logging.warning(f'Method <{format_call_signature(fn,args,kwargs)}> on {nw} failed ({ex}), ignoring')
+            elif hasattr(r, '__len__'):
+                result.extend(r)
+            else:
+                result.append(r)
         if return_type == Networks:
             return Networks(nws=result)
         elif return_type == SParams:
@@ -1007,32 +1206,39 @@ class Networks:
             return result
 
 
+    @shared
     def __add__(self, other: "Networks|float") -> "Networks":
-        return self._binary_op(Network.__add__, other, Networks)
+        return self._stacked_binary_op(other, lambda s1,s2: s1+s2, '+') or self._binary_op(Network.__add__, other, Networks)
 
 
+    @shared
     def __sub__(self, other: "Networks|float") -> "Networks":
-        return self._binary_op(Network.__sub__, other, Networks)
+        return self._stacked_binary_op(other, lambda s1,s2: s1-s2, '-') or self._binary_op(Network.__sub__, other, Networks)
 
 
+    @shared
     def __matmul__(self, other: "Networks") -> "Networks":
-        return self._binary_op(Network.__matmul__, other, Networks)
+        return self._stacked_binary_op(other, lambda s1,s2: s1@s2, '@') or self._binary_op(Network.__matmul__, other, Networks)
 
 
+    @shared
     def __mul__(self, other: "Networks|float") -> "Networks":
-        return self._binary_op(Network.__mul__, other, Networks)
+        return self._stacked_binary_op(other, lambda s1,s2: s1*s2, '*') or self._binary_op(Network.__mul__, other, Networks)
 
 
+    @shared
     def __truediv__(self, other: "Networks|float") -> "Networks":
-        return self._binary_op(Network.__truediv__, other, Networks)
+        return self._stacked_binary_op(other, lambda s1,s2: s1/s2, '/') or self._binary_op(Network.__truediv__, other, Networks)
 
 
+    @shared
     def __invert__(self) -> "Networks":
         return self._unary_op(Network.__invert__, Networks)
 
 
+    @shared
     def __pow__(self, other: "Networks") -> "Networks":
-        return self._binary_op(Network.__pow__, other, Networks)
+        return self._stacked_binary_op(other, Network._cascade_smatrix, '∘', cascade=True) or self._binary_op(Network.__pow__, other, Networks)
     
 
     def __repr__(self):
@@ -1087,59 +1293,80 @@ class Networks:
         return Networks(matching_nws)
     
 
+    @shared
+    def sweep(self) -> "Networks":
+        return self._unary_op(Network.sweep, Networks)
+
+
     def sel_params(self) -> SParams:
         return self._unary_op(Network.sel_params, SParams)
 
 
+    @shared
     def s(self, egress_port = None, ingress_port = None, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> SParams:
         return self._unary_op(Network.s, SParams, egress_port=egress_port, ingress_port=ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name)
     
 
+    @shared
     def z(self, egress_port = None, ingress_port = None, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> SParams:
         return self._unary_op(Network.z, SParams, egress_port=egress_port, ingress_port=ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name)
     
 
+    @shared
     def y(self, egress_port = None, ingress_port = None, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> SParams:
         return self._unary_op(Network.y, SParams, egress_port=egress_port, ingress_port=ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name)
     
 
+    @shared
     def t(self, egress_port = None, ingress_port = None, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> SParams:
         return self._unary_op(Network.t, SParams, egress_port=egress_port, ingress_port=ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name)
     
 
+    @shared
     def abcd(self, egress_port = None, ingress_port = None, rl_only: bool = False, il_only: bool = False, fwd_il_only: bool = False, rev_il_only: bool = False, name: str = None) -> SParams:
         return self._unary_op(Network.abcd, SParams, egress_port=egress_port, ingress_port=ingress_port, rl_only=rl_only, il_only=il_only, fwd_il_only=fwd_il_only, rev_il_only=rev_il_only, name=name)
     
     
+    @shared
     def interpolate(self, f_start_or_vector_or_reference: "np.ndarray|float", f_stop: float = None, f_step: float = None, n: int = None, scale='lin', **kwargs)-> "Networks":
         return self._unary_op(Network.interpolate, Networks, f_start_or_vector_or_reference=f_start_or_vector_or_reference, f_stop=f_stop, f_step=f_step, n=n, scale=scale, **kwargs)
 
 
+    @shared
     def crop_f(self, f_start: "float|None" = None, f_end: "float|None" = None) -> "Networks":
         return self._unary_op(Network.crop_f, Networks, f_start=f_start, f_end=f_end)
     
 
+    @shared
     def at_f(self, f: float) -> "Networks":
         return self._unary_op(Network.at_f, Networks, f=f)
 
     
+    @shared
     def shunt(self, gamma_term: complex = -1) -> "Networks":
         return self._unary_op(Network.shunt, Networks, gamma_term=gamma_term)
     
 
+    @shared
     def k(self):
-        return self._unary_op(Network.k, SParams)
+        return self._stacked_metric(Network._k_metric, 'k', 'k', NumberType.PlainScalar, min_ports=2, max_ports=2) or self._unary_op(Network.k, SParams)
         
     
+    @shared
     def delta(self):
         return self._unary_op(Network.delta, SParams)
         
     
+    @shared
     def b1(self):
         return self._unary_op(Network.b1, SParams)
         
     
+    @shared
     def mu(self, mu: int = 1):
+        if mu in [1, 2]:
+            if (result := self._stacked_metric(lambda s: Network._mu_metric(s, mu), f'µ{mu}', f'µ{mu}', NumberType.PlainScalar, min_ports=2, max_ports=2)):
+                return result
         return self._unary_op(Network.mu, SParams, mu=mu)
     
 
@@ -1147,30 +1374,37 @@ class Networks:
         self._unary_op(Network.plot_stab, None, f=f, n=n, port=port, n_points=n_points, label=label, style=style)
         
     
+    @shared
     def nf(self, z: complex|None = None):
         return self._unary_op(Network.nf, SParams, z=z)
         
     
+    @shared
     def noisefactor(self, z: complex|None = None):
         return self._unary_op(Network.noisefactor, SParams, z=z)
         
     
+    @shared
     def nf_min(self):
         return self._unary_op(Network.nf_min, SParams)
         
     
+    @shared
     def noisefactor_min(self):
         return self._unary_op(Network.noisefactor_min, SParams)
         
     
+    @shared
     def gamma_opt(self):
         return self._unary_op(Network.gamma_opt, SParams)
         
     
+    @shared
     def z_opt(self):
         return self._unary_op(Network.z_opt, SParams)
         
     
+    @shared
     def rn(self):
         return self._unary_op(Network.rn, SParams)
     
@@ -1189,42 +1423,71 @@ class Networks:
         self._unary_op(Network.plot_gp, None, f=f, n=n, gp=gp, n_points=n_points, label=label, style=style)
 
     
+    @shared
     def mag(self):
         return self._unary_op(Network.mag, SParams)
     
     
+    @shared
     def msg(self):
         return self._unary_op(Network.msg, SParams)
     
     
+    @shared
     def u(self):
         return self._unary_op(Network.u, SParams)
 
     
+    @shared
     def passivity(self):
-        return self._unary_op(Network.passivity, SParams)
+        return self._stacked_metric(QualityMetrics.passivity, 'Passivity', 'passivity', NumberType.PlainScalar) or self._unary_op(Network.passivity, SParams)
         
     
+    @shared
+    def enforce_passivity(self, margin: float = 0.0) -> "Networks":
+        assert 0 <= margin < 1, f'Expected margin to be in the range 0..1, got {margin}'
+        return self._stacked_unary_op(lambda s: Network._enforce_passivity_smatrix(s, margin)) or self._unary_op(Network.enforce_passivity, Networks, margin=margin)
+    
+    
+    @shared
     def losslessness(self):
-        return self._unary_op(Network.losslessness, SParams)
+        return self._stacked_metric(QualityMetrics.losslessness, 'Losslessness', 'losslessness', NumberType.PlainScalar) or self._unary_op(Network.losslessness, SParams)
     
 
+    @shared
     def reciprocity(self):
-        return self._unary_op(Network.reciprocity, SParams)
+        return self._stacked_metric(QualityMetrics.reciprocity, 'Reciprocity', 'reciprocity', NumberType.PlainScalar, min_ports=2) or self._unary_op(Network.reciprocity, SParams)
     
 
+    @shared
     def symmetry(self):
-        return self._unary_op(Network.symmetry, SParams)
+        return self._stacked_metric(QualityMetrics.symmetry, 'Symmetry', 'symmetry', NumberType.PlainScalar, min_ports=2) or self._unary_op(Network.symmetry, SParams)
     
 
+    @shared
+    def causality(self):
+        return self._stacked_metric(QualityMetrics.causality, 'Causality', 'causality', NumberType.PlainScalar) or self._unary_op(Network.causality, SParams)
+    
+
+    @shared
+    def quality(self):
+        if len(self.nws) >= Networks.STACK_MIN_SIZE and (stacked := self._stack()) is not None:
+            metrics = QualityMetrics.calculate(stacked[0])  # all metrics of all networks in one pass
+            return SParams(sps=[network._metric_sparam(name.capitalize(), name, values[i], NumberType.PlainScalar) for i,network in enumerate(self.nws) for name,values in metrics.items()])
+        return self._unary_op(Network.quality, SParams)
+    
+
+    @shared
     def half(self, method: str = 'IEEE370NZC', side: int = 1) -> "Networks":
         return self._unary_op(Network.half, Networks, method=method, side=side)
 
     
+    @shared
     def flip(self) -> "Networks":
         return self._unary_op(Network.flip, Networks)
     
 
+    @shared
     def invert(self) -> "Networks":
         return self._unary_op(Network.invert, Networks)
 
@@ -1330,22 +1593,27 @@ class Networks:
         self._unary_op(Network.quick, None, *items)
         
     
+    @shared
     def def_ports(self, ports: list[str]|str) -> "Networks":
         return self._unary_op(Network.def_ports, Networks, ports=ports)
         
     
+    @shared
     def m2s(self, ports: list[str]|str = None) -> "Networks":
         return self._unary_op(Network.m2s, Networks, ports=ports)
         
     
+    @shared
     def s2m(self, ports: list[str]|str = None) -> "Networks":
         return self._unary_op(Network.s2m, Networks, ports=ports)
     
 
+    @shared
     def renorm(self, z: "complex|list[complex]") -> "Networks":
         return self._unary_op(Network.renorm, Networks, z=z)
 
 
+    @shared
     def rewire(self, ports: list[int]) -> "Networks":
         return self._unary_op(Network.rewire, Networks, ports=ports)
 
@@ -1376,19 +1644,25 @@ class Networks:
         WILDCARD_NUM = '$NUM'
         WILDCARD_NAME = '$NAME'
 
+        if is_ext_bundle(os.path.splitext(filename)[1]):
+            # a bundle holds all networks in one file
+            NetworkBundleWriter.write([nw._get_export_nw() for nw in self.nws], filename)
+            logging.info(f'Saved {len(self.nws)} network(s) to <{filename}>')
+            return
+
         paths = []
         for i,nw in enumerate(self.nws):
             [dir, name] = os.path.split(filename)
             [name, ext] = os.path.splitext(name)
             name = name.replace(WILDCARD_NUM, str(i+1))
-            name = name.replace(WILDCARD_NUM, nw.name)
+            name = name.replace(WILDCARD_NAME, nw.name)
             name = sanitize_filename(name)
             path = os.path.abspath(os.path.join(dir, name+ext))
             paths.append(path)
         if (len(paths) > 1) and (len(paths) > len(set(paths))):
             raise RuntimeError(f'Filenames are not nunique; please use wildcards ("{WILDCARD_NAME}" or "{WILDCARD_NUM}) in the filename.')
         
-        for nw,path in zip(self.nws, path):
+        for nw,path in zip(self.nws, paths):
             try:
                 nw.save(path)
             except Exception as ex:
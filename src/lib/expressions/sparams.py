@@ -7,11 +7,12 @@ from ..utils import sanitize_filename, db2v, v2db
 from ..citi import CitiWriter
 from ..settings import Settings
 from ..file_config import FileConfig
-from ..sparam_helpers import interpolate_equidistant_freq, extrapolate_to_dc, ensure_equidistant_to_dc
+from ..sparam_helpers import interpolate_equidistant_freq, extrapolate_to_dc, ensure_equidistant_to_dc, InterpolationTable, FrequencyIndex
 from ..network_ext import NetworkExt
 from .helpers import format_call_signature
+from .subexpressions import Subexpressions, shared
 
-import skrf, math, os
+import math, os
 import numpy as np
 import fnmatch
 import logging
@@ -50,6 +51,8 @@ class SParam:
     
     _setup_complete: bool = False
 
+    BLOCK_SIZE = 16384  # element-wise chains are evaluated in blocks of this many values, so that the intermediate results stay in the CPU cache
+
 
     @staticmethod
     def setup(plot_fn: PlotFnType):
@@ -60,8 +63,83 @@ class SParam:
     def __init__(self, name: str, f: np.ndarray, s: np.ndarray, z0: float, original_files: set[PathExt] = None, param_type: str|None=None, number_type: NumberType = NumberType.VectorLike):
         assert SParam._setup_complete, 'SParam.setup() was not called'
         assert len(f) == len(s), f'Expected frequency and S vecors to have same length, got {len(f)} and {len(s)}'
-        self.name, self.f, self.s, self.z0, self.number_type = name, f, s, z0, number_type
+        self.name, self.f, self.z0, self.number_type = name, f, z0, number_type
         self.original_files, self.param_type = original_files or set(), param_type
+        self._s, self._base, self._chain = s, None, ()
+        self._frozen = False
+    
+
+    @property
+    def s(self) -> np.ndarray:
+        if self._s is None:
+            self._s = SParam._evaluate_chain(self._base, self._chain)
+            self._base, self._chain = None, ()
+            if self._frozen:
+                self._s = Subexpressions.read_only(self._s)
+        return self._s
+    
+
+    @s.setter
+    def s(self, s: np.ndarray):
+        self._s, self._base, self._chain = s, None, ()
+
+
+    def _chained_copy(self, step: "Callable[[np.ndarray],np.ndarray]", **kwargs) -> SParam:
+        """
+        Like _modified_copy(), but the values are the element-wise function <step> of the values of this parameter. The step is only
+          evaluated when the values are needed (e.g. for plotting), together with all steps since the last evaluated parameter, so
+          that a chain like `.s(2,1).db().norm(...)` is evaluated in one pass, without intermediate arrays.
+        """
+        if self._s is not None:
+            base, chain = self._s, (step,)
+        else:
+            base, chain = self._base, (*self._chain, step)
+        if np.ndim(base) != 1:
+            return self._modified_copy(s=step(np.asarray(self.s)), **kwargs)
+        result = self._modified_copy(s=base, **kwargs)
+        result._s, result._base, result._chain = None, base, chain
+        return result
+
+
+    @staticmethod
+    def _evaluate_chain(base: np.ndarray, chain: "tuple[Callable[[np.ndarray],np.ndarray],...]") -> np.ndarray:
+        """ Returns the result of all steps of <chain>, applied to <base>; in blocks of BLOCK_SIZE """
+        def apply(values):
+            for step in chain:
+                values = step(values)
+            return values
+        
+        base = np.asarray(base)
+        if len(chain) < 1:
+            return base.copy()
+        first = np.asarray(apply(base[:SParam.BLOCK_SIZE]))
+        if len(base) <= SParam.BLOCK_SIZE:
+            return first
+        result = np.empty(len(base), dtype=first.dtype)
+        result[:SParam.BLOCK_SIZE] = first
+        for i in range(SParam.BLOCK_SIZE, len(base), SParam.BLOCK_SIZE):
+            result[i:i+SParam.BLOCK_SIZE] = apply(base[i:i+SParam.BLOCK_SIZE])
+        return result
+
+
+    def _value_at(self, index: int):
+        """ Returns the value at <index>, without evaluating the whole chain """
+        if self._s is not None:
+            return np.asarray(self._s)[index]
+        return SParam._evaluate_chain(self._base[index:index+1], self._chain)[0]
+
+
+    def _subexpression_key(self, anchors: list) -> tuple:
+        anchors.append(self)
+        return ('SParam', id(self))
+
+
+    def _freeze(self):
+        """ Makes the frequencies and values read-only, because the parameter is shared (see Subexpressions) """
+        self._frozen = True
+        self.f = Subexpressions.read_only(self.f)
+        if self._s is not None:
+            self._s = Subexpressions.read_only(self._s)
     
 
     def _modified_copy(self, *, name: str|None = None, f: np.ndarray|None = None, s: np.ndarray|None = None, z0: float|None = None, original_files: set[PathExt] = None, param_type: str|None=None, number_type: NumberType|None = None) -> SParam:
@@ -76,6 +154,16 @@ class SParam:
         )
     
 
+    def _real_dtype(self) -> type:
+        """ Returns the real type that matches the precision of the data (float32 for single-precision networks) """
+        return SParam._real_dtype_of(self.s)
+
+
+    @staticmethod
+    def _real_dtype_of(values: np.ndarray) -> type:
+        return np.float32 if np.asarray(values).dtype in [np.complex64, np.float32] else float
+    
+
     @staticmethod
     def _adapt(*sparams: SParam) -> "tuple[np.ndarray,list[np.ndarray]]":
         if len(sparams) < 1:
@@ -107,14 +195,16 @@ class SParam:
         f_all = np.unique(np.concatenate([sparam.f for sparam in sparams]))
         f_new = np.array([f for f in f_all if f_min<=f<=f_max])
 
-        freq_new = skrf.Frequency.from_f(f_new, unit='Hz')
-        nws_new = [NetworkExt(f=sparam.f, s=sparam.s, f_unit='Hz').interpolate(freq_new) for sparam in sparams]
-        s_new = [np.array(np.ndarray.flatten(nw.s)) for nw in nws_new]
-        return freq_new.f, s_new
+        s_new = [InterpolationTable.get(sparam.f, f_new)(np.ndarray.flatten(sparam.s), polar=False) for sparam in sparams]
+        return f_new, s_new
     
 
     @staticmethod
     def _op(a: "SParam", b: "SParam", op: "Callable", op_type_str: str = '.op.', number_type: NumberType = None) -> "SParam":
+        if isinstance(a, (int,float,complex)):
+            return b._chained_copy(lambda s: op(a,np.ravel(s)), param_type='const')
+        if isinstance(b, (int,float,complex)):
+            return a._chained_copy(lambda s: op(np.ravel(s),b), param_type='const')
         if isinstance(a, (int,float,complex,np.ndarray)):
             return SParam(b.name, b.f, op(a,np.array(np.ndarray.flatten(b.s))), z0=b.z0, original_files=b.original_files, param_type='const', number_type=b.number_type)
         if isinstance(b, (int,float,complex,np.ndarray)):
@@ -167,34 +257,36 @@ class SParam:
 
 
     def __invert__(self) -> "SParam":
-        return self._modified_copy(s=1/self.s, param_type=self.param_type+'.inv')
+        return self._chained_copy(lambda s: 1/s, param_type=self.param_type+'.inv')
 
     
     def abs(self) -> "SParam":
-        return self._modified_copy(s=np.abs(self.s), param_type=self.param_type+'.abs', number_type=NumberType.MagnitudeLike)
+        return self._chained_copy(np.abs, param_type=self.param_type+'.abs', number_type=NumberType.MagnitudeLike)
 
     
     def db(self) -> "SParam":
-        return self._modified_copy(s=20*np.log10(np.maximum(1e-15,np.abs(self.s))).astype(float), param_type=self.param_type+'.db', number_type=NumberType.PlainScalar)
+        return self.db20()
 
     
     def db10(self) -> "SParam":
-        return self._modified_copy(s=10*np.log10(np.maximum(1e-30,np.abs(self.s))).astype(float), param_type=self.param_type+'.db', number_type=NumberType.PlainScalar)
+        return self._chained_copy(lambda s: 10*np.log10(np.maximum(1e-30,np.abs(s))).astype(SParam._real_dtype_of(s), copy=False), param_type=self.param_type+'.db', number_type=NumberType.PlainScalar)
 
     
     def db20(self) -> "SParam":
-        return self._modified_copy(s=20*np.log10(np.maximum(1e-15,np.abs(self.s))).astype(float), param_type=self.param_type+'.db', number_type=NumberType.PlainScalar)
+        return self._chained_copy(lambda s: 20*np.log10(np.maximum(1e-15,np.abs(s))).astype(SParam._real_dtype_of(s), copy=False), param_type=self.param_type+'.db', number_type=NumberType.PlainScalar)
 
     
     def ml(self) -> "SParam":
-        return self._modified_copy(name=self.name+' ML', s=np.sqrt(1-(np.abs(self.s)**2)).astype(complex), param_type=self.param_type+'.ml', number_type=NumberType.MagnitudeLike)
+        return self._chained_copy(lambda s: np.sqrt(1-(np.abs(s)**2)).astype(complex), name=self.name+' ML', param_type=self.param_type+'.ml', number_type=NumberType.MagnitudeLike)
 
     
     def vswr(self) -> "SParam":
-        return self._modified_copy(name=self.name+' VSWR', s=(1+np.abs(self.s))/(1-np.abs(self.s)).astype(float), param_type=self.param_type+'.vswr', number_type=NumberType.PlainScalar)
+        return self._chained_copy(lambda s: (1+np.abs(s))/(1-np.abs(s)).astype(SParam._real_dtype_of(s), copy=False), name=self.name+' VSWR', param_type=self.param_type+'.vswr', number_type=NumberType.PlainScalar)
 
     
     def phase(self, processing: "str|None" = None) -> "SParam":
+        if processing is None:
+            return self._chained_copy(lambda s: np.angle(s).astype(SParam._real_dtype_of(s), copy=False), param_type=self.param_type+'.pha', number_type=NumberType.PlainScalar)
         s = self.s
         s = np.angle(s)
         if processing == 'remove_linear':
@@ -203,20 +295,18 @@ class SParam:
             s = np.unwrap(s)
         elif s is not None:
             raise ValueError(f'Invalid processing option "{processing}"')
-        return self._modified_copy(s=s.astype(float), param_type=self.param_type+'.pha', number_type=NumberType.PlainScalar)
+        return self._modified_copy(s=s.astype(self._real_dtype()), param_type=self.param_type+'.pha', number_type=NumberType.PlainScalar)
 
 
     def norm(self, at_f: float, method='div') -> "SParam":
-        idx = np.argmin(np.abs(self.f - at_f))
-        ref = self.s[idx]
-        s = self.s.copy()
+        ref = self._value_at(FrequencyIndex.get(self.f).nearest(at_f))
         if method == 'div':
-            s = s / ref
+            step = lambda s: s / ref
         elif method == 'sub':
-            s = s - ref
+            step = lambda s: s - ref
         else:
             raise ValueError(f'Expected method to be "div" or "sub", got "{method}"')
-        return self._modified_copy(s=s, name=f'{self.name} norm.', param_type=self.param_type+'.norm')
+        return self._chained_copy(step, name=f'{self.name} norm.', param_type=self.param_type+'.norm')
 
     
     @staticmethod
@@ -233,12 +323,10 @@ class SParam:
 
     
     def crop_f(self, f_start: "float|None" = None, f_end: "float|None" = None) -> "SParam":
-        f_start = -1e99 if f_start is None else f_start
-        f_end   = +1e99 if f_end   is None else f_end
-        new = [(f,s) for (f,s) in zip(self.f, self.s) if f_start<=f<=f_end]
-        if len(new)<1:
+        idx = FrequencyIndex.get(self.f).range(f_start, f_end)
+        new_f, new_s = np.array(np.asarray(self.f)[idx]), np.array(np.asarray(self.s)[idx])  # copies, so that the result does not alias the original
+        if len(new_f)<1:
             raise Exception('SParam.crop_f(): frequency out of range')
-        new_f, new_s = zip(*new)
         return self._modified_copy(f=new_f, s=new_s)
 
 
@@ -348,6 +436,15 @@ class SParams:
 
     def __init__(self, sps: "list[SParam]"):
         self.sps = sps
+
+
+    def _subexpression_key(self, anchors: list) -> tuple:
+        return ('SParams', *[sp._subexpression_key(anchors) for sp in self.sps])
+
+
+    def _freeze(self):
+        for sp in self.sps:
+            sp._freeze()
     
     
     @staticmethod
@@ -398,70 +495,87 @@ class SParams:
             return result
 
         
+    @shared
     def __truediv__(self, others: "SParams|float") -> "SParams":
         return self._binary_op(SParam.__truediv__, others, True)
 
 
+    @shared
     def __rtruediv__(self, others: "SParams|float") -> "SParams":
         return self._binary_op(SParam.__rtruediv__, others, True)
 
         
+    @shared
     def __mul__(self, others: "SParams|float") -> "SParams":
         return self._binary_op(SParam.__mul__, others, True)
 
 
+    @shared
     def __rmul__(self, others: "SParams|float") -> "SParams":
         return self._binary_op(SParam.__rmul__, others, True)
 
         
+    @shared
     def __pow__(self, others: "SParams|float") -> "SParams":
         return self._binary_op(SParam.__pow__, others, True)
 
 
+    @shared
     def __rpow__(self, others: "SParams|float") -> "SParams":
         return self._binary_op(SParam.__rpow__, others, True)
         
 
+    @shared
     def __add__(self, others: "SParams|float") -> "SParams":
         return self._binary_op(SParam.__add__, others, True)
 
 
+    @shared
     def __radd__(self, others: "SParams|float") -> "SParams":
         return self._binary_op(SParam.__radd__, others, True)
         
 
+    @shared
     def __sub__(self, others: "SParams|float") -> "SParams":
         return self._binary_op(SParam.__sub__, others, True)
 
 
+    @shared
     def __rsub__(self, others: "SParams|float") -> "SParams":
         return self._binary_op(SParam.__rsub__, others, True)
 
 
+    @shared
     def __invert__(self) -> "SParams":
         return self._unary_op(SParam.__invert__, True)
     
 
+    @shared
     def abs(self) -> "SParams":
         return self._unary_op(SParam.abs, True)
     
 
+    @shared
     def db(self) -> "SParams":
         return self._unary_op(SParam.db, True)
     
 
+    @shared
     def ml(self) -> "SParams":
         return self._unary_op(SParam.ml, True)
     
 
+    @shared
     def vswr(self) -> "SParams":
         return self._unary_op(SParam.vswr, True)
 
     
+    @shared
     def phase(self, processing: "str|None" = None) -> "SParams":
         return self._unary_op(SParam.phase, True, processing=processing)
 
 
+    @shared
     def norm(self, at_f: float, method='div') -> "SParams":
         return self._unary_op(SParam.norm, True, at_f=at_f, method=method)
 
@@ -488,25 +602,48 @@ class SParams:
                 logging.warning(f'Plotting of <{sp.name}> failed ({ex}), ignoring')
     
 
+    @shared
     def crop_f(self, f_start: "float|None" = None, f_end: "float|None" = None) -> "SParams":
         return self._unary_op(SParam.crop_f, True, f_start=f_start, f_end=f_end)
 
 
-    def _interpolate(self, f: np.ndarray):
-        if len(self.sps) < 1:
-            return SParams(sps=[])
-        result = []
-        for sp in self.sps:
+    def _resample(self, f: np.ndarray) -> "tuple[list[SParam],np.ndarray]":
+        """ Returns the parameters that could be interpolated to <f>, and their interpolated values as columns of one array """
+        
+        # parameters on the same frequency grid are interpolated at once
+        groups: dict[int,tuple[InterpolationTable,list[int]]] = {}
+        f_fingerprint = InterpolationTable.fingerprint(f)
+        for i,sp in enumerate(self.sps):
             try:
-                mag, pha = np.abs(sp.s), np.unwrap(np.angle(sp.s))
-                mag_int, pha_int = np.interp(f, sp.f, mag), np.interp(f, sp.f, pha)
-                s_int = mag_int * np.exp(1j*pha_int)
-                result.append(sp._modified_copy(f=f, s=s_int))
+                table = InterpolationTable.get(sp.f, f, f_fingerprint)
+                groups.setdefault(id(table), (table, []))[1].append(i)
             except Exception as ex:
                 logging.warning(f'Interpolating <{sp.name}> failed ({ex}), ignoring')
-        return SParams(sps=result)
+        
+        columns: dict[int,np.ndarray] = {}
+        for table,indices in groups.values():
+            try:
+                s_int = table(np.stack([np.asarray(self.sps[i].s).reshape(-1) for i in indices]).T)
+                for column,i in enumerate(indices):
+                    columns[i] = s_int[:,column]
+            except Exception as ex:
+                for i in indices:
+                    logging.warning(f'Interpolating <{self.sps[i].name}> failed ({ex}), ignoring')
+        
+        indices = sorted(columns.keys())
+        if len(indices) < 1:
+            return [], np.zeros((len(f), 0))
+        return [self.sps[i] for i in indices], np.stack([columns[i] for i in indices]).T
+
+
+    def _interpolate(self, f: np.ndarray):
+        if len(self.sps) < 1:
+            return SParams(sps=[])
+        sps, s_int = self._resample(f)
+        return SParams(sps=[sp._modified_copy(f=f, s=s_int[:,column]) for column,sp in enumerate(sps)])
 
 
+    @shared
     def interpolate_lin(self, f_start: float|None = None, f_end: float|None = None, n: int|None = None) -> SParams:
         f_start, f_end, n = self._fill_interpolation_params(f_start, f_end, n)
         assert f_start <= f_end, f'Expected f_start <= f_end, got {f_start} and {f_end}'
@@ -514,6 +651,7 @@ class SParams:
         return self._interpolate(np.linspace(f_start, f_end, n))
 
 
+    @shared
     def interpolate_log(self, f_start: float|None = None, f_end: float|None = None, n: int|None = None) -> SParams:
         f_start, f_end, n = self._fill_interpolation_params(f_start, f_end, n)
         assert f_start > 0, f'Expected f_start > 0, got {f_start}'
@@ -522,11 +660,13 @@ class SParams:
         return self._interpolate(np.geomspace(f_start, f_end, n))
 
 
+    @shared
     def interpolate(self, f_start: float|None = None, f_end: float|None = None, n: int|None = None) -> SParams:
         return self.interpolate_lin(f_start, f_end, n)
 
 
     # TODO: docs
+    @shared
     def extrapolate_to_dc(self, method='IEEE370') -> SParams: 
         return self._unary_op(SParam.extrapolate_to_dc, True, method=method)
 
@@ -556,25 +696,23 @@ class SParams:
 
 
     def _interpolated_fn(self, name, fn, min_size=1, type_str: str='.interp', enforce_real: bool=False, number_type: NumberType = None):
-        sps = self.interpolate().sps
         assert min_size >= 1
+        if len(self.sps) < 1:
+            return SParams(sps=[])
+        f_start, f_end, n = self._fill_interpolation_params()
+        f = np.linspace(f_start, f_end, n)
+        sps, s_int = self._resample(f)  # one column per parameter
         if len(sps) < min_size:
             return SParams(sps=[])
-        f = sps[0].f
         if number_type is None:
             number_type = sps[0].number_type
         
-        s_input = []
-        list_of_abs = []
-        for sp in sps:
-            if enforce_real and np.iscomplexobj(sp.s):
-                s_input.append(np.abs(sp.s).astype(float))
-                list_of_abs.append(sp.name)
-            else:
-                s_input.append(sp.s)
-        if list_of_abs and Settings.verbose:
-            logging.debug(f'Took absolute of S-parameters {list_of_abs}')
-        s = fn([s for s in s_input])
+        if enforce_real:
+            # the magnitude of every parameter, also of real ones (which the interpolation used to turn into complex values), so that all share one scale
+            if Settings.verbose:
+                logging.debug(f'Took absolute of S-parameters {[sp.name for sp in sps]}')
+            s_int = np.abs(s_int)
+        s = fn(s_int.T)
         return SParams(sps=[SParam(name, f, s, math.nan, param_type=type_str, number_type=number_type)])
 
 
@@ -583,6 +721,7 @@ class SParams:
         return lambda x: db2v(fn(v2db(x)))
     
     
+    @shared
     def mean(self, in_db = True):
         def _mean(s):
             return np.mean(s,axis=0)
@@ -590,6 +729,7 @@ class SParams:
         return self._interpolated_fn('Mean', fn, type_str='.mean', number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
 
 
+    @shared
     def median(self, in_db = True):
         def _median(s):
             return np.median(s,axis=0)
@@ -597,6 +737,7 @@ class SParams:
         return self._interpolated_fn('Median', fn, type_str='.median', number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
 
 
+    @shared
     def sdev(self, ddof=1, in_db = True):
         def _sdev(s):
             return np.std(s,axis=0,ddof=ddof)
@@ -604,6 +745,7 @@ class SParams:
         return self._interpolated_fn('StdDev', fn, min_size=2, type_str='.sdev', number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
 
 
+    @shared
     def rsdev(self, quantiles=50, in_db = True):
         if isinstance(quantiles,(int,float)):
             assert 0<quantiles<100, f'Expected quantile to be in the exlcusive range 0..100%, got {quantiles}'
@@ -621,6 +763,7 @@ class SParams:
         return self._interpolated_fn('RStdDev', fn, min_size=2, type_str='.rsdev', enforce_real=True, number_type=NumberType.MagnitudeLike)
 
 
+    @shared
     def min(self, in_db = True):
         def _min(s):
             return np.min(s,axis=0)
@@ -628,12 +771,14 @@ class SParams:
         return self._interpolated_fn('Min', fn, min_size=1, type_str='.min', enforce_real=True, number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
 
 
+    @shared
     def max(self, in_db = True):
         def _max(s):
             return np.max(s,axis=0)
         fn = SParams._wrap_calc_in_db(_max) if in_db else _max
         return self._interpolated_fn('Max', fn, min_size=1, type_str='.max', enforce_real=True, number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
 
+    @shared
     def pkpk(self, in_db = True):
         def _pkpk(s):
             return np.max(s,axis=0) - np.min(s,axis=0)
@@ -641,6 +786,7 @@ class SParams:
         return self._interpolated_fn('PkPk', fn, min_size=1, type_str='.pkpk', enforce_real=True, number_type=NumberType.MagnitudeLike if in_db else NumberType.VectorLike)
     
 
+    @shared
     def rl_avg(self, f_integrate_start: "float|EllipsisType" = ..., f_integrate_end: "float|EllipsisType" = ..., f_target_start: "float|EllipsisType" = ..., f_target_end: "float|EllipsisType" = ...) -> "SParams":
         return self._unary_op(SParam.rl_avg, True, f_integrate_start=f_integrate_start, f_integrate_end=f_integrate_end, f_target_start=f_target_start, f_target_end=f_target_end)
     
@@ -649,10 +795,12 @@ class SParams:
         return SParams(sps=[s.map(fn, f_arg) for s in self.sps])
 
     
+    @shared
     def rename(self, name: str=None, prefix: str=None, suffix: str=None, pattern: str=None, subs: str=None):
         return self._unary_op(SParam.rename, True, name=name, prefix=prefix, suffix=suffix, pattern=pattern, subs=subs)
 
     
+    @shared
     def smooth(self, winsize=None, order=None):
         return self._unary_op(SParam.smooth, True, winsize=winsize, order=order)
     
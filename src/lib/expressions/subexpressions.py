@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import functools
+import numpy as np
+from typing import Any, Callable
+
+
+
+class Subexpressions:
+    """
+    Common subexpressions of an expression script: while a script is evaluated (between begin() and end()), each call of a method
+      decorated with @shared is remembered, and a later call of the same method with the same operands and arguments returns the
+      same result instead of calculating it again; e.g. in `nws().half().s(2,1).plot()` and `nws().half().s(1,1).plot()`, the
+      networks are only de-embedded once.
+
+    Operands are identified by the objects they wrap (see _subexpression_key() of Network, Networks, SParam and SParams); calls
+      with operands or arguments that cannot be identified (e.g. user-provided functions) are not remembered.
+
+    Since every equal call gets the same result, results are made immutable (see _freeze() of Networks, SParam and SParams): their
+      arrays are read-only, so that e.g. a user-provided function cannot modify a result in-place for all others. Arrays that the
+      evaluation did not create (e.g. the S-matrix of a loaded file) are only frozen via read-only views, so they stay writeable.
+    """
+
+
+    _memo: dict[tuple,Any]|None = None
+    _anchors: list[Any] = []  # objects whose id() is part of a key; kept alive, so that the id is not re-used while the memo exists
+
+
+    @staticmethod
+    def begin():
+        Subexpressions._memo, Subexpressions._anchors = {}, []
+
+
+    @staticmethod
+    def end():
+        Subexpressions._memo, Subexpressions._anchors = None, []
+
+
+    @staticmethod
+    def active() -> bool:
+        return Subexpressions._memo is not None
+
+
+    @staticmethod
+    def make_key(value: Any, anchors: list[Any]) -> tuple|None:
+        """ Returns a hashable key that identifies <value> (appends objects identified by their id() to <anchors>), or None if that is not possible """
+        if value is None or value is ... or isinstance(value, (bool, int, float, complex, str)):
+            return (type(value).__name__, value)
+        if isinstance(value, (tuple, list)):
+            keys = [Subexpressions.make_key(item, anchors) for item in value]
+            return None if any(key is None for key in keys) else (type(value).__name__, *keys)
+        if isinstance(value, dict):
+            keys = [(name, Subexpressions.make_key(item, anchors)) for name,item in sorted(value.items())]
+            return None if any(key is None for _,key in keys) else ('dict', *keys)
+        if isinstance(value, np.ndarray):
+            return ('ndarray', value.dtype.str, value.shape, value.tobytes())
+        if isinstance(value, np.generic):
+            return (type(value).__name__, value.item())
+        if hasattr(value, '_subexpression_key'):
+            return value._subexpression_key(anchors)
+        return None
+
+
+    @staticmethod
+    def read_only(values: np.ndarray) -> np.ndarray:
+        """ Returns a read-only view of <values> """
+        view = np.asarray(values).view()
+        view.flags.writeable = False
+        return view
+
+
+    @staticmethod
+    def cached(key: tuple, anchors: list[Any], fn: Callable[[],Any]) -> Any:
+        """
+        Returns <fn>(), re-using the result of an earlier call with the same <key> while a script is evaluated; <anchors> are the
+          objects that are identified by their id() in <key>. Unlike with @shared, the result is not made immutable.
+        """
+        if not Subexpressions.active():
+            return fn()
+        key = ('cached', *key)
+        if key in Subexpressions._memo:
+            return Subexpressions._memo[key]
+        result = fn()
+        if Subexpressions._memo is not None:
+            Subexpressions._memo[key] = result
+            Subexpressions._anchors.extend(anchors)
+        return result
+
+
+    @staticmethod
+    def call(method: Callable, obj: Any, args: tuple, kwargs: dict) -> Any:
+        """ Returns the result of <method>(<obj>, *<args>, **<kwargs>), re-using the result of an earlier call with the same operands and arguments """
+        anchors = []
+        key = Subexpressions.make_key((obj, args, kwargs), anchors)
+        if key is None:
+            return method(obj, *args, **kwargs)
+        key = (method, key)
+        if key in Subexpressions._memo:
+            return Subexpressions._memo[key]
+        result = method(obj, *args, **kwargs)
+        if Subexpressions._memo is not None:  # the method might have ended the evaluation
+            if hasattr(result, '_freeze'):
+                result._freeze()
+            Subexpressions._memo[key] = result
+            Subexpressions._anchors.extend(anchors)
+        return result
+
+
+
+def shared(method: Callable) -> Callable:
+    """ Decorator for methods without side effects, whose (immutable) results can be shared by all equal calls in an expression script (see Subexpressions) """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not Subexpressions.active():
+            return method(self, *args, **kwargs)
+        return Subexpressions.call(method, self, args, kwargs)
+    return wrapper
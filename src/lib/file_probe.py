@@ -0,0 +1,227 @@
+from __future__ import annotations
+from .network_ext import NetworkExt
+from .path_ext import PathExt
+from .citi.citireader import CitiReader
+from .network_bundle import NetworkBundleReader
+from .utils import read_file_from_archive, is_ext_bundle
+
+import os
+import re
+import dataclasses
+from typing import Callable
+
+
+
+@dataclasses.dataclass
+class FileProbe:
+    """
+    Port count and frequency range of a file, determined without parsing the whole file.
+
+    For Touchstone files, only the header, the first and the last data record are read. Unless the file has a
+      [Number of Frequencies] keyword, the number of points is estimated from the file size (<n_points_exact> is
+      then False). For CITI files, the VAR/DATA headers and the frequency list are read; for network bundles, just
+      the frequency grid.
+    """
+
+    n_ports: int
+    f_start: float
+    f_stop: float
+    n_points: int
+    n_points_exact: bool = True
+
+
+    HEAD_SIZE = 4096
+    TAIL_SIZE = 4096
+    MIN_RECORDS = 8
+
+
+    @staticmethod
+    def from_network(nw: NetworkExt) -> FileProbe:
+        return FileProbe(nw.number_of_ports, float(nw.f[0]), float(nw.f[-1]), len(nw.f))
+
+
+    @staticmethod
+    def from_file(path: PathExt) -> FileProbe:
+        """ Probes the file; raises an exception if the file cannot be probed """
+        name = path.arch_path if path.is_in_arch() else str(path)
+        is_citi = os.path.splitext(name)[1].lower() in ['.cti', '.citi']
+
+        if is_ext_bundle(os.path.splitext(name)[1]):
+            # bundles are memory-mapped, so there is no need to read only a part of them
+            if path.is_in_arch():
+                bundle = NetworkBundleReader(name, read_file_from_archive(str(path), path.arch_path))
+            else:
+                bundle = NetworkBundleReader(name)
+            return FileProbe(*bundle.get_probe(bundle.labels.index(path.sweep) if path.is_sweep() else 0))
+
+        # only the ASCII parts are of interest, and ISO-8859-1 never fails to decode
+        if path.is_in_arch():
+            # members of compressed archives cannot be seeked, so just read the whole member
+            data = read_file_from_archive(str(path), path.arch_path)
+            if is_citi:
+                return FileProbe._probe_citi(data.decode('ISO-8859-1'))
+            return FileProbe._probe_touchstone(name, len(data), lambda offset, n: data[offset:offset+n].decode('ISO-8859-1'))
+
+        with open(str(path), 'rb') as fp:
+            if is_citi:
+                return FileProbe._probe_citi(fp.read().decode('ISO-8859-1'))
+
+            def read(offset: int, n: int) -> str:
+                fp.seek(offset)
+                return fp.read(n).decode('ISO-8859-1')
+            return FileProbe._probe_touchstone(name, os.fstat(fp.fileno()).st_size, read)
+
+
+    @staticmethod
+    def _probe_touchstone(filename: str, size: int, read: Callable[[int,int],str]) -> FileProbe:
+
+        m = re.match(r'\.[ghsyz](\d+)p$', os.path.splitext(filename)[1].lower())
+        n_ports = int(m.group(1)) if m else None
+        
+        # parse the header and the complete records at the beginning of the file; the head is enlarged if it
+        #   does not contain at least one complete record (e.g. long comments, or a lot of ports)
+        head_size = FileProbe.HEAD_SIZE
+        while True:
+            head = read(0, head_size)
+            head_is_complete = len(head) >= size
+            options = ['ghz', 's', 'ma', 'r', '50']
+            version, matrix_format, n_points = '1', 'full', None
+            in_data = False
+            f_start, data_start, data_end, n_values, n_records = None, 0, 0, 0, 0
+
+            lines = head.splitlines(keepends=True)
+            if not head_is_complete and len(lines) > 0:
+                lines = lines[:-1]  # the last line might be incomplete
+            offset = 0
+            for line in lines:
+                line_start, offset = offset, offset + len(line)
+                line = line.split('!', 1)[0].strip()
+                if line == '':
+                    continue
+                if line.startswith('#'):
+                    option_line = line[1:].lower().split()
+                    options = option_line + options[len(option_line):]
+                    if version.startswith('1'):
+                        in_data = True
+                    continue
+                if line.startswith('['):
+                    m = re.match(r'\[([^\]]+)\](.*)', line)
+                    if not m:
+                        raise ValueError(f'Invalid keyword line "{line}"')
+                    keyword, argument = m.group(1).strip().lower(), m.group(2).strip()
+                    in_data = False
+                    if keyword == 'version':
+                        version = argument
+                    elif keyword == 'number of ports':
+                        n_ports = int(argument)
+                    elif keyword == 'number of frequencies':
+                        n_points = int(argument)
+                    elif keyword == 'matrix format':
+                        matrix_format = argument.lower()
+                    elif keyword == 'network data':
+                        in_data = True
+                    elif keyword in ['noise data', 'end']:
+                        break
+                    continue
+                if not in_data:
+                    continue
+                if n_ports is None:
+                    raise ValueError(f'Unable to determine number of ports of <{filename}>')
+                values_per_record = 1 + (2*n_ports*n_ports if matrix_format=='full' else n_ports*(n_ports+1))
+                tokens = line.split()
+                if f_start is None:
+                    f_start, data_start = float(tokens[0]), line_start
+                n_values += len(tokens)
+                if n_values % values_per_record == 0:
+                    n_records, data_end = n_values // values_per_record, offset
+                    if n_records >= FileProbe.MIN_RECORDS and not head_is_complete:
+                        break  # enough to estimate the record length
+            
+            if n_records > 0 or head_is_complete:
+                break
+            head_size *= 4
+
+        if n_records == 0:
+            raise ValueError(f'Unable to find the first data record of <{filename}>')
+
+        # records always start on a new line, so walk back from the end until the values of one record are collected
+        def find_last_frequency(tail_lines: list[str]) -> float|None:
+            record_values = 0
+            for line in reversed(tail_lines):
+                line = line.split('!', 1)[0].strip()
+                if line == '' or line.startswith('['):
+                    continue
+                tokens = line.split()
+                if version.startswith('1') and n_ports == 2 and len(tokens) == 5 and record_values == 0:
+                    continue  # noise data of a Touchstone 1.x 2-port file
+                record_values += len(tokens)
+                if record_values == values_per_record:
+                    return float(tokens[0])
+                if record_values > values_per_record:
+                    return None
+            return None
+
+        record_length = (data_end - data_start) / n_records
+        if head_is_complete:
+            f_stop = find_last_frequency(head.splitlines())
+        else:
+            tail_size = max(FileProbe.TAIL_SIZE, int(2*record_length))
+            while True:
+                f_stop = find_last_frequency(read(max(0, size-tail_size), tail_size).splitlines()[1:])  # the first line might be incomplete
+                if f_stop is not None or tail_size >= size:
+                    break
+                tail_size *= 4  # e.g. a long noise data block at the end of the file
+        if f_stop is None:
+            raise ValueError(f'Unable to find the last data record of <{filename}>')
+
+        if n_points is not None:
+            exact = True
+        elif head_is_complete:
+            n_points, exact = n_records, True
+        else:
+            n_points, exact = max(n_records, round((size - data_start) / record_length)), False
+
+        multiplier = { 'hz': 1.0, 'khz': 1e3, 'mhz': 1e6, 'ghz': 1e9 }.get(options[0])
+        if multiplier is None:
+            raise ValueError(f'Illegal frequency unit "{options[0]}"')
+        return FileProbe(n_ports, f_start*multiplier, f_stop*multiplier, n_points, exact)
+
+
+    @staticmethod
+    def _probe_citi(text: str) -> FileProbe:
+
+        # keywords always start at the beginning of a line; searching for them is much faster than splitting all lines
+        keyword_lines = []
+        for keyword in ['VAR', 'DATA', 'SEG_LIST_BEGIN', 'VAR_LIST_BEGIN']:
+            pos = 0 if text.startswith(keyword) else text.find('\n' + keyword)
+            while pos >= 0:
+                start = text.find(keyword, pos)
+                end = text.find('\n', start)
+                end = len(text) if end < 0 else end
+                line = text[start:end].split()
+                if line[0] == keyword:  # e.g. "VAR" also matches "VAR_LIST_END"
+                    keyword_lines.append((start, keyword, line[1:], end))
+                pos = text.find('\n' + keyword, end)
+        
+        var_names, var_sizes, var_ranges, highest_port = [], [], [], 0
+        for _,keyword,tokens,end in sorted(keyword_lines):
+            if keyword == 'VAR' and len(tokens) >= 3:
+                var_names.append(tokens[0])
+                var_sizes.append(int(tokens[2]))
+            elif keyword == 'DATA' and len(tokens) >= 1:
+                egress_port, ingress_port = CitiReader.parse_sparam_name(tokens[0])
+                if egress_port is not None and ingress_port is not None:
+                    highest_port = max(highest_port, egress_port, ingress_port)
+            elif keyword == 'SEG_LIST_BEGIN':
+                segments = text[end:text.index('SEG_LIST_END', end)].split()
+                var_ranges.append((float(segments[1]), float(segments[-2])))
+            elif keyword == 'VAR_LIST_BEGIN':
+                values = text[end:text.index('VAR_LIST_END', end)].split()
+                var_ranges.append((float(values[0]), float(values[-1])))
+
+        if highest_port < 1:
+            raise ValueError('CITI file contains no S-parameters')
+        i_freq = var_names.index(CitiReader.guess_frequency_name(var_names))
+        if i_freq >= len(var_ranges):
+            raise ValueError('CITI file contains no frequency list')
+        return FileProbe(highest_port, var_ranges[i_freq][0], var_ranges[i_freq][1], var_sizes[i_freq])
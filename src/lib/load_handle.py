@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import threading
+import concurrent.futures
+from typing import Callable, Any
+
+
+
+class LoadHandle:
+    """
+    Handle for files that are loaded in the background by SParamFile.load_async().
+
+    Progress is counted in bytes parsed, over all files. The callbacks are called from the loading thread;
+      <progress_fn>(bytes done, total bytes) is called repeatedly while a file is parsed, and <loaded_fn>(file)
+      after each file, whether loading succeeded or not.
+
+    cancel() stops loading as soon as possible, even in the middle of a huge file; files that were loaded
+      completely before stay loaded, and the file that was being parsed stays unloaded (not failed).
+    """
+
+
+    class Cancelled(Exception):
+        pass
+
+
+    def __init__(self, progress_fn: Callable[[int,int],None]|None = None, loaded_fn: Callable[[Any],None]|None = None):
+        self._progress_fn = progress_fn
+        self._loaded_fn = loaded_fn
+        self._cancel_event = threading.Event()
+        self._future: concurrent.futures.Future|None = None
+        self._bytes_total, self._bytes_done, self._bytes_current = 0, 0, 0
+
+
+    def cancel(self):
+        self._cancel_event.set()
+
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+
+    @property
+    def done(self) -> bool:
+        return self._future is not None and self._future.done()
+
+
+    @property
+    def progress(self) -> tuple[int,int]:
+        """ Returns (bytes done, total bytes) """
+        return self._bytes_done + self._bytes_current, self._bytes_total
+
+
+    def wait(self, timeout: float|None = None) -> bool:
+        """ Waits until loading is finished or cancelled; returns False on timeout """
+        done, _ = concurrent.futures.wait([self._future], timeout)
+        return len(done) > 0
+
+
+    def result(self, timeout: float|None = None) -> list:
+        """ Returns the files that were loaded (including the ones that failed), after waiting until loading is finished or cancelled """
+        return self._future.result(timeout)
+
+
+    def add_done_callback(self, fn: Callable[[],None]):
+        """ Calls <fn>() when loading is finished or cancelled; from the loading thread, or immediately if it is finished already """
+        self._future.add_done_callback(lambda _: fn())
+
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise LoadHandle.Cancelled('Loading was cancelled')
+
+
+    def _start(self, bytes_total: int):
+        self._bytes_total = bytes_total
+        self._report()
+
+
+    def _on_file_progress(self, done: int, total: int):
+        """ Progress callback for the readers; raises LoadHandle.Cancelled to stop parsing """
+        self.check_cancelled()
+        self._bytes_current = min(done, total)
+        self._report()
+
+
+    def _on_file_loaded(self, file: Any, size: int):
+        self._bytes_done += size
+        self._bytes_current = 0
+        self._report()
+        if self._loaded_fn:
+            self._loaded_fn(file)
+
+
+    def _report(self):
+        if self._progress_fn:
+            self._progress_fn(*self.progress)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import io
+import csv
+import time
+import threading
+import contextlib
+import dataclasses
+import collections
+from typing import Callable, Iterator
+
+
+
+@dataclasses.dataclass
+class LoadRecord:
+    """ Statistics of loading one file; times are wall times in seconds """
+    path: str
+    timestamp: float
+    t_total: float = 0.0
+    t_extract: float = 0.0
+    t_parse: float = 0.0
+    t_validate: float = 0.0
+    bytes_read: int = 0
+    n_points: int|None = None
+    n_ports: int|None = None
+    cache_hit: bool = False
+    error: str|None = None
+
+
+
+class LoadStatsSingleton:
+    """
+    In-memory table of load statistics, one record per loaded file, to find out which files are slow to load.
+
+    A record is started with measure(); while it is active, the code that reads, extracts and parses the file adds
+      to it with phase() and add_bytes(), without having to pass the record around. Records are per thread, and
+      nested measure() calls (e.g. a sweep slice that parses the whole file) add to the outermost record.
+      Records from other processes can be added with add(). The table keeps the last <MAX_RECORDS> records.
+    """
+
+
+    MAX_RECORDS = 10_000
+    PHASES = ['extract', 'parse', 'validate']
+
+
+    _instance = None
+
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: collections.deque[LoadRecord] = collections.deque(maxlen=LoadStatsSingleton.MAX_RECORDS)
+        self._local = threading.local()
+
+
+    @property
+    def current(self) -> LoadRecord|None:
+        """ Returns the record that is being measured in this thread, if any """
+        return getattr(self._local, 'record', None)
+
+
+    @contextlib.contextmanager
+    def measure(self, path: str, keep: bool = True) -> Iterator[LoadRecord]:
+        """ Measures the total time of the enclosed code, and adds the record to the table afterwards (unless <keep> is False) """
+        if self.current is not None:
+            yield self.current
+            return
+
+        record = LoadRecord(path=path, timestamp=time.time())
+        self._local.record = record
+        t_start = time.perf_counter()
+        try:
+            yield record
+        except Exception as ex:
+            record.error = str(ex)
+            raise
+        finally:
+            record.t_total = time.perf_counter() - t_start
+            self._local.record = None
+            if keep:
+                self.add(record)
+
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Adds the time of the enclosed code to the phase <name> (see <PHASES>) of the current record; does nothing if there is no
+          current record, or if another phase is already active (e.g. a reader that measures itself, but is called while parsing)
+        """
+        record = self.current
+        if record is None or getattr(self._local, 'phase', None) is not None:
+            yield
+            return
+        self._local.phase = name
+        t_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(record, f't_{name}', getattr(record, f't_{name}') + time.perf_counter() - t_start)
+            self._local.phase = None
+
+
+    def add_bytes(self, n: int):
+        if (record := self.current) is not None:
+            record.bytes_read += n
+
+
+    def add(self, record: LoadRecord):
+        with self._lock:
+            self._records.append(record)
+
+
+    def query(self, where: Callable[[LoadRecord],bool]|None = None, order_by: str = 't_total', descending: bool = True, limit: int|None = None) -> list[LoadRecord]:
+        """ Returns the records for which <where> is true, sorted by the field <order_by> (None values last) """
+        with self._lock:
+            records = [record for record in self._records if where is None or where(record)]
+        valid = sorted([r for r in records if getattr(r, order_by) is not None], key=lambda r: getattr(r, order_by), reverse=descending)
+        result = valid + [r for r in records if getattr(r, order_by) is None]
+        return result[:limit] if limit is not None else result
+
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+    def to_csv(self, records: list[LoadRecord]|None = None, separator: str = ',') -> str:
+        """ Returns the records (default: all, most costly first) as CSV """
+        if records is None:
+            records = self.query()
+        fields = [field.name for field in dataclasses.fields(LoadRecord)]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=separator, lineterminator='\n')
+        writer.writerow(fields)
+        for record in records:
+            writer.writerow(['' if getattr(record, field) is None else getattr(record, field) for field in fields])
+        return buffer.getvalue()
+
+
+LoadStats = LoadStatsSingleton()
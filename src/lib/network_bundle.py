@@ -0,0 +1,165 @@
+from __future__ import annotations
+from .network_ext import NetworkExt
+
+import io
+import struct
+import zipfile
+import skrf
+import numpy as np
+
+
+
+class NetworkBundleReader:
+    """
+    Reader for network bundles, i.e. many networks in one binary file.
+
+    A bundle is an uncompressed, versioned .npz file in a columnar layout: the S-matrices, reference impedances and
+      frequency grids of all networks are concatenated into one flat array each, and small index arrays hold the
+      offsets, port definitions, names and comments per network. Networks with the same frequency grid share one grid.
+
+    Because the members are stored uncompressed, the large arrays are memory-mapped instead of read, so opening a
+      bundle is instant, and only the data of networks that are actually used is read from disk. Networks returned
+      by this reader hold (copy-on-write) views into the mapped arrays.
+    """
+
+
+    FORMAT_VERSION = 1
+    LARGE_MEMBERS = ['f', 's', 'z0']
+
+
+    def __init__(self, filename: str, contents: bytes|None = None, mmap: bool = True):
+        """ Reads <filename> from disk, unless <contents> is given; <filename> is then only used for error messages """
+        self.filename = filename
+        try:
+            if contents is not None:
+                with np.load(io.BytesIO(contents), allow_pickle=False) as data:
+                    arrays = {name: data[name] for name in data.files}
+            else:
+                with np.load(filename, allow_pickle=False) as data:
+                    arrays = {name: data[name] for name in data.files if not (mmap and name in NetworkBundleReader.LARGE_MEMBERS)}
+                if mmap:
+                    arrays |= NetworkBundleReader._map_members(filename, NetworkBundleReader.LARGE_MEMBERS)
+
+            if int(arrays['version']) != NetworkBundleReader.FORMAT_VERSION:
+                raise ValueError(f'Unsupported version {int(arrays["version"])}')
+            self._names: np.ndarray = arrays['names']
+            self._comments: np.ndarray = arrays['comments']
+            self._f_units: np.ndarray = arrays['f_units']
+            self._ports: np.ndarray = arrays['ports']
+            self._n_ports: np.ndarray = arrays['n_ports']
+            self._grids: np.ndarray = arrays['grids']
+            self._f, self._f_offsets = arrays['f'], arrays['f_offsets']
+            self._s, self._s_offsets = arrays['s'], arrays['s_offsets']
+            self._z0, self._z0_offsets = arrays['z0'], arrays['z0_offsets']
+        except Exception as ex:
+            raise RuntimeError(f'Unable to open bundle <{filename}> ({ex})')
+
+        # names are used to address the networks, so make them unique
+        self.labels: list[str] = []
+        counts: dict[str,int] = {}
+        for name in self._names:
+            name = str(name)
+            counts[name] = counts.get(name, 0) + 1
+            self.labels.append(name if counts[name] == 1 else f'{name} #{counts[name]}')
+
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+    @staticmethod
+    def _map_members(filename: str, names: list[str]) -> dict[str,np.ndarray]:
+        """ Memory-maps .npy members of an uncompressed .npz file (np.load() only supports that for plain .npy files) """
+        result = {}
+        with zipfile.ZipFile(filename) as zf, open(filename, 'rb') as fp:
+            for name in names:
+                info = zf.getinfo(name + '.npy')
+                if info.compress_type != zipfile.ZIP_STORED:
+                    raise ValueError(f'Member "{name}" is compressed')
+
+                # the local file header has a variable size, which may differ from the central directory
+                fp.seek(info.header_offset)
+                local_header = fp.read(30)
+                name_length, extra_length = struct.unpack('<HH', local_header[26:30])
+                fp.seek(info.header_offset + 30 + name_length + extra_length)
+
+                version = np.lib.format.read_magic(fp)
+                if version == (1,0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+                if fortran_order or len(shape) != 1:
+                    raise ValueError(f'Member "{name}" is not a flat array')
+                if shape[0] == 0:
+                    result[name] = np.empty(shape, dtype=dtype)  # cannot map an empty range
+                else:
+                    result[name] = np.memmap(filename, dtype=dtype, mode='c', offset=fp.tell(), shape=shape)
+        return result
+
+
+    def get_network(self, index: int) -> NetworkExt:
+        n_ports, grid = int(self._n_ports[index]), int(self._grids[index])
+        f = self._f[self._f_offsets[grid]:self._f_offsets[grid+1]]
+        s = self._s[self._s_offsets[index]:self._s_offsets[index+1]].reshape([len(f), n_ports, n_ports])
+        z0 = self._z0[self._z0_offsets[index]:self._z0_offsets[index+1]].reshape([len(f), n_ports])
+
+        # skrf copies the arrays on construction, which would read all data; construct a dummy, and replace the arrays by views
+        nw = NetworkExt(f=f[:1], f_unit='Hz', s=np.zeros([1, n_ports, n_ports]), z0=50, name=str(self._names[index]), comments=str(self._comments[index]))
+        nw._frequency = skrf.Frequency.from_f(f, unit='Hz')
+        nw._s, nw._z0 = s, z0
+        nw.frequency.unit = str(self._f_units[index])
+        nw.ports = str(self._ports[index]).split()
+        return nw
+
+
+    def get_networks(self) -> list[NetworkExt]:
+        return [self.get_network(index) for index in range(len(self))]
+
+
+    def get_probe(self, index: int) -> tuple[int,float,float,int]:
+        """ Returns (number of ports, start frequency, stop frequency, number of points) without creating the network """
+        grid = int(self._grids[index])
+        start, stop = int(self._f_offsets[grid]), int(self._f_offsets[grid+1])
+        return int(self._n_ports[index]), float(self._f[start]), float(self._f[stop-1]), stop-start
+
+
+
+class NetworkBundleWriter:
+
+
+    @staticmethod
+    def write(nws: list[skrf.Network], filename: str):
+
+        grid_keys: dict[bytes,int] = {}
+        f_list, s_list, z0_list = [], [], []
+        names, comments, f_units, ports, n_ports, grids = [], [], [], [], [], []
+        for nw in nws:
+            key = nw.f.astype(np.float64).tobytes()
+            if key not in grid_keys:
+                grid_keys[key] = len(f_list)
+                f_list.append(nw.f.astype(np.float64))
+            grids.append(grid_keys[key])
+            s_list.append(nw.s.astype(np.complex128).ravel())
+            z0_list.append(nw.z0.astype(np.complex128).ravel())
+            names.append(nw.name or '')
+            comments.append(nw.comments or '')
+            f_units.append(nw.frequency.unit)
+            nw_ports = sorted(nw.ports, key=lambda port: port.index) if isinstance(nw, NetworkExt) else [f'S{i+1}' for i in range(nw.nports)]
+            ports.append(' '.join([str(port) for port in nw_ports]))
+            n_ports.append(nw.nports)
+
+        def concatenate(arrays: list[np.ndarray], dtype: type) -> tuple[np.ndarray,np.ndarray]:
+            offsets = np.cumsum([0] + [len(a) for a in arrays], dtype=np.int64)
+            return (np.concatenate(arrays) if len(arrays) > 0 else np.array([], dtype=dtype)), offsets
+
+        f, f_offsets = concatenate(f_list, np.float64)
+        s, s_offsets = concatenate(s_list, np.complex128)
+        z0, z0_offsets = concatenate(z0_list, np.complex128)
+
+        # np.savez() does not compress, which is required for memory-mapping
+        with open(filename, 'wb') as fp:
+            np.savez(fp,
+                version=NetworkBundleReader.FORMAT_VERSION,
+                names=np.array(names, dtype=str), comments=np.array(comments, dtype=str), f_units=np.array(f_units, dtype=str),
+                ports=np.array(ports, dtype=str), n_ports=np.array(n_ports, dtype=np.int32), grids=np.array(grids, dtype=np.int32),
+                f=f, f_offsets=f_offsets, s=s, s_offsets=s_offsets, z0=z0, z0_offsets=z0_offsets)
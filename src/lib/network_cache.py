@@ -0,0 +1,181 @@
+from __future__ import annotations
+from .network_ext import NetworkExt
+from .path_ext import PathExt
+from .apppaths import AppPaths
+from .settings import Settings
+from .utils import ZipFilePool, is_ext_bundle
+
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+import numpy as np
+
+
+
+class NetworkCacheSingleton:
+    """
+    Persistent cache of parsed networks.
+
+    Each entry is an uncompressed .npz file, named after the hash of the file path. The entry stores the
+      file size and modification time (or the CRC of the archive member), so changed files are parsed again.
+      Entries are touched on every hit, and the least recently used ones are deleted when the cache grows
+      beyond <Settings.network_cache_size_mb>.
+    """
+
+
+    FORMAT_VERSION = 1
+
+
+    _instance = None
+
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+
+    def __init__(self):
+        self._dir: str|None = None
+        self._lock = threading.Lock()
+        self._total_size: int|None = None
+
+
+    @property
+    def directory(self) -> str:
+        return self._dir if self._dir is not None else AppPaths.get_cache_dir()
+
+
+    @directory.setter
+    def directory(self, value: str|None):
+        with self._lock:
+            self._dir = value
+            self._total_size = None
+
+
+    @property
+    def enabled(self) -> bool:
+        return Settings.network_cache
+
+
+    @staticmethod
+    def get_stamp(path: PathExt) -> str:
+        """ Returns a string that changes when the file (or archive member) is modified """
+        if path.is_in_arch():
+            info = ZipFilePool.get(str(path)).getinfo(path.arch_path)
+            return f'{info.file_size}:{info.CRC}'
+        else:
+            stat = os.stat(str(path))
+            return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+
+    @staticmethod
+    def _is_cacheable(path: PathExt) -> bool:
+        """ Network bundles are not cached, because they are memory-mapped, which is faster than the cache """
+        return not is_ext_bundle(path.arch_path_suffix if path.is_in_arch() else path.suffix)
+
+
+    def _get_entry_path(self, path: PathExt) -> str:
+        key = hashlib.sha1(path.full_path.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + '.npz')
+
+
+    def get(self, path: PathExt) -> tuple[NetworkExt,str|None]|None:
+        """ Returns (network, metadata) from the cache, or None if there is no valid entry """
+        if not self.enabled or not NetworkCacheSingleton._is_cacheable(path):
+            return None
+
+        try:
+            entry_path = self._get_entry_path(path)
+            if not os.path.exists(entry_path):
+                return None
+            stamp = NetworkCacheSingleton.get_stamp(path)
+            with np.load(entry_path, allow_pickle=False) as data:
+                if int(data['version']) != NetworkCacheSingleton.FORMAT_VERSION or str(data['path']) != path.full_path or str(data['stamp']) != stamp:
+                    return None
+                nw = NetworkExt(f=data['f'], f_unit='Hz', s=data['s'], z0=data['z0'], name=str(data['name']), comments=str(data['comments']))
+                nw.frequency.unit = str(data['f_unit'])
+                nw.port_modes = data['port_modes']
+                metadata = str(data['metadata']) if bool(data['has_metadata']) else None
+            os.utime(entry_path)
+            return nw, metadata
+        except Exception as ex:
+            logging.warning(f'Unable to get <{path.full_path}> from network cache ({ex})')
+            return None
+
+
+    def put(self, path: PathExt, nw: NetworkExt, metadata: str|None):
+        if not self.enabled or not NetworkCacheSingleton._is_cacheable(path):
+            return
+
+        try:
+            entry_path = self._get_entry_path(path)
+            os.makedirs(self.directory, exist_ok=True)
+            old_size = os.path.getsize(entry_path) if os.path.exists(entry_path) else 0
+
+            # write to a temporary file first, so that a concurrent reader never sees a partial entry
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+            try:
+                with os.fdopen(fd, 'wb') as fp:
+                    np.savez(fp,
+                        version=NetworkCacheSingleton.FORMAT_VERSION, path=path.full_path, stamp=NetworkCacheSingleton.get_stamp(path),
+                        f=nw.f, s=nw.s, z0=nw.z0, name=nw.name or '', comments=nw.comments or '', f_unit=nw.frequency.unit,
+                        port_modes=np.array(nw.port_modes, dtype=str), metadata=metadata or '', has_metadata=metadata is not None)
+                os.replace(temp_path, entry_path)
+            except:
+                os.remove(temp_path)
+                raise
+
+            with self._lock:
+                if self._total_size is not None:
+                    self._total_size += os.path.getsize(entry_path) - old_size
+            self._evict()
+        except Exception as ex:
+            logging.warning(f'Unable to put <{path.full_path}> into network cache ({ex})')
+
+
+    def _get_entries(self) -> list[os.DirEntry]:
+        if not os.path.exists(self.directory):
+            return []
+        return [entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith('.npz')]
+
+
+    def _evict(self):
+        max_size = Settings.network_cache_size_mb * 1024 * 1024
+        with self._lock:
+            if self._total_size is None:
+                self._total_size = sum([entry.stat().st_size for entry in self._get_entries()])
+            if self._total_size <= max_size:
+                return
+
+            entries = sorted(self._get_entries(), key=lambda entry: entry.stat().st_mtime_ns)
+            for entry in entries:
+                if self._total_size <= max_size:
+                    break
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                    self._total_size -= size
+                    logging.debug(f'Evicted <{entry.name}> from network cache')
+                except Exception as ex:
+                    logging.warning(f'Unable to evict <{entry.path}> from network cache ({ex})')
+
+
+    def get_size(self) -> int:
+        """ Returns the total size of the cache in bytes """
+        return sum([entry.stat().st_size for entry in self._get_entries()])
+
+
+    def clear(self):
+        with self._lock:
+            for entry in self._get_entries():
+                try:
+                    os.remove(entry.path)
+                except Exception as ex:
+                    logging.warning(f'Unable to remove <{entry.path}> from network cache ({ex})')
+            self._total_size = 0
+
+
+NetworkCache = NetworkCacheSingleton()
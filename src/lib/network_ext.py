@@ -2,6 +2,7 @@ from __future__ import annotations
 import skrf
 import enum
 import re
+import copy
 import warnings
 import numpy as np
 import itertools
@@ -85,6 +86,47 @@ class NetworkExt(skrf.Network):
         result = NetworkExt(s=self.s, f=self.f, f_unit='Hz', z0=self.z0, comments=self.comments, name=self.name)
         result._ports = list(self.ports)
         return result
+
+
+    def with_s(self, s: np.ndarray) -> NetworkExt:
+        """ Returns a network with the S-matrix <s>, and the frequencies, reference impedances and metadata of this network; unlike copy(), this does not copy the S-matrix of this network """
+        result = NetworkExt(s=s, f=self.f, f_unit='Hz', z0=self.z0, comments=self.comments, name=self.name)
+        result.ports = self.ports
+        return result
+    
+    @property
+    def single_precision(self) -> bool:
+        return self._s.dtype == np.complex64
+
+
+    def to_single_precision(self):
+        """ Stores the S-matrix as complex64 (in-place), which halves its memory; copies are always double precision again """
+        self._s = self._s.astype(np.complex64)
+
+
+    def full_precision(self) -> NetworkExt:
+        """ Returns the network itself, or a double-precision copy if it is stored in single precision """
+        return self.copy() if self.single_precision else self
+
+
+    def read_only_copy(self) -> NetworkExt:
+        """ Returns a shallow copy whose S-matrix is a read-only view of this network's S-matrix; this network stays writeable """
+        result = copy.copy(self)
+        result._s = self._s.view()
+        result._s.flags.writeable = False
+        result._ports = list(self._ports)
+        return result
+
+
+    CONVERSIONS = ['z', 'y', 'a', 't']
+
+
+    def converted(self, param: str) -> np.ndarray:
+        """ Returns the matrix of <param> (see <CONVERSIONS>), calculated in double precision """
+        if param not in NetworkExt.CONVERSIONS:
+            raise ValueError(f'Unknown parameter "{param}", expected one of {NetworkExt.CONVERSIONS}')
+        return getattr(self.full_precision(), param)
+
     
     @property
     def z0_simple(self) -> np.ndarray:
@@ -0,0 +1,135 @@
+from __future__ import annotations
+from .network_ext import NetworkExt
+from .settings import Settings
+
+import logging
+import weakref
+import threading
+import collections
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from .sparam_file import SParamFile
+
+
+
+class NetworkMemorySingleton:
+    """
+    Keeps the memory used by loaded networks within <Settings.network_memory_mb>.
+
+    Every SParamFile registers its network after loading, and touches it on every access. When the total size of all
+      registered networks exceeds the budget, the least recently used ones are unloaded; they are transparently loaded
+      again (usually from the network cache) when they are accessed the next time. Pinned files (e.g. the ones that
+      are currently plotted, or that expressions can reach) are never unloaded, even if that exceeds the budget; that
+      is logged once, until the usage is within the budget again.
+    """
+
+
+    FULL_RATIO = 0.9
+
+
+    _instance = None
+
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+
+    def __init__(self):
+        self._lock = threading.RLock()  # re-entrant, because the weakref callback may run during garbage collection
+        self._entries: collections.OrderedDict[int,tuple[weakref.ref,int]] = collections.OrderedDict()  # id(file) -> (file, size in bytes)
+        self._pinned: set[int] = set()
+        self._usage = 0
+        self._peak = 0
+        self._exceeded = False
+
+
+    @property
+    def budget(self) -> int|None:
+        """ Budget in bytes, or None if unlimited """
+        return Settings.network_memory_mb * 1024 * 1024 if Settings.network_memory_mb > 0 else None
+
+
+    @property
+    def usage(self) -> int:
+        return self._usage
+
+
+    @property
+    def peak(self) -> int:
+        return self._peak
+
+
+    @property
+    def full(self) -> bool:
+        """ True if the budget is (almost) used up, so that loading more files would unload others """
+        budget = self.budget
+        return budget is not None and self._usage >= budget * NetworkMemorySingleton.FULL_RATIO
+
+
+    @staticmethod
+    def get_size(nw: NetworkExt) -> int:
+        return nw.f.nbytes + nw.s.nbytes + nw.z0.nbytes
+
+
+    def add(self, file: SParamFile, nw: NetworkExt):
+        """ Registers the network of a file that was just loaded; must not be called while holding the file's lock """
+        key = id(file)
+        size = NetworkMemorySingleton.get_size(nw)
+        victims: list[SParamFile] = []
+        with self._lock:
+            if key in self._entries:
+                self._usage -= self._entries.pop(key)[1]
+            self._entries[key] = (weakref.ref(file, lambda _, key=key: self._forget(key)), size)
+            self._usage += size
+            self._peak = max(self._peak, self._usage)
+
+            budget = self.budget
+            if budget is not None and self._usage > budget:
+                for victim_key in list(self._entries.keys()):
+                    if self._usage <= budget:
+                        break
+                    if victim_key == key or victim_key in self._pinned:
+                        continue
+                    victim_ref, victim_size = self._entries.pop(victim_key)
+                    self._usage -= victim_size
+                    if (victim := victim_ref()) is not None:
+                        victims.append(victim)
+            
+            exceeded = budget is not None and self._usage > budget
+            warn_exceeded = exceeded and not self._exceeded
+            self._exceeded = exceeded
+            usage = self._usage
+
+        # unload outside of the lock, because this has to wait for the lock of each file
+        for victim in victims:
+            victim._unload()
+            logging.debug(f'Unloaded <{victim.path.full_path}> to stay within memory budget ({self._usage/1024/1024:,.1f} MB used, peak {self._peak/1024/1024:,.1f} MB)')
+        if warn_exceeded:
+            logging.warning(f'The networks that are currently needed use {usage/1024/1024:,.1f} MB, which exceeds the memory budget of {budget/1024/1024:,.0f} MB')
+
+
+    def touch(self, file: SParamFile):
+        with self._lock:
+            if id(file) in self._entries:
+                self._entries.move_to_end(id(file))
+
+
+    def pin(self, files: list[SParamFile]):
+        """ Replaces the set of pinned files """
+        with self._lock:
+            self._pinned = set([id(file) for file in files])
+
+
+    def remove(self, file: SParamFile):
+        self._forget(id(file))
+
+
+    def _forget(self, key: int):
+        with self._lock:
+            if key in self._entries:
+                self._usage -= self._entries.pop(key)[1]
+
+
+NetworkMemory = NetworkMemorySingleton()
@@ -9,21 +9,27 @@ from functools import total_ordering
 
 @total_ordering
 class PathExt(pathlib.Path):
-    """ An extension of Path with has the additional property arch_path, to represent a file inside an archive """
+    """ An extension of Path with has the additional properties arch_path, to represent a file inside an archive, and sweep, to represent one slice of a CITI file or one network of a bundle """
 
-    def __init__(self, path, *, arch_path: str|None = None):
-        """ If this object refers to a file within an archive, then path is the archive, and arch_path is the path within the archive-fil """
+    def __init__(self, path, *, arch_path: str|None = None, sweep: str|None = None):
+        """
+        If this object refers to a file within an archive, then path is the archive, and arch_path is the path within the archive-fil.
+        If this object refers to one slice of a swept CITI file, then sweep are the coordinate values of the slice (e.g. "BIAS=0.5"); for network bundles, it is the name of the network.
+        """
         super().__init__(path)
         self._arch_path = arch_path
+        self._sweep = sweep
     
     def __hash__(self) -> int:
+        if self._sweep:
+            return hash(str(super()) + os.sep + (self._arch_path or '') + ', ' + self._sweep)
         if self._arch_path:
             return hash(str(super()) + os.sep + self._arch_path)
         return super().__hash__()
     
     def __eq__(self, other) -> bool:
         if isinstance(other, PathExt):
-            if self._arch_path != other._arch_path:
+            if self._arch_path != other._arch_path or self._sweep != other._sweep:
                 return False
         return super().__eq__(other)
 
@@ -59,25 +65,51 @@ class PathExt(pathlib.Path):
             return None
         return pathlib.Path(self._arch_path).suffix
     
+    def is_sweep(self) -> bool:
+        """ True if this object refers to one slice of a swept CITI file, or one network of a bundle """
+        return self._sweep is not None
+    
+    @property
+    def sweep(self) -> str|None:
+        """ If this object is one slice of a swept CITI file (self.is_sweep==True), this property holds the coordinate values of the slice. Otherwise, it is None. """
+        return self._sweep
+    
+    @property
+    def file(self) -> PathExt:
+        """ The file itself, i.e. without the sweep slice """
+        if self._sweep is None:
+            return self
+        return PathExt(str(self), arch_path=self._arch_path)
+    
     @property
     def full_name(self) -> str:
         """ Name for displaying purposes only """
         if self._arch_path:
-            return super().name + os.sep + pathlib.Path(self._arch_path).name
-        return super().name
+            name = super().name + os.sep + pathlib.Path(self._arch_path).name
+        else:
+            name = super().name
+        return name + self._sweep_suffix
     
     @property
     def full_path(self) -> str:
         """ Full path for displaying purposes only """
         if self._arch_path:
-            return str(super().absolute()) + os.sep + self._arch_path
-        return str(super().absolute())
+            path = str(super().absolute()) + os.sep + self._arch_path
+        else:
+            path = str(super().absolute())
+        return path + self._sweep_suffix
     
     @property
     def final_name(self) -> str:
         if self._arch_path:
-            return pathlib.Path(self._arch_path).name
-        return super().name
+            name = pathlib.Path(self._arch_path).name
+        else:
+            name = super().name
+        return name + self._sweep_suffix
+    
+    @property
+    def _sweep_suffix(self) -> str:
+        return f', {self._sweep}' if self._sweep else ''
     
     def absolute(self) -> PathExt:
-        return PathExt(super().absolute(), arch_path=self._arch_path)
+        return PathExt(super().absolute(), arch_path=self._arch_path, sweep=self._sweep)
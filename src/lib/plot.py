@@ -2,6 +2,7 @@ from .si import SiValue, SiFormat
 from .plot_data import PlotData, PlotDataQuantity
 from .shortstr import shorten_string_list
 from .utils import natural_sort_key
+from .sparam_helpers import FrequencyIndex
 from .settings import Settings, LogNegativeHandling, LegendPos
 
 import math
@@ -317,11 +318,17 @@ class PlotHelper:
             if plot.currently_used_axis != 1:
                 continue  # tracing cursors on the right axis does not work yet
             
-            dx = (np.array(plot.data.x.values) - x) /  width if x is not None else 0
-            dy = (np.array(plot.data.y.values) - y) / height if y is not None else 0
-            dist = np.sqrt(np.abs(dx**2) + np.abs(dy**2))
-            idx = np.argmin(dist)
-            error = dist[idx]
+            if y is None and x is not None:
+                # only the X-distance matters, so for a sorted X-axis (e.g. frequency), a binary search finds the closest point
+                x_index = FrequencyIndex.get(plot.data.x.values)
+                idx = x_index.nearest(x)
+                error = abs(x_index.f[idx] - x) / width
+            else:
+                dx = (np.array(plot.data.x.values) - x) /  width if x is not None else 0
+                dy = (np.array(plot.data.y.values) - y) / height if y is not None else 0
+                dist = np.sqrt(np.abs(dx**2) + np.abs(dy**2))
+                idx = np.argmin(dist)
+                error = dist[idx]
             if error < best_error:
                 best_error = error
                 best_plot = plot
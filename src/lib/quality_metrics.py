@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import io
+import csv
+import math
+import dataclasses
+import numpy as np
+
+from .sparam_file import SParamFile
+
+
+
+@dataclasses.dataclass
+class QualityRecord:
+    """ Quality metrics of one file, summarized over all frequencies (see QualityMetrics.summarize()); None if not applicable """
+    path: str
+    n_ports: int|None = None
+    n_points: int|None = None
+    passivity: float|None = None
+    reciprocity: float|None = None
+    symmetry: float|None = None
+    losslessness: float|None = None
+    causality: float|None = None
+    error: str|None = None
+
+
+
+class QualityMetrics:
+    """
+    Quality metrics of S-matrices of shape (..., frequencies, ports, ports), so that they can be calculated for a stack of networks at once.
+      Each metric is zero for an ideal network (e.g. passivity is zero for a passive network), and is returned per frequency.
+
+    calculate() returns all metrics at once, and calculates the intermediate results they have in common (S^T, S^H ⋅ S) only once.
+    """
+
+
+    METRICS = ['passivity', 'reciprocity', 'symmetry', 'losslessness', 'causality']
+    MULTIPORT_METRICS = ['reciprocity', 'symmetry']  # only valid for 2-ports or higher
+    CAUSALITY_STRIDES = [1, 2, 4, 8, 16]
+
+
+    @staticmethod
+    def _gram(s: np.ndarray) -> np.ndarray:
+        """ Returns S^H ⋅ S """
+        return np.matmul(np.conjugate(np.swapaxes(s, -1, -2)), s)
+
+
+    @staticmethod
+    def passivity(s: np.ndarray, gram: np.ndarray|None = None) -> np.ndarray:
+        # A network is passive if λ >= 0 for all eigenvalues λ of U - S^H ⋅ S (see <https://ibis.org/summits/nov10b/tseng.pdf> and also
+        #   <https://www.simberian.com/Presentations/Shlepnev_S_ParameterQualityMetrics_July2014_final.pdf>), i.e. if all eigenvalues of
+        #   S^H ⋅ S are <= 1. This function returns, per frequency, max(0,λ-1) of the highest eigenvalue λ of S^H ⋅ S.
+        if gram is None:
+            gram = QualityMetrics._gram(s)
+        eigenvalues = np.linalg.eigvalsh(gram)  # the matrix is Hermitian, so the eigenvalues are real; for all frequencies at once, in ascending order
+        return np.maximum(0, eigenvalues[...,-1] - 1)
+
+
+    @staticmethod
+    def losslessness(s: np.ndarray, gram: np.ndarray|None = None) -> np.ndarray:
+        # A network is lossless if S^T x S* = U (see e.g. Pozar, 4.3). This function returns, per frequency, the highest element
+        #   of the matrix |S^T ⋅ S* - U|, i.e. if the result is 0, the network is lossless. S^T ⋅ S* is the conjugate of S^H ⋅ S.
+        if gram is None:
+            gram = QualityMetrics._gram(s)
+        return np.max(np.abs(gram - np.eye(s.shape[-1])), axis=(-2,-1))
+
+
+    @staticmethod
+    def reciprocity(s: np.ndarray) -> np.ndarray:
+        # A network is reciprocal if S^T = S (see e.g. Pozar, 1.9), This function returns, per frequency,
+        #   the highest element of the matrix |S^T-S|, i.e. if the result is zero, the network is reciprocal.
+        return np.max(np.abs(np.swapaxes(s, -1, -2) - s), axis=(-2,-1))
+
+
+    @staticmethod
+    def symmetry(s: np.ndarray, reciprocity: np.ndarray|None = None) -> np.ndarray:
+        # I define a network as symmetric if it is reciprocal, and additionally Sii=Sjj=Skk..., This function returns, per frequency,
+        #   the highest element of the matrix |S^T-S|, plus the highest difference between any diagonal elements; i.e. if the result
+        #   is zero, the network is symmetric.
+        if reciprocity is None:
+            reciprocity = QualityMetrics.reciprocity(s)
+        diagonal = np.diagonal(s, axis1=-2, axis2=-1)
+        return reciprocity + np.max(np.abs(diagonal[...,:,np.newaxis] - diagonal[...,np.newaxis,:]), axis=(-2,-1))
+
+
+    @staticmethod
+    def causality(s: np.ndarray) -> np.ndarray:
+        # The response of a causal network rotates clockwise in the complex plane with increasing frequency (see the Shlepnev paper
+        #   above, and IEEE P370). This function returns, per frequency, the length of the difference vectors between adjacent frequencies
+        #   that rotate counter-clockwise, relative to the mean length of these vectors over the whole matrix (so that small parameters,
+        #   like the return loss of a good match, do not dominate); the highest value of all matrix elements. The result is around 1 if
+        #   the network rotates counter-clockwise everywhere, and zero for a causal network.
+        # With densely sampled data, noise changes the direction of adjacent difference vectors more than the rotation does; so the
+        #   rotation is also checked between vectors over <CAUSALITY_STRIDES> frequencies, and only counted if it is counter-clockwise
+        #   for all strides that resolve the rotation of a parameter (i.e. where it rotates less than 45° per stride on average).
+        # A check via the Hilbert transform would need data down to DC, and is not meaningful for data that is truncated at the
+        #   highest frequency.
+        n_freqs = s.shape[-3]
+        result = np.zeros(s.shape[:-2])
+        if n_freqs < 3:
+            return result
+        
+        counter_clockwise = np.ones(s.shape, dtype=bool)
+        resolved_any = np.zeros(s.shape[:-3] + (1,) + s.shape[-2:], dtype=bool)
+        for stride in QualityMetrics.CAUSALITY_STRIDES:
+            if 2*stride >= n_freqs:
+                break
+            steps = s[...,stride:,:,:] - s[...,:-stride,:,:]
+            turn = np.conjugate(steps[...,:-stride,:,:]) * steps[...,stride:,:,:]  # the angle is the rotation from one step to the next
+            resolved = np.median(np.abs(np.angle(turn)), axis=-3, keepdims=True) < math.pi/4
+            turns_ccw = np.zeros(s.shape, dtype=bool)
+            turns_ccw[...,stride:n_freqs-stride,:,:] = np.imag(turn) > 0
+            counter_clockwise &= turns_ccw | ~resolved
+            resolved_any |= resolved
+        counter_clockwise &= resolved_any
+        
+        lengths = np.abs(np.diff(s, axis=-3))
+        mean_length = np.mean(lengths, axis=(-3,-2,-1), keepdims=True)
+        weights = np.sqrt(lengths[...,:-1,:,:] * lengths[...,1:,:,:]) / np.where(mean_length > 0, mean_length, 1)
+        result[...,1:-1] = np.max(np.where(counter_clockwise[...,1:-1,:,:], weights, 0), axis=(-2,-1))
+        return result
+
+
+    @staticmethod
+    def calculate(s: np.ndarray, metrics: list[str]|None = None) -> dict[str,np.ndarray]:
+        """ Returns the <metrics> (default: all that are valid for the number of ports) of the S-matrices <s>, as {name: values per frequency} """
+        if metrics is None:
+            metrics = [m for m in QualityMetrics.METRICS if s.shape[-1] >= 2 or m not in QualityMetrics.MULTIPORT_METRICS]
+        s = np.asarray(s).astype(complex, copy=False)  # in double precision
+        gram = QualityMetrics._gram(s) if ('passivity' in metrics or 'losslessness' in metrics) else None
+        reciprocity = QualityMetrics.reciprocity(s) if ('reciprocity' in metrics or 'symmetry' in metrics) else None
+
+        result = {}
+        for metric in metrics:
+            if metric == 'passivity':
+                result[metric] = QualityMetrics.passivity(s, gram)
+            elif metric == 'losslessness':
+                result[metric] = QualityMetrics.losslessness(s, gram)
+            elif metric == 'reciprocity':
+                result[metric] = reciprocity
+            elif metric == 'symmetry':
+                result[metric] = QualityMetrics.symmetry(s, reciprocity)
+            elif metric == 'causality':
+                result[metric] = QualityMetrics.causality(s)
+            else:
+                raise ValueError(f'Unknown quality metric "{metric}"')
+        return result
+
+
+    @staticmethod
+    def summarize(metrics: dict[str,np.ndarray]) -> dict[str,float]:
+        """ Returns the worst value over all frequencies of each metric; for causality, the mean, so that a few noisy frequencies do not dominate """
+        return {name: float(np.mean(values) if name == 'causality' else np.max(values)) for name,values in metrics.items() if np.size(values) > 0}
+
+
+    @staticmethod
+    def report(files: list[SParamFile]) -> list[QualityRecord]:
+        """ Loads the <files> (see SParamFile.load_many()), and returns their summarized quality metrics """
+        SParamFile.load_many(files)
+        records = []
+        for file in files:
+            record = QualityRecord(path=file.path.full_path)
+            try:
+                nw = file.nw
+                record.n_ports, record.n_points = nw.nports, len(nw.f)
+                for name,value in QualityMetrics.summarize(QualityMetrics.calculate(nw.s)).items():
+                    setattr(record, name, value)
+            except Exception as ex:
+                record.error = str(ex)
+            records.append(record)
+        return records
+
+
+    @staticmethod
+    def to_csv(records: list[QualityRecord], separator: str = ',') -> str:
+        fields = [field.name for field in dataclasses.fields(QualityRecord)]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=separator, lineterminator='\n')
+        writer.writerow(fields)
+        for record in records:
+            writer.writerow(['' if getattr(record, field) is None else getattr(record, field) for field in fields])
+        return buffer.getvalue()
@@ -190,6 +190,15 @@ class SParamViewerAppSettings(AppSettings):
     plot_export_fixed: bool = False
     plot_export_width: int = 400
     plot_export_height: int = 300
+    network_cache: bool = True
+    network_cache_size_mb: int = 1024
+    preload_workers: int = 2
+    bulk_load_processes: int = 0
+    expression_threads: int = 0
+    network_memory_mb: int = 2048
+    file_watch_interval_s: int = 2
+    single_precision: bool = False
+    quick_look_points: int = 0
 
     
     def _reset(self):
@@ -5,15 +5,46 @@ from .network_ext import NetworkExt
 from .path_ext import PathExt
 from .si import SiValue
 from .citi import CitiReader
-from .utils import ArchiveFileLoader, strip_common
+from .touchstone_reader import TouchstoneReader
+from .file_probe import FileProbe
+from .network_bundle import NetworkBundleReader
+from .utils import read_file_from_archive, read_file_chunked, strip_common, is_ext_bundle, is_ext_sweepable, ZipFilePool
 from .file_config import FileConfig
+from .sparam_helpers import get_envelope_indices, FrequencyIndex
+from .network_cache import NetworkCache, NetworkCacheSingleton
+from .network_memory import NetworkMemory
+from .load_handle import LoadHandle
+from .load_stats import LoadStats, LoadRecord
+from .settings import Settings
 
 import numpy as np
 import logging
 import datetime
+import dataclasses
+import time
 import os
-import tempfile
-from typing import Callable
+import threading
+import multiprocessing
+import collections
+import concurrent.futures
+from typing import Any, Callable
+
+
+
+def _read_arrays(path: str, arch_path: str|None, sweep: str|None) -> dict:
+    """ Worker function for SParamFile.load_many(); returns plain arrays, which can be efficiently passed between processes """
+    path_ext = PathExt(path, arch_path=arch_path, sweep=sweep)
+    with LoadStats.measure(path_ext.full_path, keep=False) as record:  # the record is added by the calling process
+        nw, metadata = SParamFile._read(path_ext)
+    return dict(f=nw.f, s=nw.s, z0=nw.z0, name=nw.name, comments=nw.comments, f_unit=nw.frequency.unit, port_modes=np.array(nw.port_modes), metadata=metadata,
+        stats=dataclasses.asdict(record))
+
+
+def _network_from_arrays(arrays: dict) -> tuple[NetworkExt,str|None]:
+    nw = NetworkExt(f=arrays['f'], f_unit='Hz', s=arrays['s'], z0=arrays['z0'], name=arrays['name'], comments=arrays['comments'])
+    nw.frequency.unit = arrays['f_unit']
+    nw.port_modes = arrays['port_modes']
+    return nw, arrays['metadata']
 
 
 
@@ -21,9 +52,19 @@ class SParamFile:
     """Wrapper for a NetworkExt"""
 
 
-    before_load: Callable[[PathExt],bool] = None
     after_load: Callable[[PathExt],None] = None
 
+    MIN_FILES_FOR_BULK_LOAD = 8
+    _process_pool: concurrent.futures.ProcessPoolExecutor|None = None
+    _process_pool_workers: int = 0
+
+    ASYNC_LOAD_THREADS = 2
+    _thread_pool: concurrent.futures.ThreadPoolExecutor|None = None
+
+    MAX_CACHED_SWEEPS = 2
+    _sweeps: collections.OrderedDict[str,tuple[str,list[tuple[str,NetworkExt,str]]]] = collections.OrderedDict()  # full path -> (stamp, sweep)
+    _sweeps_lock = threading.Lock()
+
 
     def __init__(self, path: str|PathExt, tag: int = None, name: str = None, short_name: str = None):
 
@@ -35,6 +76,10 @@ class SParamFile:
         self._name: str = name
         self._short_name: str = short_name
         self._metadata: str = None
+        self._probe: FileProbe|None = None
+        self._probe_failed = False
+        self._reduced: tuple[tuple,NetworkExt]|None = None
+        self._lock = threading.RLock()
 
 
     @property
@@ -43,10 +88,8 @@ class SParamFile:
             return self._name
         elif FileConfig.labels[self.path]:
             return FileConfig.labels[self.path]
-        elif self.path.is_in_arch():
-            return self.path.arch_path_name
         else:
-            return self.path.name
+            return self.path.final_name
     
 
     @property
@@ -54,9 +97,12 @@ class SParamFile:
         if self._short_name is not None:
             return self._short_name
         elif self.path.is_in_arch():
-            return os.path.splitext(self.path.arch_path_name)[0]
+            name = os.path.splitext(self.path.arch_path_name)[0]
         else:
-            return os.path.splitext(self.path.name)[0]
+            name = os.path.splitext(self.path.name)[0]
+        if self.path.is_sweep():
+            name += f', {self.path.sweep}'
+        return name
     
 
     @property
@@ -72,88 +118,457 @@ class SParamFile:
         return super().__eq__(other)
     
 
-    def _load(self):
-        if self._nw is not None:
-            return
+    def _load(self, call_hooks: bool = True, progress: Callable[[int,int],None]|None = None) -> NetworkExt|None:
+        """ Loads the file if necessary, and returns the network (None if loading failed); <progress> is passed to the reader """
+        nw = self._nw
+        if nw is not None:
+            NetworkMemory.touch(self)
+            return nw
+        
+        with self._lock:
+            nw = self._nw
+            if nw is not None:
+                return nw  # was loaded by a different thread in the meantime
+            self._load_locked(call_hooks, progress)
+            nw = self._nw
+        
+        if nw is not None:
+            NetworkMemory.add(self, nw)
+        return nw
 
-        if SParamFile.before_load:
-            if not SParamFile.before_load(self.path):
-                self._error = 'aborted by user'
-                raise RuntimeError(f'Loading aborted by user')
 
-        def load(path: str):
-            try:
-                metadata = None
-                ext = os.path.splitext(path)[1].lower()
+    def _load_locked(self, call_hooks: bool, progress: Callable[[int,int],None]|None = None):
+
+        with LoadStats.measure(self.path.full_path) as record:
+            cached = NetworkCache.get(self.path)
+            if cached is not None:
+                self._nw, self._metadata = SParamFile._to_storage_precision(cached[0]), cached[1]
+                record.cache_hit = True
+            else:
+                try:
+                    self._set_loaded(*SParamFile._read(self.path, progress=progress))
+                except LoadHandle.Cancelled:
+                    raise  # not an error; the file is loaded again on the next access
+                except Exception as ex:
+                    self._set_failed(ex)
+                    record.error = str(ex)
+            SParamFile._add_stats(record, self._nw)
+        
+        if call_hooks and SParamFile.after_load:
+            SParamFile.after_load(self.path)
+
+
+    def _set_loaded(self, nw: NetworkExt, metadata: str|None):
+        self._nw = nw
+        self._metadata = metadata
+        self._error = None
+        NetworkCache.put(self.path, self._nw, self._metadata)
+        SParamFile._to_storage_precision(self._nw)  # the cache always keeps full precision
+
+
+    @staticmethod
+    def _add_stats(record: LoadRecord, nw: NetworkExt|None):
+        if nw is not None:
+            record.n_points, record.n_ports = len(nw.f), nw.number_of_ports
+
+
+    @staticmethod
+    def _to_storage_precision(nw: NetworkExt) -> NetworkExt:
+        """ Converts the network to single precision in-place, if enabled in <Settings.single_precision> """
+        if Settings.single_precision:
+            nw.to_single_precision()
+        return nw
+
+
+    def _unload(self):
+        """ Releases the network to save memory; it is loaded again on the next access """
+        with self._lock:
+            if self._nw is not None:
+                self._probe = FileProbe.from_network(self._nw)
+                self._nw = None
+
+
+    def _set_failed(self, ex: Exception):
+        logging.exception(f'Unable to load network from "{self.path.full_path}" ({ex})')
+        self._error = str(ex)
+        self._nw = None
+        self._metadata = None
+
+
+    @staticmethod
+    def _read(path: PathExt, f_window: tuple[float,float]|None = None, progress: Callable[[int,int],None]|None = None) -> tuple[NetworkExt,str|None]:
+        """
+        Parses the file, and returns the network and metadata; does not touch any SParamFile object, so this can be called in a different process.
+
+        If <f_window> is given, Touchstone files are only parsed within that frequency range; other formats may return the full range.
+
+        If <progress> is given, it is called with (bytes parsed, total bytes) while parsing, and it may raise an exception to cancel;
+          the file is then read in chunks, so that reading from a slow drive can be cancelled as well.
+        """
+
+        if path.is_sweep():
+            if is_ext_bundle(path.arch_path_suffix if path.is_in_arch() else path.suffix):
+                with LoadStats.phase('parse'):
+                    bundle = SParamFile._open_bundle(path)
+                    if path.sweep in bundle.labels:
+                        return bundle.get_network(bundle.labels.index(path.sweep)), None
+                raise RuntimeError(f'Unable to find "{path.sweep}" in <{path.file.full_path}>')
+            for label,nw,metadata in SParamFile.read_sweep(path):
+                if label == path.sweep:
+                    return nw, metadata
+            raise RuntimeError(f'Unable to find "{path.sweep}" in <{path.file.full_path}>')
+
+        def load(path: str, contents: bytes|None = None) -> tuple[NetworkExt,str|None]:
+            metadata = None
+            ext = os.path.splitext(path)[1].lower()
+            with LoadStats.phase('parse'):
                 if ext in ['.cti', '.citi']:
-                    citi = CitiReader(path)
+                    citi = CitiReader(path, contents)
                     nw, metadata = citi.get_network(None, {}, select_default=True)
                 
-                else:
-                    try:
-                        nw = NetworkExt(path)
-                    except ValueError:
-                        # I found this bizarre file in my collection where each line is preceeded with a space... attempt to fix that...
-                        fixed = False
-                        with open(path, 'r') as fp:
-                            lines = fp.readlines()
-                        for i,line in enumerate(lines):
-                            if line.startswith(' '):
-                                if '#' in line or '!' in line:
-                                    lines[i] = line.strip()
-                                    fixed = True
-                        if not fixed:
-                            raise
-                        with tempfile.TemporaryDirectory() as temp_dir:
-                            name = os.path.split(path)[1]
-                            temp_path = os.path.join(temp_dir, name)
-                            with open(temp_path, 'w') as fp:
-                                fp.writelines(lines)
-                            nw = NetworkExt.Network(temp_path)
-
-                    # I think there is a bug in skrf; I only get the 1st comment line
-                    # As a workaround, read the comments manually
-                    comments_lines = []
-                    with open(path, 'r') as fp:
-                        for line in fp.readlines():
-                            if line.startswith('!'):
-                                comments_lines.append(line[1:-1])
-                    if len(comments_lines) > 0:
-                        nw.comments = '\n'.join(strip_common(comments_lines))
+                elif is_ext_bundle(ext):
+                    bundle = NetworkBundleReader(path, contents)
+                    if len(bundle) < 1:
+                        raise RuntimeError(f'Bundle <{path}> is empty')
+                    nw = bundle.get_network(0)
                 
-                assert nw.number_of_ports >= 1, f'Expected at least one port, got {nw.number_of_ports} ports ({path})'
-                assert len(nw.f) >= 1, f'Expected at least one frequency point, got {len(nw.f)} points ({path})'
-                assert len(nw.s.shape) == 3, f'Expected 3-dimensional S-matrix (nxn over frequency), got shape {len(nw.s.shape)} ({path})'
-                assert nw.s.shape[0] >= 1, f'Expected frequency dimension of S-matrix to be at least one, got {nw.s.shape[0]} ({path})'
-                assert nw.s.shape[1] >= 1, f'Expected egress port dimension of S-matrix to be at least one, got {nw.s.shape[1]} ({path})'
-                assert nw.s.shape[2] >= 1, f'Expected ingress port dimension of S-matrix to be at least one, got {nw.s.shape[2]} ({path})'
-                    
-                self._nw = nw
-                self._metadata = metadata
-            except Exception as ex:
-                logging.exception(f'Unable to load network from "{path}" ({ex})')
-                self._error = str(ex)
-                self._nw = None
-                self._metadata = None
+                else:
+                    nw = TouchstoneReader(path, contents, f_window, progress).get_network()
+            
+            with LoadStats.phase('validate'):
+                SParamFile._validate(nw, path)
+            return nw, metadata
         
-        if self.path.is_in_arch():
-            from .utils import ArchiveFileLoader
+        def read(path: PathExt) -> bytes:
+            with LoadStats.phase('extract'):
+                if progress is not None:
+                    contents = read_file_chunked(str(path), path.arch_path, lambda _,total: progress(0, total))  # only parsing counts as progress
+                elif path.is_in_arch():
+                    contents = read_file_from_archive(str(path), path.arch_path)
+                else:
+                    with open(str(path), 'rb') as fp:
+                        contents = fp.read()
+            LoadStats.add_bytes(len(contents))
+            return contents
+
+        if path.is_in_arch():
             try:
-                with ArchiveFileLoader(str(self.path), self.path.arch_path) as extracted_path:
-                    load(extracted_path)
+                result = load(path.arch_path, read(path))
+            except LoadHandle.Cancelled:
+                raise
             except Exception as ex:
-                logging.warning(f'Unable to extract and load <{self.path.arch_path}> from archive <{str(self.path)}> ({ex})')
+                raise RuntimeError(f'Unable to extract and load <{path.arch_path}> from archive <{str(path)}> ({ex})') from ex
+        elif is_ext_bundle(path.suffix):
+            result = load(str(path))  # bundles are memory-mapped, not read
         else:
-            load(str(self.path))
+            result = load(str(path), read(path))
         
-        if SParamFile.after_load:
-            SParamFile.after_load(self.path)
+        if progress is not None:
+            size = SParamFile._get_size(path)
+            progress(size, size)
+        return result
+
+
+    @staticmethod
+    def _validate(nw: NetworkExt, path: str):
+        assert nw.number_of_ports >= 1, f'Expected at least one port, got {nw.number_of_ports} ports ({path})'
+        assert len(nw.f) >= 1, f'Expected at least one frequency point, got {len(nw.f)} points ({path})'
+        assert len(nw.s.shape) == 3, f'Expected 3-dimensional S-matrix (nxn over frequency), got shape {len(nw.s.shape)} ({path})'
+        assert nw.s.shape[0] >= 1, f'Expected frequency dimension of S-matrix to be at least one, got {nw.s.shape[0]} ({path})'
+        assert nw.s.shape[1] >= 1, f'Expected egress port dimension of S-matrix to be at least one, got {nw.s.shape[1]} ({path})'
+        assert nw.s.shape[2] >= 1, f'Expected ingress port dimension of S-matrix to be at least one, got {nw.s.shape[2]} ({path})'
+
+
+    @staticmethod
+    def _get_size(path: PathExt) -> int:
+        """ Returns the size of the file, or of the archive member, in bytes """
+        if path.is_in_arch():
+            return ZipFilePool.get(str(path)).getinfo(path.arch_path).file_size
+        return os.path.getsize(str(path))
+
+
+    @staticmethod
+    def _reduce(nw: NetworkExt, f_start: float|None, f_stop: float|None, decimation: int|None, max_points: int|None) -> NetworkExt:
+        """ Returns a copy of the network, cropped to [f_start, f_stop], and then decimated, or reduced to the envelope of <max_points> """
+        indices = np.arange(len(nw.f))[FrequencyIndex.get(nw.f).range(f_start, f_stop)]
+        if decimation is not None and decimation > 1:
+            indices = indices[::decimation]
+        if max_points is not None and max_points > 0:
+            indices = indices[get_envelope_indices(nw.s[indices], max_points)]
+        if len(indices) < 1:
+            raise RuntimeError(f'No frequency points within the range {f_start} Hz to {f_stop} Hz')
+
+        result = NetworkExt(f=nw.f[indices], f_unit='Hz', s=nw.s[indices], z0=nw.z0[indices], name=nw.name, comments=nw.comments)
+        result.frequency.unit = nw.frequency.unit
+        result.port_modes = nw.port_modes
+        result.ports = nw.ports
+        return result
+
+
+    def load_reduced(self, f_start: float|None = None, f_stop: float|None = None, *, decimation: int|None = None, max_points: int|None = None) -> NetworkExt|None:
+        """
+        Returns a reduced version of the network for a quick look, without keeping the full network in memory: only the frequencies
+          within [<f_start>, <f_stop>], and of those, only every <decimation>th point, or at most about <max_points> points which
+          preserve the min/max envelope of every parameter. Returns None if loading failed.
+
+        If the file is loaded (or in the network cache) already, it is reduced from memory; otherwise it is parsed, and for
+          Touchstone files, only the records within the frequency range are parsed. The last result (or failure) is kept.
+        """
+        key = (f_start, f_stop, decimation, max_points)
+        with self._lock:
+            if self._reduced is not None and self._reduced[0] == key:
+                return self._reduced[1]
+            nw, error = self._nw, self._error
+        
+        # parsing does not hold the lock, so e.g. the GUI can still query the last result meanwhile
+        try:
+            if nw is None:
+                cached = NetworkCache.get(self.path)
+                if cached is not None:
+                    nw = cached[0]
+                else:
+                    if error is not None:
+                        return None
+                    f_window = (-np.inf if f_start is None else f_start, np.inf if f_stop is None else f_stop)
+                    nw = SParamFile._read(self.path, f_window if (f_start is not None or f_stop is not None) else None)[0]
+            reduced = SParamFile._reduce(nw, f_start, f_stop, decimation, max_points)
+        except Exception as ex:
+            logging.warning(f'Unable to load reduced network from "{self.path.full_path}" ({ex})')
+            reduced = None
+        with self._lock:
+            self._reduced = (key, reduced)
+        return reduced
+
+
+    def has_reduced(self, f_start: float|None = None, f_stop: float|None = None, *, decimation: int|None = None, max_points: int|None = None) -> bool:
+        """ Returns True if load_reduced() with the same arguments returns immediately, because its result (or failure) is kept """
+        with self._lock:
+            return self._reduced is not None and self._reduced[0] == (f_start, f_stop, decimation, max_points)
+
+
+    def reduced_copy(self, f_start: float|None = None, f_stop: float|None = None, *, decimation: int|None = None, max_points: int|None = None) -> SParamFile:
+        """ Returns a stand-in for this file that holds the network from load_reduced(); returns this file itself if that fails """
+        nw = self.load_reduced(f_start, f_stop, decimation=decimation, max_points=max_points)
+        if nw is None:
+            return self
+        return self._reduced_stand_in(nw)
+
+
+    def last_reduced_copy(self) -> SParamFile|None:
+        """ Returns a stand-in for this file that holds the last result of load_reduced(), whatever its arguments were; or None if there is none """
+        with self._lock:
+            nw = self._reduced[1] if self._reduced is not None else None
+        if nw is None:
+            return None
+        return self._reduced_stand_in(nw)
+
+
+    def _reduced_stand_in(self, nw: NetworkExt) -> SParamFile:
+        result = SParamFile(self.path, self.tag, self._name, self._short_name)
+        result._nw, result._metadata = nw, self._metadata
+        return result
+
+
+    @staticmethod
+    def _open_bundle(path: PathExt) -> NetworkBundleReader:
+        if path.is_in_arch():
+            return NetworkBundleReader(path.arch_path, read_file_from_archive(str(path), path.arch_path))
+        return NetworkBundleReader(str(path))
+
+
+    @staticmethod
+    def read_sweep(path: PathExt) -> list[tuple[str,NetworkExt,str]]:
+        """
+        Parses a CITI file once, and returns (label, network, metadata) for every combination of its swept coordinates, where
+          the label are the coordinate values (e.g. "BIAS=0.5, TEMP=25"). The result is kept for the last few files, so that
+          loading the slices of a file one-by-one does not parse the file again each time.
+
+        For network bundles, the label is the name of each network; bundles are memory-mapped anyway, so they are not kept.
+        """
+        path = path.file
+        if is_ext_bundle(path.arch_path_suffix if path.is_in_arch() else path.suffix):
+            bundle = SParamFile._open_bundle(path)
+            return [(label, nw, None) for label,nw in zip(bundle.labels, bundle.get_networks())]
+
+        key, stamp = path.full_path, NetworkCacheSingleton.get_stamp(path)
+        with SParamFile._sweeps_lock:
+            if key in SParamFile._sweeps and SParamFile._sweeps[key][0] == stamp:
+                SParamFile._sweeps.move_to_end(key)
+                return SParamFile._sweeps[key][1]
+
+        if path.is_in_arch():
+            with LoadStats.phase('extract'):
+                contents = read_file_from_archive(str(path), path.arch_path)
+            LoadStats.add_bytes(len(contents))
+            citi = CitiReader(path.arch_path, contents)
+        else:
+            citi = CitiReader(str(path))
+        with LoadStats.phase('parse'):
+            sweep = [(', '.join([f'{k}={v}' for k,v in at_coords.items()]), nw, metadata) for at_coords,nw,metadata in citi.get_networks()]
+        
+        with SParamFile._sweeps_lock:
+            SParamFile._sweeps[key] = (stamp, sweep)
+            SParamFile._sweeps.move_to_end(key)
+            while len(SParamFile._sweeps) > SParamFile.MAX_CACHED_SWEEPS:
+                SParamFile._sweeps.popitem(last=False)
+        return sweep
+
+
+    @staticmethod
+    def find_sweep(path: PathExt) -> list[PathExt]:
+        """ Returns the paths of all slices of a swept CITI file or network bundle; empty if the file has only one slice """
+        suffix = path.arch_path_suffix if path.is_in_arch() else path.suffix
+        if not is_ext_sweepable(suffix):
+            return []
+        if is_ext_bundle(suffix):
+            labels = SParamFile._open_bundle(path).labels
+        else:
+            labels = [label for label,_,_ in SParamFile.read_sweep(path)]
+        if len(labels) < 2:
+            return []
+        return [PathExt(str(path), arch_path=path.arch_path, sweep=label) for label in labels]
+
+
+    def preload(self):
+        """ Loads the file without calling the after_load hook, so this can be called from any thread """
+        if self._error is not None:
+            return
+        self._load(call_hooks=False)
+
+
+    @staticmethod
+    def load_async(files: list[SParamFile], progress_fn: Callable[[int,int],None]|None = None, loaded_fn: Callable[[SParamFile],None]|None = None,
+            reduced: dict[str,Any]|None = None) -> LoadHandle:
+        """
+        Loads the files one-by-one in a background thread, and returns a handle to cancel loading, or to wait for it.
+
+        <progress_fn>(bytes parsed, total bytes) is called while files are parsed, and <loaded_fn>(file) after each file;
+          both are called from the background thread. See LoadHandle.
+
+        If <reduced> is given (the arguments of load_reduced()), the files are not loaded; instead, their reduced networks are
+          prepared, so that load_reduced() with the same arguments returns immediately afterwards.
+        """
+        if reduced is not None:
+            pending = [file for file in files if not file.has_reduced(**reduced) and file._error is None]
+        else:
+            pending = [file for file in files if not file.loaded and file._error is None]
+        handle = LoadHandle(progress_fn, loaded_fn)
+
+        def run() -> list[SParamFile]:
+            sizes = []
+            for file in pending:
+                try:
+                    sizes.append(SParamFile._get_size(file.path))
+                except Exception:
+                    sizes.append(0)  # the error shows up when the file is loaded
+            handle._start(sum(sizes))
+
+            loaded = []
+            try:
+                for file,size in zip(pending, sizes):
+                    handle.check_cancelled()
+                    if reduced is not None:
+                        file.load_reduced(**reduced)  # not cancellable while parsing, but only the requested range is parsed
+                    else:
+                        file._load(call_hooks=False, progress=handle._on_file_progress)
+                    loaded.append(file)
+                    handle._on_file_loaded(file, size)
+            except LoadHandle.Cancelled:
+                logging.info(f'Loading was cancelled after {len(loaded)} of {len(pending)} file(s)')
+            return loaded
+
+        if SParamFile._thread_pool is None:
+            SParamFile._thread_pool = concurrent.futures.ThreadPoolExecutor(SParamFile.ASYNC_LOAD_THREADS, thread_name_prefix='SParamFile')
+        handle._future = SParamFile._thread_pool.submit(run)
+        return handle
+
+
+    @staticmethod
+    def load_many(files: list[SParamFile], workers: int|None = None, executor: concurrent.futures.Executor|None = None, call_hooks: bool = True):
+        """
+        Loads many files at once, parsing them in a pool of <workers> processes (default: <Settings.bulk_load_processes>).
+
+        The worker processes only return the parsed arrays; the networks are assembled in the calling process. If there
+          are only a few files to load, or only one worker, the files are loaded sequentially instead. An existing
+          <executor> may be given, which is then used instead of the shared process pool.
+        """
+        pending = [file for file in files if not file.loaded and file._error is None]
+
+        # the cache is much faster than any worker process
+        uncached = []
+        for file in pending:
+            with file._lock:
+                t_start = time.perf_counter()
+                cached = NetworkCache.get(file.path)
+                if cached is not None:
+                    file._nw, file._metadata = SParamFile._to_storage_precision(cached[0]), cached[1]
+                    record = LoadRecord(file.path.full_path, time.time(), t_total=time.perf_counter()-t_start, cache_hit=True)
+                    SParamFile._add_stats(record, file._nw)
+                    LoadStats.add(record)
+                else:
+                    uncached.append(file)
+            if cached is not None:
+                NetworkMemory.add(file, cached[0])
+        
+        if executor is None:
+            if workers is None:
+                workers = Settings.bulk_load_processes if Settings.bulk_load_processes > 0 else (os.cpu_count() or 1)
+            if workers < 2 or len(uncached) < SParamFile.MIN_FILES_FOR_BULK_LOAD:
+                for file in uncached:
+                    file._load(call_hooks=False)
+                    if call_hooks and SParamFile.after_load:
+                        SParamFile.after_load(file.path)
+                return
+            executor = SParamFile._get_process_pool(workers)
+        
+        futures = [executor.submit(_read_arrays, str(file.path), file.path.arch_path, file.path.sweep) for file in uncached]
+        for file,future in zip(uncached, futures):
+            with file._lock:
+                if file._nw is None:
+                    try:
+                        arrays = future.result()
+                        file._set_loaded(*_network_from_arrays(arrays))
+                        record = LoadRecord(**arrays['stats'])
+                        SParamFile._add_stats(record, file._nw)
+                        LoadStats.add(record)
+                    except Exception as ex:
+                        file._set_failed(ex)
+                        LoadStats.add(LoadRecord(file.path.full_path, time.time(), error=str(ex)))
+                nw = file._nw
+            if nw is not None:
+                NetworkMemory.add(file, nw)
+            if call_hooks and SParamFile.after_load:
+                SParamFile.after_load(file.path)
+
+
+    @staticmethod
+    def _get_process_pool(workers: int) -> concurrent.futures.ProcessPoolExecutor:
+        if SParamFile._process_pool is None or SParamFile._process_pool_workers != workers:
+            if SParamFile._process_pool is not None:
+                SParamFile._process_pool.shutdown(wait=False)
+            # use "spawn", because forking a process that runs Qt and other threads is not safe
+            SParamFile._process_pool = concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            SParamFile._process_pool_workers = workers
+        return SParamFile._process_pool
 
     
     @property
     def nw(self) -> "NetworkExt":
-        self._load()
-        return self._nw
+        return self._load()
+    
+
+    @property
+    def probe(self) -> FileProbe|None:
+        """ Returns port count and frequency range, without loading the file if it is not loaded yet; None if the file cannot be probed """
+        if self._nw is not None:
+            return FileProbe.from_network(self._nw)
+        if self._probe is None and not self._probe_failed and self._error is None:
+            try:
+                self._probe = FileProbe.from_file(self.path)
+            except Exception as ex:
+                logging.debug(f'Unable to probe "{self.path.full_path}" ({ex})')
+                self._probe_failed = True
+        return self._probe
     
 
     @property
@@ -1,5 +1,8 @@
 import numpy as np
 import math
+import threading
+import weakref
+import collections
 import scipy.interpolate
 from typing import Callable, Any
 from .network_ext import NetworkExt
@@ -104,6 +107,176 @@ def get_missing_freq_dc_and_equidist(f: np.ndarray, max_rel_error: float = 1e-6)
     return True, np.linspace(0, f_first-f_step, n_steps, dtype=f.dtype)
 
 
+def get_envelope_indices(s: np.ndarray, max_points: int) -> np.ndarray:
+    """ Returns sorted indices along the 1st axis of <s>, which keep the first and last point, and the minimum and maximum
+    magnitude of every parameter in each of <max_points>/2 buckets; so the envelope of every parameter is preserved, but for
+    more than one parameter, the result may have more than <max_points> indices """
+    n = s.shape[0]
+    if n <= max_points:
+        return np.arange(n)
+
+    bucket_size = math.ceil(n / max(1, max_points//2))
+    n_buckets = math.ceil(n / bucket_size)
+    mag = np.abs(s.reshape(n, -1))
+    padding = n_buckets*bucket_size - n
+    mag_min = np.pad(mag, ((0,padding),(0,0)), constant_values=np.inf).reshape(n_buckets, bucket_size, -1)
+    mag_max = np.pad(mag, ((0,padding),(0,0)), constant_values=-np.inf).reshape(n_buckets, bucket_size, -1)
+    offsets = (np.arange(n_buckets) * bucket_size)[:,None]
+    indices_min = offsets + np.argmin(mag_min, axis=1)
+    indices_max = offsets + np.argmax(mag_max, axis=1)
+    return np.unique(np.concatenate([[0, n-1], indices_min.ravel(), indices_max.ravel()]))
+
+
+class InterpolationTable:
+    """
+    Linear interpolation from the frequencies <f> to <f_new>, like np.interp() (i.e. values outside of <f> are clamped), but for
+      whole blocks of parameters along their 1st axis (e.g. an S-matrix of shape (frequencies, ports, ports)). The indices and
+      weights are only calculated once, and get() re-uses them for all networks on the same frequency grids; grids are looked
+      up by their fingerprint(), so that thousands of networks on a few distinct grids only need a few tables.
+    """
+
+
+    MAX_CACHED = 32
+    BLOCK_SIZE = 64
+    _cache: "collections.OrderedDict[tuple,InterpolationTable]" = collections.OrderedDict()
+    _cache_lock = threading.Lock()
+
+
+    def __init__(self, f: np.ndarray, f_new: np.ndarray):
+        self.f, self.f_new = np.asarray(f), np.asarray(f_new)
+        if len(self.f) < 1:
+            raise ValueError('Cannot interpolate: at least one frequency sample is required')
+        if len(self.f) == 1:
+            self._idx_lo = self._idx_hi = np.zeros(len(self.f_new), dtype=int)
+            self._weight = np.zeros(len(self.f_new))
+        else:
+            self._idx_lo = np.clip(np.searchsorted(self.f, self.f_new, side='right') - 1, 0, len(self.f) - 2)
+            self._idx_hi = self._idx_lo + 1
+            f_lo, f_hi = self.f[self._idx_lo], self.f[self._idx_hi]
+            self._weight = np.clip((self.f_new - f_lo) / (f_hi - f_lo), 0, 1)
+
+
+    @staticmethod
+    def fingerprint(f: np.ndarray) -> tuple:
+        """ Returns a hashable key of a frequency grid: (count, start, stop, hash of all values) """
+        f = np.ascontiguousarray(f, dtype=float)
+        if len(f) < 1:
+            return (0,)
+        return (len(f), float(f[0]), float(f[-1]), hash(f.tobytes()))
+
+
+    @staticmethod
+    def get(f: np.ndarray, f_new: np.ndarray, f_new_fingerprint: "tuple|None" = None) -> "InterpolationTable":
+        """ Returns a table for the given grids, re-using a recently used one if possible; <f_new_fingerprint> saves hashing <f_new> again for many networks """
+        if f_new_fingerprint is None:
+            f_new_fingerprint = InterpolationTable.fingerprint(f_new)
+        key = (InterpolationTable.fingerprint(f), f_new_fingerprint)
+        with InterpolationTable._cache_lock:
+            if (table := InterpolationTable._cache.get(key)) is not None:
+                InterpolationTable._cache.move_to_end(key)
+                return table
+        table = InterpolationTable(f, f_new)
+        with InterpolationTable._cache_lock:
+            InterpolationTable._cache[key] = table
+            while len(InterpolationTable._cache) > InterpolationTable.MAX_CACHED:
+                InterpolationTable._cache.popitem(last=False)
+        return table
+
+
+    def _interp(self, values: np.ndarray) -> np.ndarray:
+        weight = self._weight.reshape(-1, *([1] * (values.ndim - 1)))
+        if not np.issubdtype(values.dtype, np.inexact):
+            values = values.astype(float)
+        result = values[self._idx_lo]
+        result += (values[self._idx_hi] - result) * weight
+        return result
+
+
+    def __call__(self, values: np.ndarray, polar: bool = True) -> np.ndarray:
+        """ Interpolates <values> (1st axis is frequency); <polar> interpolates magnitude and unwrapped phase, otherwise real and imaginary part """
+        values = np.asarray(values)
+        if len(values) != len(self.f):
+            raise ValueError(f'Expected {len(self.f)} values to interpolate, got {len(values)}')
+        if not polar:
+            return self._interp(values)
+        
+        # blocks of parameters are processed one after another, so that the intermediate results stay in the CPU cache
+        columns = values.reshape(len(self.f), -1)
+        result = np.empty((len(self.f_new), columns.shape[1]), dtype=complex, order='F' if columns.flags.f_contiguous else 'C')
+        for i in range(0, columns.shape[1], InterpolationTable.BLOCK_SIZE):
+            block = columns[:,i:i+InterpolationTable.BLOCK_SIZE]
+            mag, pha = np.abs(block), np.unwrap(np.angle(block), axis=0)
+            mag_int, pha_int = self._interp(mag), self._interp(pha)
+            result_block = result[:,i:i+InterpolationTable.BLOCK_SIZE]
+            np.multiply(mag_int, np.cos(pha_int), out=result_block.real)
+            np.multiply(mag_int, np.sin(pha_int), out=result_block.imag)
+        return result.reshape(len(self.f_new), *values.shape[1:])
+
+
+class FrequencyIndex:
+    """
+    Lookups in a frequency grid <f> (or any other 1D array, e.g. the X-values of a plot) by binary search: range() returns a slice
+      for cropping, so that arrays can be cropped without copying, and nearest() returns the index of the closest frequency.
+      If the grid is not ascending, both fall back to a linear search. get() re-uses the index of the same array object, so
+      that the grid is only checked once.
+    """
+
+
+    MAX_CACHED = 32
+    _cache: "collections.OrderedDict[int,tuple[weakref.ref,FrequencyIndex]]" = collections.OrderedDict()
+    _cache_lock = threading.Lock()
+
+
+    def __init__(self, f: np.ndarray):
+        self.f = np.asarray(f)
+        self.ascending = len(self.f) < 2 or bool(np.all(self.f[1:] >= self.f[:-1]))
+
+
+    @staticmethod
+    def get(f: np.ndarray) -> "FrequencyIndex":
+        """ Returns the index of <f>, re-using a recently used one if <f> is the same array object """
+        if not isinstance(f, np.ndarray):
+            return FrequencyIndex(f)  # a new array every time, so there is nothing to re-use
+        key = id(f)
+        with FrequencyIndex._cache_lock:
+            if (entry := FrequencyIndex._cache.get(key)) is not None and entry[0]() is f:
+                FrequencyIndex._cache.move_to_end(key)
+                return entry[1]
+        index = FrequencyIndex(f)
+        with FrequencyIndex._cache_lock:
+            FrequencyIndex._cache[key] = (weakref.ref(f), index)
+            FrequencyIndex._cache.move_to_end(key)
+            while len(FrequencyIndex._cache) > FrequencyIndex.MAX_CACHED:
+                FrequencyIndex._cache.popitem(last=False)
+        return index
+
+
+    def range(self, f_start: "float|None" = None, f_end: "float|None" = None) -> "slice|np.ndarray":
+        """ Returns the indices of all frequencies from <f_start> to <f_end> (inclusive; None means unlimited); a slice if the grid is ascending """
+        if not self.ascending:
+            mask = np.ones(len(self.f), dtype=bool)
+            if f_start is not None:
+                mask &= self.f >= f_start
+            if f_end is not None:
+                mask &= self.f <= f_end
+            return np.flatnonzero(mask)
+        idx0 = 0 if f_start is None else int(np.searchsorted(self.f, f_start, side='left'))
+        idx1 = len(self.f) if f_end is None else int(np.searchsorted(self.f, f_end, side='right'))
+        return slice(idx0, max(idx0, idx1))
+
+
+    def nearest(self, f: float) -> int:
+        """ Returns the index of the frequency closest to <f>; the lower one if two are equally close, like np.argmin() """
+        if len(self.f) < 1:
+            raise ValueError('Cannot look up a frequency in an empty grid')
+        if not self.ascending:
+            return int(np.argmin(np.abs(self.f - f)))
+        idx = int(np.clip(np.searchsorted(self.f, f, side='left'), 1, max(1, len(self.f) - 1)))
+        if idx >= len(self.f) or abs(f - self.f[idx-1]) <= abs(self.f[idx] - f):
+            return idx - 1
+        return idx
+
+
 def interpolate_freq(f: np.ndarray, s: np.ndarray, f_new: np.ndarray) -> tuple[np.ndarray,np.ndarray]:
     mag, pha = np.abs(s), np.unwrap(np.angle(s))
 
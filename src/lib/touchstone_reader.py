@@ -0,0 +1,305 @@
+from .network_ext import NetworkExt
+from .utils import strip_common
+
+import io
+import os
+import re
+import logging
+import numpy as np
+from typing import Callable
+
+
+
+class TouchstoneReader:
+    """
+    Native reader for Touchstone 1.x/2.x files.
+
+    The whole data block is tokenized in one pass and converted with NumPy, and comments, option line and
+      data are all collected from the same in-memory text. Features this reader does not handle natively
+      (noise data, Y/Z/G/H-parameters, HFSS port impedance comments) are handed over to scikit-rf.
+    """
+
+
+    class Unsupported(Exception):
+        pass
+
+
+    FREQUENCY_MULTIPLIERS = { 'hz': 1.0, 'khz': 1e3, 'mhz': 1e6, 'ghz': 1e9 }
+    PROGRESS_CHUNK_SIZE = 4*1024*1024
+
+
+    def __init__(self, filename: str, contents: str|bytes|None = None, f_window: tuple[float,float]|None = None, progress: Callable[[int,int],None]|None = None):
+        """
+        Reads <filename> from disk, unless <contents> is given; <filename> is then only used for the extension and network name.
+
+        If <f_window> is given (in Hz), only the records within that frequency range are returned; if every record is on one line,
+          only those records are parsed.
+
+        If <progress> is given, the data is parsed in chunks, and <progress>(characters parsed, total characters) is called after
+          each chunk; it may raise an exception to cancel parsing.
+        """
+        self.filename = filename
+        self.f_window = f_window
+        self.progress = progress
+        if contents is None:
+            with open(filename, 'rb') as fp:
+                contents = fp.read()
+        if isinstance(contents, bytes):
+            contents = TouchstoneReader._decode(contents)
+        self._contents = contents
+        self.comments = self._get_comments()
+
+
+    @staticmethod
+    def _decode(data: bytes) -> str:
+        try:
+            return data.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return data.decode('ISO-8859-1')
+
+
+    @staticmethod
+    def _find_lines(text: str, char: str) -> list[tuple[int,int,int]]:
+        """ Returns (line start, char position, line end) of every line that contains <char> """
+        result = []
+        pos = text.find(char)
+        while pos >= 0:
+            start = text.rfind('\n', 0, pos) + 1
+            end = text.find('\n', pos)
+            if end < 0:
+                end = len(text)
+            result.append((start, pos, end))
+            pos = text.find(char, end)
+        return result
+
+
+    @staticmethod
+    def _crop_records(text: str, values_per_record: int, f_start: float, f_stop: float) -> str:
+        """ Returns the part of <text> with the records within [f_start, f_stop] (in the units of the file), found by a binary
+        search; returns <text> as it is if not every record is on one line (checked for the first and the last line) """
+
+        def find_line(pos: int) -> tuple[int,float]|None:
+            """ Returns start and frequency of the first non-empty line that starts at or after <pos> """
+            if pos > 0:
+                pos = text.find('\n', pos-1) + 1
+                if pos == 0:
+                    return None
+            while pos < len(text):
+                end = text.find('\n', pos)
+                end = len(text) if end < 0 else end
+                tokens = text[pos:end].split(None, 1)
+                if len(tokens) > 0:
+                    return pos, float(tokens[0])
+                pos = end + 1
+            return None
+
+        stripped = text.strip()
+        first_line, last_line = stripped[:stripped.find('\n')], stripped[stripped.rfind('\n')+1:]
+        if '\n' not in stripped or len(first_line.split()) != values_per_record or len(last_line.split()) != values_per_record:
+            return text
+
+        def find_first(predicate: Callable[[float],bool]) -> int:
+            lo, hi = 0, len(text)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                line = find_line(mid)
+                if line is None or predicate(line[1]):
+                    hi = mid
+                else:
+                    lo = mid + 1
+            line = find_line(lo)
+            return len(text) if line is None else line[0]
+
+        return text[find_first(lambda f: f >= f_start):find_first(lambda f: f > f_stop)]
+
+
+    def _tokenize(self, text: str) -> np.ndarray:
+        """ Converts the data block to numbers; in chunks of whole lines if progress is reported """
+        if self.progress is None:
+            return np.fromstring(text, sep=' ')
+
+        offset = len(self._contents) - len(text)  # roughly where the data block starts
+        chunks, pos = [], 0
+        while pos < len(text):
+            end = text.find('\n', pos + TouchstoneReader.PROGRESS_CHUNK_SIZE)
+            end = len(text) if end < 0 else end
+            chunks.append(np.fromstring(text[pos:end], sep=' '))
+            pos = end
+            self.progress(offset + pos, len(self._contents))
+        return np.concatenate(chunks) if len(chunks) > 0 else np.array([])
+
+
+    def _get_comments(self) -> list[str]:
+        self._comment_spans = TouchstoneReader._find_lines(self._contents, '!')
+        return [self._contents[pos+1:end].rstrip('\r') for start,pos,end in self._comment_spans if self._contents[start:pos].strip()=='']
+
+
+    def get_network(self) -> NetworkExt:
+        try:
+            nw = self._parse()
+        except TouchstoneReader.Unsupported as ex:
+            logging.debug(f'Using scikit-rf to read <{self.filename}> ({ex})')
+            nw = self._parse_with_skrf()
+            if self.f_window is not None:
+                nw.crop(*self.f_window, unit='Hz')
+
+        # I think there is a bug in skrf; I only get the 1st comment line; so I always use the manually collected ones
+        if len(self.comments) > 0:
+            nw.comments = '\n'.join(strip_common(self.comments))
+        return nw
+
+
+    def _parse_with_skrf(self) -> NetworkExt:
+        buffer = io.StringIO(self._contents)
+        buffer.name = os.path.split(self.filename)[1]
+        nw = NetworkExt(buffer)
+        nw.name = os.path.splitext(os.path.split(self.filename)[1])[0]
+        return nw
+
+
+    def _parse(self) -> NetworkExt:
+
+        if any(comment.strip().lower().startswith(('gamma', 'port impedance')) for comment in self.comments):
+            raise TouchstoneReader.Unsupported('file contains HFSS port impedances')
+
+        # remove all comments; str.find() is a lot faster than a regex over the whole data block
+        body, last = [], 0
+        for start,pos,end in self._comment_spans:
+            body.append(self._contents[last:pos])
+            last = end
+        body.append(self._contents[last:])
+        body = ''.join(body)
+
+        keyword_lines = TouchstoneReader._find_lines(body, '#') + TouchstoneReader._find_lines(body, '[')
+        keyword_lines = sorted(set([(start,end) for start,_,end in keyword_lines]))
+
+        version, option_line, keywords = '1.0', None, {}
+        data_start, data_end = 0, len(body)
+        for i,(start,end) in enumerate(keyword_lines):
+            line = body[start:end].strip()
+            next_start = keyword_lines[i+1][0] if i+1 < len(keyword_lines) else len(body)
+            if line.startswith('#'):
+                if option_line is None:
+                    option_line = line
+                continue
+            m = re.match(r'\[([^\]]+)\](.*)', line)
+            if not m:
+                raise ValueError(f'Invalid keyword line "{line}"')
+            keyword, argument = m.group(1).strip().lower(), m.group(2).strip()
+            if keyword == 'version':
+                version = argument
+            elif keyword == 'reference':
+                # the reference impedances may continue on the following lines
+                argument = argument + ' ' + body[end:next_start]
+            elif keyword == 'network data':
+                data_start, data_end = end, next_start
+            elif keyword == 'noise data':
+                raise TouchstoneReader.Unsupported('file contains noise data')
+            keywords[keyword] = argument
+
+        if version.startswith('1'):
+            data_text, last = [], 0
+            for start,end in keyword_lines:
+                data_text.append(body[last:start])
+                last = end
+            data_text.append(body[last:])
+            data_text = ''.join(data_text)
+        else:
+            if 'network data' not in keywords:
+                raise ValueError(f'Touchstone {version} file has no [Network Data] section')
+            data_text = body[data_start:data_end]
+
+        # option line, see Touchstone specification; missing entries are filled with defaults
+        options = (option_line or '#')[1:].lower().split()
+        options.extend(['ghz', 's', 'ma', 'r', '50'][len(options):])
+        f_unit, parameter, format, resistance = options[0], options[1], options[2], complex(options[4])
+        if f_unit not in TouchstoneReader.FREQUENCY_MULTIPLIERS:
+            raise ValueError(f'Illegal frequency unit "{f_unit}"')
+        if parameter != 's':
+            raise TouchstoneReader.Unsupported(f'file contains {parameter.upper()}-parameters')
+        if format not in ['ma', 'db', 'ri']:
+            raise ValueError(f'Illegal format "{format}"')
+
+        if 'number of ports' in keywords:
+            n_ports = int(keywords['number of ports'])
+        else:
+            m = re.match(r'\.[ghsyz](\d+)p$', os.path.splitext(self.filename)[1].lower())
+            if not m:
+                raise ValueError(f'Unable to determine number of ports of <{self.filename}>')
+            n_ports = int(m.group(1))
+        if n_ports < 1:
+            raise ValueError(f'Expected at least one port, got {n_ports}')
+
+        matrix_format = keywords.get('matrix format', 'full').split()[0].lower() if keywords.get('matrix format') else 'full'
+        two_port_order_legacy = ('21_12' in keywords['two-port data order']) if 'two-port data order' in keywords else True
+        if 'reference' in keywords:
+            reference = np.array(keywords['reference'].split()[:n_ports], dtype=float)
+        else:
+            reference = resistance
+
+        values_per_point = 1 + (2*n_ports*n_ports if matrix_format=='full' else n_ports*(n_ports+1))
+        if self.f_window is not None:
+            multiplier = TouchstoneReader.FREQUENCY_MULTIPLIERS[f_unit]
+            data_text = TouchstoneReader._crop_records(data_text, values_per_point, self.f_window[0]/multiplier, self.f_window[1]/multiplier)
+        values = self._tokenize(data_text)
+        if len(values) % values_per_point != 0:
+            if version.startswith('1') and n_ports == 2:
+                raise TouchstoneReader.Unsupported('file seems to contain noise data')
+            raise ValueError(f'Expected the number of data values to be a multiple of {values_per_point}, got {len(values)}')
+        raw = values.reshape(-1, values_per_point)
+        f = raw[:,0] * TouchstoneReader.FREQUENCY_MULTIPLIERS[f_unit]
+        if version.startswith('1') and n_ports == 2 and np.any(np.diff(f) < 0):
+            raise TouchstoneReader.Unsupported('file seems to contain noise data')
+        if self.f_window is not None:
+            in_window = (f >= self.f_window[0]) & (f <= self.f_window[1])
+            raw, f = raw[in_window], f[in_window]
+
+        pairs = raw[:,1:]
+        if format == 'ri':
+            s_flat = pairs[:,0::2] + 1j*pairs[:,1::2]
+        else:
+            mag = 10**(pairs[:,0::2]/20) if format == 'db' else pairs[:,0::2]
+            s_flat = mag * np.exp(1j*np.deg2rad(pairs[:,1::2]))
+
+        s = np.empty([len(f), n_ports*n_ports], dtype=complex)
+        if matrix_format == 'full':
+            s[:] = s_flat
+        elif matrix_format in ['lower', 'upper']:
+            index = np.tril_indices(n_ports) if matrix_format == 'lower' else np.triu_indices(n_ports)
+            s[:,np.ravel_multi_index(index, (n_ports,n_ports))] = s_flat
+        else:
+            raise ValueError(f'Illegal matrix format "{matrix_format}"')
+
+        s = s.reshape(-1, n_ports, n_ports)
+        if n_ports == 2 and two_port_order_legacy:
+            s = np.transpose(s, axes=(0,2,1))
+        if matrix_format == 'upper':
+            index_lower = np.tril_indices(n_ports)
+            s[(...,*index_lower)] = s.transpose(0,2,1)[(...,*index_lower)]
+        elif matrix_format == 'lower':
+            index_upper = np.triu_indices(n_ports)
+            s[(...,*index_upper)] = s.transpose(0,2,1)[(...,*index_upper)]
+
+        z0 = np.broadcast_to(reference, (len(f), n_ports)).astype(complex)
+
+        port_modes = np.array(['S'] * n_ports)
+        if 'mixed-mode order' in keywords:
+            new_order = [None] * n_ports
+            for i,mm in enumerate(keywords['mixed-mode order'].lower().split()):
+                if mm.startswith('s'):
+                    new_order[i] = int(mm[1:]) - 1
+                else:
+                    p1, p2 = sorted([int(e) - 1 for e in mm[1:].split(',')])
+                    new_order[i] = p1 if mm.startswith('d') else p2
+                port_modes[new_order[i]] = mm[0].upper()
+            order = np.arange(n_ports, dtype=int)
+            s[:,new_order,:] = s[:,order,:]
+            s[:,:,new_order] = s[:,:,order]
+            z0[:,port_modes=='D'] *= 2
+            z0[:,port_modes=='C'] /= 2
+
+        name = os.path.splitext(os.path.split(self.filename)[1])[0]
+        nw = NetworkExt(f=f, s=s, z0=z0, f_unit='Hz', name=name, comments='')
+        nw.frequency.unit = f_unit
+        nw.port_modes = port_modes
+        return nw
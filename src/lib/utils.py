@@ -1,4 +1,5 @@
 from .path_ext import PathExt
+from .load_stats import LoadStats
 import os
 import sys
 import string
@@ -12,12 +13,16 @@ import zipfile
 import logging
 import tempfile
 import traceback
+import threading
+import collections
 from typing import Callable
 
 
 
-_rex_filetypes = re.compile(r'^\.((s[0-9]+p)|(ci?ti))$', re.IGNORECASE)
+_rex_filetypes = re.compile(r'^\.((s[0-9]+p)|(ci?ti)|(spbundle))$', re.IGNORECASE)
 _rex_archtypes = re.compile(r'^\.zip$', re.IGNORECASE)
+_rex_cititypes = re.compile(r'^\.ci?ti$', re.IGNORECASE)
+_rex_bundletypes = re.compile(r'^\.spbundle$', re.IGNORECASE)
 
 
 def is_ext_supported_file(ext: str) -> bool:
@@ -28,18 +33,71 @@ def is_ext_supported_archive(ext: str) -> bool:
     return _rex_archtypes.match(ext)
 
 
+def is_ext_citi(ext: str) -> bool:
+    return _rex_cititypes.match(ext)
+
+
+def is_ext_bundle(ext: str) -> bool:
+    return _rex_bundletypes.match(ext)
+
+
+def is_ext_sweepable(ext: str) -> bool:
+    """ Files that may contain more than one network (swept CITI files, network bundles) """
+    return _rex_cititypes.match(ext) or _rex_bundletypes.match(ext)
+
+
 def is_ext_supported(ext: str) -> bool:
     return _rex_filetypes.match(ext) or _rex_archtypes.match(ext)
 
 
+class ZipFilePool:
+    """
+    Keeps the most recently used archives open, so that the central directory of an archive is only parsed once,
+      and not again for every file inside of it. An archive is re-opened when its size or modification time changes.
+    """
+
+    MAX_OPEN = 16
+
+    _lock = threading.Lock()
+    _archives: collections.OrderedDict[str,tuple[tuple[int,int],zipfile.ZipFile]] = collections.OrderedDict()
+
+    @staticmethod
+    def get(archive_path: str) -> zipfile.ZipFile:
+        key = os.path.abspath(archive_path)
+        stat = os.stat(key)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        with ZipFilePool._lock:
+            if key in ZipFilePool._archives:
+                open_stamp, zf = ZipFilePool._archives[key]
+                if open_stamp == stamp:
+                    ZipFilePool._archives.move_to_end(key)
+                    return zf
+                del ZipFilePool._archives[key]
+                zf.close()
+            zf = zipfile.ZipFile(key, 'r')
+            ZipFilePool._archives[key] = (stamp, zf)
+            while len(ZipFilePool._archives) > ZipFilePool.MAX_OPEN:
+                # files that are currently being read from this archive stay valid; zipfile counts the references
+                _, (_, oldest_zf) = ZipFilePool._archives.popitem(last=False)
+                oldest_zf.close()
+            return zf
+
+    @staticmethod
+    def clear():
+        with ZipFilePool._lock:
+            for _, zf in ZipFilePool._archives.values():
+                zf.close()
+            ZipFilePool._archives.clear()
+
+
 def find_files_in_archive(path: str) -> list[PathExt]:
     result = []
     try:
-        with zipfile.ZipFile(path, 'r') as zf:
-            for internal_name in zf.namelist():
-                ext = os.path.splitext(internal_name)[1]
-                if is_ext_supported_file(ext):
-                    result.append(PathExt(path, arch_path=internal_name))
+        zf = ZipFilePool.get(path)
+        for internal_name in zf.namelist():
+            ext = os.path.splitext(internal_name)[1]
+            if is_ext_supported_file(ext):
+                result.append(PathExt(path, arch_path=internal_name))
     except Exception as ex:
         logging.warning(f'Unable to open zip file <{path}>: {ex}')
     return result
@@ -47,8 +105,32 @@ def find_files_in_archive(path: str) -> list[PathExt]:
 
 def load_file_from_archive(archive_path: str, path_in_archive: str, target_path: str = None) -> str:
     """ Extracts a file from an archive, returns the path of the extracted file """
-    with zipfile.ZipFile(archive_path, 'r') as zf:
-        return zf.extract(path_in_archive, target_path)
+    return ZipFilePool.get(archive_path).extract(path_in_archive, target_path)
+
+
+def read_file_from_archive(archive_path: str, path_in_archive: str) -> bytes:
+    """ Reads a file from an archive into memory, without extracting it """
+    with ZipFilePool.get(archive_path).open(path_in_archive, 'r') as fp:
+        return fp.read()
+
+
+def read_file_chunked(path: str, path_in_archive: str|None, chunk_fn: Callable[[int,int],None], chunk_size: int = 1024*1024) -> bytes:
+    """ Reads a file (or a file from an archive) into memory, calling <chunk_fn>(bytes read, total bytes) after each chunk """
+    if path_in_archive is not None:
+        zf = ZipFilePool.get(path)
+        total, fp = zf.getinfo(path_in_archive).file_size, zf.open(path_in_archive, 'r')
+    else:
+        total, fp = os.path.getsize(path), open(path, 'rb')
+    with fp:
+        chunks, n_read = [], 0
+        while True:
+            chunk = fp.read(chunk_size)
+            if len(chunk) == 0:
+                break
+            chunks.append(chunk)
+            n_read += len(chunk)
+            chunk_fn(n_read, total)
+        return b''.join(chunks)
 
 
 class ArchiveFileLoader:
@@ -68,8 +150,10 @@ class ArchiveFileLoader:
     def __enter__(self) -> str:
         self._tempdir = tempfile.TemporaryDirectory()
         self._tempdir_path = self._tempdir.__enter__()
-        with zipfile.ZipFile(self._archive_path, 'r') as zf:
-            return zf.extract(self._path_in_archive, self._tempdir_path)
+        with LoadStats.measure(PathExt(self._archive_path, arch_path=self._path_in_archive).full_path), LoadStats.phase('extract'):
+            extracted_path = load_file_from_archive(self._archive_path, self._path_in_archive, self._tempdir_path)
+            LoadStats.add_bytes(os.path.getsize(extracted_path))
+        return extracted_path
 
     def __exit__(self, exc, value, tb):
         self._tempdir.__exit__(exc, value, tb)
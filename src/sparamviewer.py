@@ -1,6 +1,6 @@
 #!/bin/python
 
-import sys, os, logging
+import sys, os, logging, multiprocessing
 from PyQt6 import QtWidgets, QtCore
 
 from gui.main_window import MainWindow
@@ -11,6 +11,7 @@ from lib import AppPaths, is_running_from_binary, Settings, GuiColorScheme
 
 if __name__ == '__main__':
 
+    multiprocessing.freeze_support()  # required for SParamFile.load_many() in the compiled app
     
     LOG_FORMAT = '%(asctime)s: %(message)s (%(filename)s:%(lineno)d:%(funcName)s, %(levelname)s)'
     logging.captureWarnings(True)
@@ -1,5 +1,13 @@
 from testlib import MyTestCase
-from lib import Lock
+from lib import Lock, SParamFile, PathExt
+from gui.helpers.file_preloader import FilePreloader
+from gui.helpers.file_watcher import FileWatcher
+import threading
+import time
+import os
+import shutil
+import tempfile
+from PyQt6.QtCore import Qt
 
 
 
@@ -35,3 +43,66 @@ class TestAsync(MyTestCase):
 
         with self.subTest():
             self.assertFalse(lock.locked)
+
+
+    def test_concurrent_load(self):
+        file = SParamFile(self.sample_dir.joinpath('coupler_4port.s4p'))
+        networks = []
+        def load():
+            networks.append(file.nw)
+        threads = [threading.Thread(target=load) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(networks), 4)
+        for nw in networks:
+            self.assertIs(nw, networks[0])
+
+
+    def test_preloader(self):
+        files = [SParamFile(path) for path in self.sample_dir.glob('*.s?p')]
+        loaded_files = []
+        
+        preloader = FilePreloader()
+        preloader.fileLoaded.connect(lambda file: loaded_files.append(file), type=Qt.ConnectionType.DirectConnection)
+        preloader.start(2)
+        try:
+            preloader.enqueue(files[1:])
+            preloader.enqueue(files[:1], FilePreloader.PRIORITY_SELECTED)
+            t_timeout = time.monotonic() + 10
+            while not preloader.idle and time.monotonic() < t_timeout:
+                time.sleep(0.01)
+        finally:
+            preloader.stop()
+        
+        for file in files:
+            self.assertTrue(file.loaded)
+        self.assertEqual(len(loaded_files), len(files))
+
+
+    def test_file_watcher(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            shutil.copy(self.sample_dir.joinpath('thru.s2p'), os.path.join(wdir, 'a.s2p'))
+            changed_dirs, modified_files = [], []
+            watcher = FileWatcher(lambda: [PathExt(wdir)])
+            watcher.directoryChanged.connect(lambda path: changed_dirs.append(path))
+            watcher.filesModified.connect(lambda paths: modified_files.extend(paths))
+            
+            watcher.poll()  # initial snapshot
+            with open(os.path.join(wdir, 'ignored.txt'), 'w') as fp:
+                fp.write('not a supported file')
+            watcher.poll()
+            self.assertEqual(changed_dirs, [])
+            self.assertEqual(modified_files, [])
+            
+            shutil.copy(self.sample_dir.joinpath('thru.s2p'), os.path.join(wdir, 'b.s2p'))
+            watcher.poll()
+            self.assertEqual(changed_dirs, [PathExt(wdir)])
+            self.assertEqual(modified_files, [])
+            
+            with open(os.path.join(wdir, 'a.s2p'), 'a') as fp:
+                fp.write('! appended comment\n')
+            watcher.poll()
+            self.assertEqual(changed_dirs, [PathExt(wdir)])
+            self.assertEqual(modified_files, [PathExt(os.path.join(wdir, 'a.s2p'))])
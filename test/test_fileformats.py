@@ -1,9 +1,11 @@
 from testlib import MyTestCase
-from lib import SParamFile, PathExt, CitiWriter
+from lib import SParamFile, PathExt, CitiReader, CitiWriter, TouchstoneReader, NetworkCache, Settings, ZipFilePool, read_file_from_archive, FileProbe, NetworkMemory, NetworkBundleReader, NetworkBundleWriter, LoadHandle, LoadStats, QualityMetrics
 import os
 import skrf
+import numpy as np
 import zipfile
 import tempfile
+import logging
 
 
 
@@ -71,3 +73,468 @@ class TestFileFormats(MyTestCase):
                 self.assertEqual(len(f.nw.f), 3)
                 self.assertArrayAlmostEqual(f.nw.z0_simple, [50])
                 self.assertSequenceEqual(f.nw.port_modes, ['S'])
+            
+            ZipFilePool.clear()
+
+
+    def test_zip_file_pool(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            zippath = os.path.join(wdir, 'test.zip')
+            with zipfile.ZipFile(zippath, 'w') as zf:
+                zf.writestr('a.txt', b'first')
+            try:
+                self.assertIs(ZipFilePool.get(zippath), ZipFilePool.get(zippath))
+                self.assertEqual(read_file_from_archive(zippath, 'a.txt'), b'first')
+
+                # a modified archive must be re-opened
+                with zipfile.ZipFile(zippath, 'w') as zf:
+                    zf.writestr('a.txt', b'second, longer')
+                self.assertEqual(read_file_from_archive(zippath, 'a.txt'), b'second, longer')
+            finally:
+                ZipFilePool.clear()
+
+
+    def test_file_probe(self):
+        paths = list(self.sample_dir.glob('*.s?p')) + list(self.sample_dir.glob('*.cti'))
+        for path in paths:
+            probe = FileProbe.from_file(PathExt(str(path)))
+            nw = SParamFile(str(path)).nw
+            self.assertEqual(probe.n_ports, nw.number_of_ports)
+            self.assertAlmostEqual(probe.f_start, nw.f[0], delta=1e-9*nw.f[-1])
+            self.assertAlmostEqual(probe.f_stop, nw.f[-1], delta=1e-9*nw.f[-1])
+            if probe.n_points_exact:
+                self.assertEqual(probe.n_points, len(nw.f))
+            elif path.name != 'amp.s2p':  # contains noise data, so the estimate is way off
+                self.assertAlmostEqual(probe.n_points, len(nw.f), delta=0.1*len(nw.f))
+
+
+    def test_file_probe_multiline_records(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            nw = skrf.Network(f=np.linspace(1e9, 5e9, 501), f_unit='Hz', s=np.full([501,6,6], 0.1+0.2j), z0=50)
+            nw.write_touchstone(os.path.join(wdir, 'test'))
+            probe = FileProbe.from_file(PathExt(os.path.join(wdir, 'test.s6p')))
+            self.assertEqual(probe.n_ports, 6)
+            self.assertAlmostEqual(probe.f_start, 1e9)
+            self.assertAlmostEqual(probe.f_stop, 5e9)
+            self.assertAlmostEqual(probe.n_points, 501, delta=10)
+            
+            zippath = os.path.join(wdir, 'test.zip')
+            with zipfile.ZipFile(zippath, 'w') as zf:
+                zf.write(os.path.join(wdir, 'test.s6p'), 'test.s6p')
+            try:
+                probe = FileProbe.from_file(PathExt(zippath, arch_path='test.s6p'))
+                self.assertEqual(probe.n_ports, 6)
+                self.assertAlmostEqual(probe.f_stop, 5e9)
+            finally:
+                ZipFilePool.clear()
+
+
+    def test_touchstone_reader_matches_skrf(self):
+        for path in self.sample_dir.glob('*.s?p'):
+            nw_native = TouchstoneReader(str(path)).get_network()
+            nw_skrf = skrf.Network(str(path))
+            self.assertEqual(nw_native.name, nw_skrf.name)
+            self.assertEqual(nw_native.frequency.unit, nw_skrf.frequency.unit)
+            self.assertArrayAlmostEqual(nw_native.f, nw_skrf.f)
+            self.assertArrayAlmostEqual(nw_native.s, nw_skrf.s)
+            self.assertArrayAlmostEqual(nw_native.z0, nw_skrf.z0)
+            self.assertArrayEqual(nw_native.port_modes, nw_skrf.port_modes)
+
+
+    def test_touchstone_reader_v2_keywords(self):
+        contents = \
+            '! first line\n' \
+            '! second line\n' \
+            '  [Version] 2.0\n' \
+            '# MHz S RI R 50\n' \
+            '[Number of Ports] 3\n' \
+            '[Number of Frequencies] 2\n' \
+            '[Matrix Format] Lower\n' \
+            '[Reference] 50\n' \
+            '75 100\n' \
+            '[Network Data]\n' \
+            '1 0.1 0 ! inline comment\n' \
+            '0.2 0 0.3 0\n' \
+            '0.4 0 0.5 0 0.6 0\n' \
+            '2 0.1 0.1 0.2 0.2 0.3 0.3 0.4 0.4 0.5 0.5 0.6 0.6\n' \
+            '[End]\n'
+        nw = TouchstoneReader('test.s3p', contents).get_network()
+        self.assertEqual(nw.name, 'test')
+        self.assertArrayAlmostEqual(nw.f, [1e6, 2e6])
+        self.assertArrayAlmostEqual(nw.z0_simple, [50, 75, 100])
+        self.assertArrayAlmostEqual(nw.s[0], [[0.1, 0.2, 0.4], [0.2, 0.3, 0.5], [0.4, 0.5, 0.6]])
+        self.assertArrayAlmostEqual(nw.s[1,2,1], 0.5+0.5j)
+        self.assertTrue('first line' in nw.comments)
+        self.assertTrue('second line' in nw.comments)
+        self.assertFalse('inline comment' in nw.comments)
+
+
+    def test_citi_reader_variables(self):
+        contents = \
+            '# header comment\n' \
+            'CITIFILE A.01.01\n' \
+            'NAME TEST\n' \
+            'VAR BIAS MAG 2\n' \
+            'VAR FREQ MAG 3\n' \
+            'DATA S[2,1] RI\n' \
+            'DATA GAIN MAG\n' \
+            'VAR_LIST_BEGIN\n' \
+            '0.5\n' \
+            '1.5\n' \
+            'VAR_LIST_END\n' \
+            'SEG_LIST_BEGIN\n' \
+            'SEG 1000000000 3000000000 3\n' \
+            'SEG_LIST_END\n' \
+            'BEGIN\n' \
+            '0.1,0\n0.2,0\n0.3,0\n' \
+            '0.4,0.1\n0.5,0.2\n0.6,0.3\n' \
+            'END\n' \
+            'BEGIN\n' \
+            '1\n2\n3\n4\n5\n6\n' \
+            'END\n'
+        citi = CitiReader('test.cti', contents)
+        self.assertSequenceEqual(citi.datas, ['S[2,1]', 'GAIN'])
+        self.assertArrayAlmostEqual(citi.coords['FREQ'], [1e9, 2e9, 3e9])
+        self.assertEqual(citi.guess_frequency_coord_name(), 'FREQ')
+        
+        nw, metadata = citi.get_network(None, {'BIAS': 1.5})
+        self.assertEqual(nw.name, 'test, BIAS=1.5')
+        self.assertEqual(nw.number_of_ports, 2)
+        self.assertArrayAlmostEqual(nw.f, [1e9, 2e9, 3e9])
+        self.assertArrayAlmostEqual(nw.s[:,1,0], [0.4+0.1j, 0.5+0.2j, 0.6+0.3j])
+        self.assertTrue(np.all(np.isnan(nw.s[:,0,0])))
+        self.assertTrue('header comment' in nw.comments)
+        self.assertTrue('"S[2,1]": 2 × complex128, used as S-parameter [2,1]' in metadata)
+        self.assertTrue('"GAIN": 2 × float64, ignored' in metadata)
+
+        with self.assertRaises(RuntimeError):
+            citi.get_network(None, {})  # no value for BIAS
+        with self.assertRaises(RuntimeError):
+            CitiReader('test.cti', contents.replace('0.6,0.3\n', ''))  # incomplete data block
+
+
+    def test_citi_sweep(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            path = os.path.join(wdir, 'sweep.cti')
+            with open(path, 'w') as fp:
+                fp.write('CITIFILE A.01.01\nNAME TEST\nVAR BIAS MAG 3\nVAR FREQ MAG 2\nDATA S[1,1] RI\n')
+                fp.write('VAR_LIST_BEGIN\n1\n2\n3\nVAR_LIST_END\nVAR_LIST_BEGIN\n1e9\n2e9\nVAR_LIST_END\n')
+                fp.write('BEGIN\n0.1,0\n0.2,0\n0.3,0\n0.4,0\n0.5,0\n0.6,0\nEND\n')
+            
+            citi = CitiReader(path)
+            slices = citi.get_networks()
+            self.assertSequenceEqual([at_coords for at_coords,_,_ in slices], [{'BIAS': 1}, {'BIAS': 2}, {'BIAS': 3}])
+            for at_coords,nw,metadata in slices:
+                nw_single, metadata_single = citi.get_network(None, dict(at_coords))
+                self.assertEqual(nw.name, nw_single.name)
+                self.assertArrayEqual(nw.s, nw_single.s)
+                self.assertEqual(metadata, metadata_single)
+                self.assertIs(nw.frequency, slices[0][1].frequency)  # shared between all slices
+            
+            paths = SParamFile.find_sweep(PathExt(path))
+            self.assertSequenceEqual([p.sweep for p in paths], ['BIAS=1.0', 'BIAS=2.0', 'BIAS=3.0'])
+            self.assertEqual(len(set(paths)), 3)
+            self.assertNotEqual(paths[0], PathExt(path))
+            self.assertEqual(paths[0].file, PathExt(path))
+            self.assertIs(SParamFile.read_sweep(paths[2]), SParamFile.read_sweep(PathExt(path)))  # parsed only once
+            
+            file = SParamFile(paths[2])
+            self.assertEqual(file.name, 'sweep.cti, BIAS=3.0')
+            self.assertArrayAlmostEqual(file.nw.s[:,0,0], [0.5, 0.6])
+            self.assertSequenceEqual(SParamFile.find_sweep(PathExt(self.sample_dir.joinpath('coupler_3port.cti'))), [])  # not swept
+
+
+    def test_network_bundle(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            paths = list(self.sample_dir.glob('*.s?p')) + list(self.sample_dir.glob('*.cti'))
+            nws = [SParamFile(path).nw for path in paths]
+            mixed = nws[0].copy()
+            mixed.ports = ['D1', 'C1'] if mixed.nports == 2 else mixed.ports
+            bundle_path = os.path.join(wdir, 'test.spbundle')
+            NetworkBundleWriter.write([*nws, mixed], bundle_path)
+
+            bundle = NetworkBundleReader(bundle_path)
+            self.assertEqual(len(bundle), len(nws)+1)
+            self.assertEqual(bundle.labels[-1], f'{mixed.name} #2')  # names are made unique
+            for i,nw in enumerate(nws):
+                nw_bundle = bundle.get_network(i)
+                self.assertIsInstance(nw_bundle.s, np.memmap)
+                self.assertEqual(nw_bundle.name, nw.name)
+                self.assertEqual(nw_bundle.comments, nw.comments)
+                self.assertEqual(nw_bundle.frequency.unit, nw.frequency.unit)
+                self.assertArrayEqual(nw_bundle.f, nw.f)
+                self.assertArrayEqual(nw_bundle.s, nw.s)
+                self.assertArrayEqual(nw_bundle.z0, nw.z0)
+                self.assertArrayEqual(nw_bundle.port_modes, nw.port_modes)
+            self.assertEqual([str(p) for p in bundle.get_network(len(nws)).ports], [str(p) for p in mixed.ports])
+
+            # the networks of a bundle are its slices; each one can be probed and loaded on its own
+            slices = SParamFile.find_sweep(PathExt(bundle_path))
+            self.assertEqual([path.sweep for path in slices], bundle.labels)
+            file = SParamFile(slices[1])
+            self.assertEqual(file.probe.n_ports, nws[1].nports)
+            self.assertEqual(file.probe.n_points, len(nws[1].f))
+            self.assertArrayEqual(file.nw.s, nws[1].s)
+            self.assertArrayEqual(SParamFile(bundle_path).nw.s, nws[0].s)
+
+            # in archives, bundles are read in memory
+            zippath = os.path.join(wdir, 'test.zip')
+            with zipfile.ZipFile(zippath, 'w') as zf:
+                zf.write(bundle_path, 'test.spbundle')
+            try:
+                file = SParamFile(PathExt(zippath, arch_path='test.spbundle', sweep=bundle.labels[2]))
+                self.assertArrayEqual(file.nw.s, nws[2].s)
+            finally:
+                ZipFilePool.clear()
+
+
+    def test_network_cache(self):
+        wdir = self.temp_dir
+        Settings.network_cache = True
+        nwpath = os.path.join(wdir, 'test.s2p')
+        nw = skrf.Network(f=[1e9,2e9], f_unit='Hz', s=[[[0.1,0.2],[0.3,0.4]], [[0.5,0.6],[0.7,0.8]]], z0=50)
+        nw.write_touchstone(nwpath)
+
+        f1 = SParamFile(nwpath)
+        self.assertIsNotNone(f1.nw)
+        cached = NetworkCache.get(f1.path)
+        self.assertIsNotNone(cached)
+        cached_nw, cached_metadata = cached
+        self.assertIsNone(cached_metadata)
+        self.assertArrayAlmostEqual(cached_nw.s, f1.nw.s)
+        self.assertArrayAlmostEqual(cached_nw.f, f1.nw.f)
+        self.assertArrayAlmostEqual(cached_nw.z0, f1.nw.z0)
+        self.assertArrayEqual(cached_nw.port_modes, f1.nw.port_modes)
+        self.assertEqual(cached_nw.comments, f1.nw.comments)
+        self.assertEqual(cached_nw.name, f1.nw.name)
+
+        # modified file must not be taken from cache
+        nw.s = nw.s * 0.5
+        nw.write_touchstone(nwpath)
+        os.utime(nwpath, ns=(os.stat(nwpath).st_atime_ns, os.stat(nwpath).st_mtime_ns+1_000_000_000))
+        self.assertIsNone(NetworkCache.get(f1.path))
+        f2 = SParamFile(nwpath)
+        self.assertArrayAlmostEqual(f2.nw.s, nw.s)
+                
+        citipath = os.path.join(wdir, 'test.cti')
+        CitiWriter().write(nw, citipath)
+        f3 = SParamFile(citipath)
+        self.assertIsNotNone(f3.nw)
+        self.assertEqual(NetworkCache.get(f3.path)[1], f3.metadata)
+                
+        NetworkCache.clear()
+        self.assertEqual(NetworkCache.get_size(), 0)
+        self.assertIsNone(NetworkCache.get(f1.path))
+
+
+    def test_network_cache_eviction(self):
+        Settings.network_cache, Settings.network_cache_size_mb = True, 0
+        SParamFile(self.sample_dir.joinpath('amp.s2p')).nw
+        self.assertEqual(NetworkCache.get_size(), 0)
+
+
+    def test_network_memory(self):
+        wdir = self.temp_dir
+        try:
+            Settings.network_memory_mb = 1
+            files = []
+            for i in range(4):
+                # about 0.5 MB per network
+                nw = skrf.Network(f=np.linspace(1e9, 2e9, 10_000), f_unit='Hz', s=np.full([10_000,2,2], i+0.5j), z0=50)
+                nw.write_touchstone(os.path.join(wdir, f'test{i}'))
+                files.append(SParamFile(os.path.join(wdir, f'test{i}.s2p')))
+                
+            NetworkMemory.pin([files[0]])
+            with self.assertLogs(level=logging.WARNING) as logs:
+                for file in files:
+                    self.assertIsNotNone(file.nw)
+                    self.assertLessEqual(NetworkMemory.usage, 2*NetworkMemory.get_size(file.nw))  # pinned and most recent file
+            self.assertEqual(len(logs.output), 1)  # that exceeds the budget, which is only logged once
+            self.assertTrue(files[0].loaded)  # pinned
+            self.assertFalse(files[1].loaded)
+            self.assertTrue(files[3].loaded)
+            self.assertGreaterEqual(NetworkMemory.peak, NetworkMemory.usage)
+
+            # unloaded files are reloaded transparently, and can still be probed without loading them
+            self.assertEqual(files[2].probe.n_ports, 2)
+            self.assertFalse(files[2].loaded)
+            self.assertArrayAlmostEqual(files[2].nw.s[:,0,0], np.full(10_000, 2+0.5j))
+            self.assertTrue(files[2].loaded)
+
+            # e.g. all files that expressions can reach; they must not unload each other, even if that exceeds the budget
+            NetworkMemory.pin(files)
+            for file in files:
+                self.assertIsNotNone(file.nw)
+            self.assertTrue(all(file.loaded for file in files))
+        finally:
+            NetworkMemory.pin([])
+
+
+    def test_single_precision(self):
+        path = self.sample_dir.joinpath('line-line-line.s2p')
+        file_double = SParamFile(path)
+        self.assertFalse(file_double.nw.single_precision)
+        Settings.single_precision = True
+        for _ in range(2):  # parsed, then from the cache
+            file_single = SParamFile(path)
+            self.assertTrue(file_single.nw.single_precision)
+            self.assertEqual(file_single.nw.s.dtype, np.complex64)
+            self.assertEqual(2*file_single.nw.s.nbytes, file_double.nw.s.nbytes)
+            self.assertArrayAlmostEqual(file_single.nw.s, file_double.nw.s, atol=1e-6)
+
+        # copies, and calculations that need the precision, are double precision again
+        self.assertFalse(file_single.nw.copy().single_precision)
+        self.assertIs(file_double.nw.full_precision(), file_double.nw)
+        self.assertArrayAlmostEqual(file_single.nw.full_precision().z, file_double.nw.z, rtol=1e-4)
+
+
+    def test_reduced_loading(self):
+        path = self.sample_dir.joinpath('bpf.s2p')
+        full = SParamFile(path).nw
+        f_start, f_stop = full.f[1000] - 1, full.f[2000] + 1
+
+        # only the records within the window are parsed, with the same result as cropping afterwards
+        windowed = TouchstoneReader(str(path), f_window=(f_start, f_stop)).get_network()
+        self.assertArrayEqual(windowed.f, full.f[1000:2001])
+        self.assertArrayEqual(windowed.s, full.s[1000:2001])
+
+        file = SParamFile(path)
+        decimated = file.load_reduced(f_start, f_stop, decimation=10)
+        self.assertArrayEqual(decimated.f, full.f[1000:2001:10])
+        self.assertFalse(file.loaded)
+
+        # the envelope keeps the extremes of every parameter
+        envelope = SParamFile(path).load_reduced(max_points=100)
+        self.assertLess(len(envelope.f), 4*100)
+        for (ep,ip) in [(0,0), (1,0)]:
+            self.assertAlmostEqual(np.max(np.abs(envelope.s[:,ep,ip])), np.max(np.abs(full.s[:,ep,ip])))
+            self.assertAlmostEqual(np.min(np.abs(envelope.s[:,ep,ip])), np.min(np.abs(full.s[:,ep,ip])))
+        self.assertEqual(envelope.f[0], full.f[0])
+        self.assertEqual(envelope.f[-1], full.f[-1])
+
+        copy = SParamFile(path).reduced_copy(f_start, f_stop, max_points=100)
+        self.assertTrue(copy.loaded)
+        self.assertGreaterEqual(copy.nw.f[0], f_start)
+        self.assertLessEqual(copy.nw.f[-1], f_stop)
+
+
+    def test_load_async(self):
+        paths = list(self.sample_dir.glob('*.s?p')) + list(self.sample_dir.glob('*.cti'))
+        progress, loaded = [], []
+        files = [SParamFile(path) for path in paths]
+        handle = SParamFile.load_async(files, lambda done,total: progress.append((done,total)), loaded.append)
+        self.assertEqual(len(handle.result(timeout=60)), len(files))
+        self.assertTrue(handle.done)
+        self.assertTrue(all(file.loaded for file in files))
+        self.assertEqual(len(loaded), len(files))
+        self.assertEqual(progress[-1][0], progress[-1][1])
+        self.assertSequenceEqual([done for done,_ in progress], sorted([done for done,_ in progress]))
+
+        # cancel in the middle of a file, which is then neither loaded nor failed
+        NetworkCache.clear()
+        chunk_size = TouchstoneReader.PROGRESS_CHUNK_SIZE
+        try:
+            TouchstoneReader.PROGRESS_CHUNK_SIZE = 1000
+            file = SParamFile(self.sample_dir.joinpath('bpf.s2p'))
+            handles = []
+            handles.append(SParamFile.load_async([file], lambda done,total: handles[0].cancel() if done > 0 and len(handles) > 0 else None))
+            handle = handles[0]
+            self.assertEqual(len(handle.result(timeout=60)), 0)
+            self.assertTrue(handle.cancelled)
+            self.assertFalse(file.loaded)
+            self.assertFalse(file.error)
+            with self.assertRaises(LoadHandle.Cancelled):
+                handle.check_cancelled()
+        finally:
+            TouchstoneReader.PROGRESS_CHUNK_SIZE = chunk_size
+        self.assertEqual(len(file.nw.f), 4301)
+
+
+    def test_load_async_reduced(self):
+        reduced = dict(f_start=2e9, f_stop=3e9, max_points=100)
+        files = [SParamFile(self.sample_dir.joinpath('bpf.s2p')), SParamFile(self.sample_dir.joinpath('missing.s2p'))]
+        handle = SParamFile.load_async(files, reduced=reduced)
+        self.assertEqual(len(handle.result(timeout=60)), 2)
+
+        # only the reduced networks are prepared, and failures are kept too, so they are not tried again
+        self.assertFalse(any(file.loaded for file in files))
+        self.assertTrue(all(file.has_reduced(**reduced) for file in files))
+        self.assertFalse(files[0].has_reduced(**dict(reduced, max_points=200)))
+        nw = files[0].load_reduced(**reduced)
+        self.assertGreaterEqual(nw.f[0], 2e9)
+        self.assertLessEqual(nw.f[-1], 3e9)
+        self.assertIsNone(files[1].load_reduced(**reduced))
+        self.assertEqual(len(SParamFile.load_async(files, reduced=reduced).result(timeout=60)), 0)
+
+        # the last result remains available while a different range is prepared
+        self.assertIs(files[0].last_reduced_copy().nw, nw)
+        self.assertIsNone(files[1].last_reduced_copy())
+
+
+    def test_load_stats(self):
+        wdir = self.temp_dir
+        try:
+            LoadStats.clear()
+            path = self.sample_dir.joinpath('bpf.s2p')
+            for _ in range(2):  # parsed, then from the cache
+                SParamFile(path).nw
+            SParamFile(self.sample_dir.joinpath('coupler_3port.cti')).nw
+            zip_path = os.path.join(wdir, 'archive.zip')
+            with zipfile.ZipFile(zip_path, 'w') as zf:
+                zf.write(path, 'bpf.s2p')
+            SParamFile(PathExt(zip_path, arch_path='bpf.s2p')).nw
+
+            self.assertEqual(len(LoadStats), 4)
+            parsed = LoadStats.query(where=lambda r: r.path == str(path) and not r.cache_hit)[0]
+            self.assertEqual(parsed.bytes_read, os.path.getsize(path))
+            self.assertEqual(parsed.n_points, 4301)
+            self.assertEqual(parsed.n_ports, 2)
+            self.assertGreater(parsed.t_parse, 0)
+            self.assertGreater(parsed.t_extract, 0)
+            self.assertGreaterEqual(parsed.t_total, parsed.t_extract + parsed.t_parse + parsed.t_validate)
+            self.assertEqual(len(LoadStats.query(where=lambda r: r.cache_hit)), 1)
+            self.assertEqual(LoadStats.query(where=lambda r: r.path.endswith('.cti'))[0].n_ports, 3)
+
+            totals = [r.t_total for r in LoadStats.query()]
+            self.assertSequenceEqual(totals, sorted(totals, reverse=True))
+            self.assertEqual(len(LoadStats.query(limit=2)), 2)
+            csv_lines = LoadStats.to_csv(separator=';').splitlines()
+            self.assertEqual(len(csv_lines), 5)
+            self.assertTrue(csv_lines[0].startswith('path;timestamp;t_total'))
+        finally:
+            LoadStats.clear()
+
+
+    def test_quality_report(self):
+        paths = [self.sample_dir.joinpath('bpf.s2p'), self.sample_dir.joinpath('coupler_3port.cti'), self.sample_dir.joinpath('missing.s2p')]
+        records = QualityMetrics.report([SParamFile(path) for path in paths])
+        self.assertSequenceEqual([record.path for record in records], [str(path) for path in paths])
+        self.assertEqual(records[0].n_ports, 2)
+        self.assertEqual(records[0].n_points, 4301)
+        for record in records[:2]:
+            self.assertIsNone(record.error)
+            for metric in QualityMetrics.METRICS:
+                self.assertGreaterEqual(getattr(record, metric), 0)
+        self.assertIsNotNone(records[2].error)
+        self.assertIsNone(records[2].passivity)
+        
+        csv_lines = QualityMetrics.to_csv(records, separator=';').splitlines()
+        self.assertEqual(len(csv_lines), 4)
+        self.assertTrue(csv_lines[0].startswith('path;n_ports;n_points;passivity'))
+
+
+    def test_load_many(self):
+        paths = list(self.sample_dir.glob('*.s?p')) + list(self.sample_dir.glob('*.cti'))
+        files_bulk = [SParamFile(path) for path in paths]
+        SParamFile.load_many(files_bulk, workers=2)
+        NetworkCache.clear()
+        files_single = [SParamFile(path) for path in paths]
+        for file_bulk, file_single in zip(files_bulk, files_single):
+            self.assertTrue(file_bulk.loaded)
+            self.assertEqual(file_bulk.nw.name, file_single.nw.name)
+            self.assertEqual(file_bulk.nw.comments, file_single.nw.comments)
+            self.assertEqual(file_bulk.metadata, file_single.metadata)
+            self.assertArrayAlmostEqual(file_bulk.nw.f, file_single.nw.f)
+            self.assertArrayAlmostEqual(file_bulk.nw.s, file_single.nw.s)
+            self.assertArrayAlmostEqual(file_bulk.nw.z0, file_single.nw.z0)
+            self.assertArrayEqual(file_bulk.nw.port_modes, file_single.nw.port_modes)
@@ -1,9 +1,13 @@
 from testlib import MyTestCase
-from lib import NetworkExt, ExpressionParser, SParamFile
+from lib import NetworkExt, ExpressionParser, SParamFile, QualityMetrics, FrequencyIndex, Settings
 from lib.expressions.sparams import SParam, SParams
-from lib.expressions.networks import Network, Networks
+from lib.expressions.networks import Network, Networks, PostponedNetwork
+from lib.expressions.components import Components
+from lib.expressions.subexpressions import Subexpressions
+import os
 import math
 import logging
+import tempfile
 import numpy as np
 
 
@@ -187,6 +191,62 @@ class TestExpressionParser(MyFrontendTestCase):
 
 
 
+    def test_memoized_evaluation(self):
+        ExpressionParser.clear_memo()
+        self.assertFalse(self.expression_parser.eval('sel_nws().s(1,1).plot()', memoize=True).from_memo)
+        self.assertEqual(self.plot_count, 2)
+        result = self.expression_parser.eval('sel_nws().s(1,1).plot()', memoize=True)
+        self.assertTrue(result.from_memo)
+        self.assertEqual(self.plot_count, 4)
+        self.assertFalse(self.expression_parser.eval('sel_nws().s(1,1).plot() ', memoize=True).from_memo)
+        
+        self.expression_parser._selected_networks[0]._nw = self.get_dummy_sparam_file(1)._nw  # file was re-loaded
+        self.assertFalse(self.expression_parser.eval('sel_nws().s(1,1).plot() ', memoize=True).from_memo)
+        self.assertEqual(self.plot_count, 8)
+
+
+    def test_memoized_evaluation_checks_slider(self):
+        ExpressionParser.clear_memo()
+        slider_value = 1
+        parser = ExpressionParser(self.get_dummy_sparam_files(2), [], [], None, self.expression_parser._plot_fn, None, lambda show, min, max: slider_value)
+        code = 'x = slider(range=(0,3))\nnws().s(1,1).plot()'
+        self.assertFalse(parser.eval(code, memoize=True).from_memo)
+        self.assertTrue(parser.eval(code, memoize=True).from_memo)
+        slider_value = 2
+        self.assertFalse(parser.eval(code, memoize=True).from_memo)
+        self.assertEqual(self.plot_count, 6)
+
+
+
+    def test_memoized_evaluation_replays_warnings(self):
+        ExpressionParser.clear_memo()
+        code = 'nw("missing.s2p").s(1,1).plot()\nsel_nws().s(1,1).plot()'
+        messages = []
+        for _ in range(2):
+            with self.assertLogs(level=logging.WARNING) as logs:
+                result = self.expression_parser.eval(code, memoize=True)
+            messages.append(logs.output)
+        self.assertTrue(result.from_memo)
+        self.assertEqual(len(messages[0]), 1)
+        self.assertSequenceEqual(messages[1], messages[0])
+        
+        Settings.verbose = not Settings.verbose  # changes the log messages
+        self.assertFalse(self.expression_parser.eval(code, memoize=True).from_memo)
+
+
+    def test_reachable_files(self):
+        available = self.get_dummy_sparam_files(4)  # dummy1-port.s1p ... dummy4-port.s4p
+        selected = [available[0]]
+        def reachable(code: str, ref_nw_name: str|None = None) -> list[str]:
+            return [file.name for file in ExpressionParser.get_reachable_files(code, available, selected, ref_nw_name)]
+        self.assertSequenceEqual(reachable('sel_nws().s(1,1).plot()'), ['dummy1-port.s1p'])
+        self.assertSequenceEqual(reachable('nw("dummy3-port.s3p").s(1,1).plot()\nnws(pattern="*.s4p").s(1,1).plot()'), ['dummy1-port.s1p', 'dummy3-port.s3p', 'dummy4-port.s4p'])
+        self.assertSequenceEqual(reachable('saved_nw().s(1,1).plot()', 'dummy2-port.s2p'), ['dummy1-port.s1p', 'dummy2-port.s2p'])
+        for code in ['nws().s(1,1).plot()', 'p = "*.s2p"\nnws(p).s(1,1).plot()', 'f = nws\nf("*.s2p").s(1,1).plot()']:
+            self.assertEqual(len(reachable(code)), 4)  # patterns cannot be determined without evaluating the code
+        self.assertSequenceEqual(reachable('nws('), ['dummy1-port.s1p'])  # syntax error
+
+
 class TestPlotting(MyFrontendTestCase):
 
 
@@ -203,3 +263,311 @@ class TestPlotting(MyFrontendTestCase):
     def test_networks_plot_multiple(self):
         nw = self.get_dummy_networks(3)
         nw.s(2,1).plot()
+
+
+    def test_networks_sweep(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            path = os.path.join(wdir, 'sweep.cti')
+            with open(path, 'w') as fp:
+                fp.write('CITIFILE A.01.01\nNAME TEST\nVAR TEMP MAG 2\nVAR FREQ MAG 2\nDATA S21 RI\n')
+                fp.write('VAR_LIST_BEGIN\n25\n85\nVAR_LIST_END\nVAR_LIST_BEGIN\n1e9\n2e9\nVAR_LIST_END\n')
+                fp.write('BEGIN\n0.1,0\n0.2,0\n0.3,0\n0.4,0\nEND\n')
+            
+            nws = Networks([SParamFile(path), self.get_dummy_sparam_file(2)]).sweep()
+            self.assertSequenceEqual([nw.name for nw in nws.nws], ['sweep.cti, TEMP=25.0', 'sweep.cti, TEMP=85.0', 'dummy2-port.s2p'])
+            self.assertEqual(len(nws.s(2,1).sps), 3)
+            self.assertEqual(len(nws.sweep().nws), 3)  # slices are not swept again
+            self.assertEqual(len((nws + nws).sweep().nws), 0)  # modified networks cannot be swept
+
+
+    def test_networks_save_bundle(self):
+        with tempfile.TemporaryDirectory() as wdir:
+            path = os.path.join(wdir, 'all.spbundle')
+            nws = Networks([self.get_dummy_sparam_file(2), self.get_dummy_sparam_file(3)])
+            nws._save(path)
+
+            swept = Networks([SParamFile(path)]).sweep()
+            self.assertEqual(len(swept.nws), 2)
+            self.assertEqual(swept.nws[1].nw.number_of_ports, 3)
+            self.assertArrayEqual(swept.nws[1].nw.s, nws.nws[1].nw.s)
+            self.assertTrue('Exported from' in swept.nws[0].nw.comments)
+
+
+    def test_network_conversions_are_cached(self):
+        nws = self.get_dummy_networks_single(2)
+        network, nw = nws.nws[0], nws.nws[0].nw
+        self.assertArrayEqual(network._converted('z'), nw.z)
+        self.assertIsNot(network._converted('z'), network._converted('z'))  # not kept outside of an evaluation
+        
+        Subexpressions.begin()
+        try:
+            z = network._converted('z')
+            self.assertArrayEqual(z, nw.z)
+            self.assertIs(network._converted('z'), z)
+            self.assertArrayEqual(nws.z(2,1).sps[0].s, nw.z[:,1,0])
+            self.assertArrayEqual(nws.abcd(1,1).sps[0].s, nw.a[:,0,0])
+            
+            nw.s = nw.s * 0.5  # replacing the S-matrix invalidates the conversions
+            self.assertIsNot(network._converted('z'), z)
+            self.assertArrayEqual(network._converted('z'), nw.z)
+        finally:
+            Subexpressions.end()
+        self.assertFalse(hasattr(nw, '_conversions'))  # nothing is kept with the (possibly loaded) network
+
+
+    def test_stacked_networks_match_single_networks(self):
+        for n_ports in [2, 3]:
+            a, b = self.get_dummy_networks(3, n_ports), self.get_dummy_networks(3, n_ports)
+            for i,network in enumerate(a.nws):
+                network.nw.comments = f'comment {i}'
+            self.assertIsNotNone(a._stack())
+            for op in [Network.__add__, Network.__matmul__, Network.__pow__] if n_ports==2 else [Network.__sub__, Network.__matmul__]:
+                stacked = getattr(Networks, op.__name__)(a, b)
+                single = a._binary_op(op, b, Networks)
+                self.assertSequenceEqual([nw.name for nw in stacked.nws], [nw.name for nw in single.nws])
+                self.assertSequenceEqual([nw.nw.comments for nw in stacked.nws], [nw.nw.comments for nw in single.nws])
+                for nw_stacked, nw_single in zip(stacked.nws, single.nws):
+                    self.assertArrayAlmostEqual(nw_stacked.nw.s, nw_single.nw.s)
+                    self.assertSequenceEqual([str(p) for p in nw_stacked.nw.ports], [str(p) for p in nw_single.nw.ports])
+            
+            # the stack is not kept, so changes of the networks are taken into account
+            a.nws, b.nws = a.nws[1:], b.nws[1:]
+            a.nws[0].nw.s = a.nws[0].nw.s * 0.5
+            stacked, single = a + b, a._binary_op(Network.__add__, b, Networks)
+            self.assertEqual(len(stacked.nws), 2)
+            self.assertArrayAlmostEqual(stacked.nws[0].nw.s, single.nws[0].nw.s)
+        
+        a = self.get_dummy_networks(3, 2)
+        for method in [Networks.passivity, Networks.reciprocity, Networks.losslessness, Networks.symmetry, Networks.causality, Networks.quality, Networks.k, Networks.mu]:
+            stacked = method(a)
+            single = a._unary_op(getattr(Network, method.__name__), SParams)
+            self.assertSequenceEqual([sp.name for sp in stacked.sps], [sp.name for sp in single.sps])
+            for sp_stacked, sp_single in zip(stacked.sps, single.sps):
+                self.assertArrayAlmostEqual(sp_stacked.s, sp_single.s)
+        
+        other = self.get_dummy_sparam_file(2)
+        other._nw = other._nw.interpolate(np.linspace(1e9, 2e9, 11))
+        self.assertIsNone(Networks([*a.nws, other])._stack())  # different frequencies
+
+
+    def test_interpolation(self):
+        nw = self.get_dummy_sparam_file(3).nw
+        f_new = np.linspace(0, 12e9, 777)
+        
+        interpolated = Network._get_interpolated_sparams(nw, f_new)
+        for ep in range(3):
+            for ip in range(3):
+                mag, pha = np.abs(nw.s[:,ep,ip]), np.unwrap(np.angle(nw.s[:,ep,ip]))
+                self.assertArrayAlmostEqual(interpolated.s[:,ep,ip], np.interp(f_new, nw.f, mag) * np.exp(1j*np.interp(f_new, nw.f, pha)))
+        
+        f_coarse = np.linspace(1e9, 5e9, 51)
+        sps = Networks([Network(nw, 'fine'), Network(Network._get_interpolated_sparams(nw, f_coarse), 'coarse')]).s(2,1)
+        f_adapted, [_, s_coarse] = SParam._adapt(*sps.sps)
+        self.assertTrue(np.all((f_adapted >= 1e9) & (f_adapted <= 5e9)))
+        self.assertArrayAlmostEqual(s_coarse, np.interp(f_adapted, f_coarse, sps.sps[1].s.real) + 1j*np.interp(f_adapted, f_coarse, sps.sps[1].s.imag))
+        
+        interpolated = sps._interpolate(f_new)
+        self.assertEqual(len(interpolated.sps), 2)
+        self.assertArrayAlmostEqual(interpolated.sps[0].s, Network._get_interpolated_sparams(nw, f_new).s[:,1,0])
+
+
+    def test_statistics_on_different_grids(self):
+        nw = self.get_dummy_sparam_file(2).nw
+        grids = [nw.f, np.linspace(1e9, 5e9, 51), np.linspace(1e9, 5e9, 51), np.geomspace(1e8, 8e9, 120)]
+        sps = SParams(sps=[SParam(f'p{i}', f, Network._get_interpolated_sparams(nw, f).s[:,1,0], 50) for i,f in enumerate(grids)])
+        
+        f_start, f_end, n = sps._fill_interpolation_params()
+        f = np.linspace(f_start, f_end, n)
+        reference = np.stack([np.interp(f, sp.f, np.abs(sp.s)) * np.exp(1j*np.interp(f, sp.f, np.unwrap(np.angle(sp.s)))) for sp in sps.sps])
+        self.assertArrayAlmostEqual(sps.mean(in_db=False).sps[0].s, np.mean(reference, axis=0))
+        self.assertArrayAlmostEqual(sps.max(in_db=False).sps[0].s, np.max(np.abs(reference), axis=0))
+        self.assertArrayAlmostEqual(sps.sdev(in_db=False).sps[0].s, np.std(reference, axis=0, ddof=1))
+        self.assertArrayAlmostEqual(sps.mean(in_db=False).sps[0].f, f)
+        
+        self.assertEqual(len(SParams(sps=sps.sps[:1]).sdev().sps), 0)  # needs two parameters
+
+
+    def test_statistics_on_real_and_complex_parameters(self):
+        f = np.linspace(1e9, 2e9, 5)
+        negative_real = SParam('a', f, -np.linspace(1, 2.6, 5), 50)
+        complex_ = SParam('c', f, np.full(5, 0.5+0j), 50)
+        real = SParam('b', f, np.linspace(-3, 3, 5), 50)
+        
+        # the magnitudes of all parameters are compared, whether they are real or complex
+        self.assertArrayAlmostEqual(SParams(sps=[negative_real, complex_]).max(in_db=False).sps[0].s, np.linspace(1, 2.6, 5))
+        self.assertArrayAlmostEqual(SParams(sps=[negative_real, complex_]).min(in_db=False).sps[0].s, np.full(5, 0.5))
+        self.assertArrayAlmostEqual(SParams(sps=[negative_real, real]).min(in_db=False).sps[0].s, np.minimum(np.linspace(1, 2.6, 5), np.abs(np.linspace(-3, 3, 5))))
+        self.assertArrayAlmostEqual(SParams(sps=[negative_real, real]).pkpk(in_db=False).sps[0].s, np.abs(np.linspace(1, 2.6, 5) - np.abs(np.linspace(-3, 3, 5))))
+
+
+    def test_passivity_enforcement(self):
+        nws = self.get_dummy_networks(3, 3)
+        nws.nws[1].nw.s = nws.nws[1].nw.s * np.linspace(0.5, 1.5, len(nws.nws[1].nw.f))[:,np.newaxis,np.newaxis]  # active at high frequencies
+        
+        s = nws.nws[1].nw.s
+        eigenvalues = np.real(np.linalg.eigvals(np.eye(3) - np.matmul(np.conjugate(np.swapaxes(s, -1, -2)), s)))
+        self.assertArrayAlmostEqual(QualityMetrics.passivity(s), np.max(np.maximum(0, -eigenvalues), axis=-1))
+        self.assertGreater(np.max(nws.nws[1].passivity().s), 0.1)
+        
+        enforced = nws.nws[1].enforce_passivity(margin=0.01)
+        self.assertArrayAlmostEqual(enforced.passivity().s, np.zeros(len(s)))
+        self.assertTrue(np.all(np.linalg.svd(enforced.nw.s, compute_uv=False) <= 0.99 + 1e-9))
+        passive = np.max(np.linalg.svd(s, compute_uv=False), axis=-1) <= 0.99
+        self.assertTrue(np.any(passive))
+        self.assertArrayAlmostEqual(enforced.nw.s[passive], s[passive])  # passive frequencies are not modified
+        
+        stacked = nws.enforce_passivity(margin=0.01)
+        single = nws._unary_op(Network.enforce_passivity, Networks, margin=0.01)
+        self.assertSequenceEqual([nw.name for nw in stacked.nws], [nw.name for nw in single.nws])
+        for nw_stacked, nw_single in zip(stacked.nws, single.nws):
+            self.assertArrayAlmostEqual(nw_stacked.nw.s, nw_single.nw.s)
+        self.assertArrayAlmostEqual(np.concatenate([sp.s for sp in stacked.passivity().sps]), np.zeros(3*len(s)))
+
+
+    def test_quality_metrics(self):
+        nw = self.get_dummy_sparam_file(3).nw
+        s = nw.s
+        
+        reciprocity = np.max(np.abs(np.transpose(s, (0,2,1)) - s), axis=(1,2))
+        diagonal_spread = np.max([np.abs(s[:,i,i]-s[:,j,j]) for i in range(3) for j in range(3)], axis=0)
+        self.assertArrayAlmostEqual(QualityMetrics.symmetry(s), reciprocity + diagonal_spread)
+        self.assertArrayAlmostEqual(QualityMetrics.losslessness(s), np.max(np.abs(np.matmul(np.transpose(s, (0,2,1)), np.conjugate(s)) - np.eye(3)), axis=(1,2)))
+        
+        metrics = QualityMetrics.calculate(s)
+        self.assertSequenceEqual(list(metrics.keys()), QualityMetrics.METRICS)
+        for name,values in metrics.items():
+            self.assertArrayAlmostEqual(values, getattr(QualityMetrics, name)(s))
+        self.assertNotIn('reciprocity', QualityMetrics.calculate(s[:,:1,:1]))
+        
+        f = np.linspace(1e6, 10e9, 1001)
+        delay = np.exp(-2j*np.pi*f*0.5e-9) / (1 + 1j*f/5e9)
+        causal = np.array([[0.1*delay, delay], [delay, 0.1*delay]]).transpose(2,0,1)
+        non_causal = np.conjugate(causal)  # rotates counter-clockwise
+        self.assertAlmostEqual(float(np.max(QualityMetrics.causality(causal))), 0)
+        self.assertGreater(QualityMetrics.summarize({'causality': QualityMetrics.causality(non_causal)})['causality'], 0.9)
+        noise = 1e-4 * np.random.default_rng(0).normal(size=causal.shape)
+        self.assertLess(QualityMetrics.summarize({'causality': QualityMetrics.causality(causal + noise)})['causality'], 0.05)  # noise turns more than the network, but is ignored
+        
+        sps = Network(NetworkExt(s=causal, f=f, f_unit='Hz', z0=50), 'line').quality()
+        self.assertSequenceEqual([sp.name for sp in sps], ['line Passivity', 'line Reciprocity', 'line Symmetry', 'line Losslessness', 'line Causality'])
+
+
+    def test_frequency_index(self):
+        f = np.array([1e9, 2e9, 3e9, 4e9])
+        index = FrequencyIndex.get(f)
+        self.assertIs(FrequencyIndex.get(f), index)
+        self.assertEqual(index.range(1.5e9, 3e9), slice(1, 3))
+        self.assertEqual(index.range(None, 0.5e9), slice(0, 0))
+        self.assertEqual(index.range(4.5e9, 1e9), slice(4, 4))
+        self.assertSequenceEqual([index.nearest(x) for x in [0, 1.4e9, 1.5e9, 1.6e9, 9e9]], [0, 0, 0, 1, 3])
+        unsorted = FrequencyIndex(np.array([3e9, 1e9, 2e9]))
+        self.assertSequenceEqual(list(unsorted.range(1.5e9, None)), [0, 2])
+        self.assertEqual(unsorted.nearest(1.2e9), 1)
+        
+        nw = Network(self.get_dummy_sparam_file(2).nw, 'dummy')
+        cropped = nw.crop_f(1e9, 2e9)
+        in_range = (nw.nw.f >= 1e9) & (nw.nw.f <= 2e9)
+        self.assertArrayAlmostEqual(cropped.nw.f, nw.nw.f[in_range])
+        self.assertArrayAlmostEqual(cropped.nw.s, nw.nw.s[in_range])
+        self.assertArrayAlmostEqual(nw.at_f(1.01e9).nw.s[0], nw.nw.s[np.argmin(np.abs(nw.nw.f - 1.01e9))])
+        self.assertArrayAlmostEqual(nw.at_f(1.01e9).nw.z0, [[50, 50]])
+        with self.assertRaises(Exception):
+            nw.crop_f(20e9, None)
+        
+        sp = nw.s(2, 1)[0]
+        cropped = sp.crop_f(1e9, 2e9)
+        self.assertArrayAlmostEqual(cropped.s, sp.s[in_range])
+        self.assertFalse(np.shares_memory(cropped.s, sp.s))
+        self.assertArrayAlmostEqual(sp.norm(1.01e9).s, sp.s / sp.s[np.argmin(np.abs(sp.f - 1.01e9))])
+
+
+    def test_elementwise_chain(self):
+        nw = Network(self.get_dummy_sparam_file(2).nw, 'dummy')
+        s21 = nw.nw.s[:,1,0]
+        chained = nw.s(2, 1)[0].db().norm(1e9, method='sub') + 3
+        self.assertIsNone(chained._s)  # not calculated until it is needed
+        db = 20*np.log10(np.abs(s21))
+        self.assertArrayAlmostEqual(chained.s, db - db[np.argmin(np.abs(nw.nw.f - 1e9))] + 3)
+        
+        block_size = SParam.BLOCK_SIZE
+        try:
+            SParam.BLOCK_SIZE = 7  # several blocks, the last one incomplete
+            self.assertArrayAlmostEqual(nw.s(2, 1)[0].phase().vswr().s, (1+np.abs(np.angle(s21)))/(1-np.abs(np.angle(s21))))
+        finally:
+            SParam.BLOCK_SIZE = block_size
+        
+        sp = nw.s(2, 1)[0]
+        sp.s[0] = 0
+        self.assertNotEqual(nw.nw.s[0,1,0], 0)  # the parameter is a copy
+        
+        f = np.linspace(1e9, 2e9, 11)
+        component = Components.CShunt(1e-12).nws[0]
+        postponed = component.shunt()
+        self.assertIsInstance(postponed, PostponedNetwork)
+        self.assertFalse(postponed._ready())
+        postponed._calculate(f, 50)
+        component._calculate(f, 50)
+        self.assertArrayAlmostEqual(postponed.nw.s, Network._series_to_shunt(component.nw.s))
+        self.assertEqual(postponed.name, f'{component.name} Shunt')
+
+
+    def test_common_subexpressions(self):
+        plotted = []
+        parser = ExpressionParser(self.get_dummy_sparam_files(2, 2), [], [], None, lambda *args: plotted.append(args), None, None)
+        parser.eval('nws().reciprocity().plot()\nnws().reciprocity().plot()\n(nws() ** Comp.Thru()).s(2,1).plot()\n(nws() ** Comp.Thru()).s(2,1).plot()')
+        self.assertFalse(Subexpressions.active())
+        self.assertEqual(len(plotted), 8)
+        self.assertIs(plotted[0][1], plotted[2][1])  # calculated once
+        self.assertIsNot(plotted[4][1], plotted[6][1])  # parametric networks are calculated every time
+        self.assertArrayAlmostEqual(plotted[4][1], plotted[6][1])
+
+
+    def test_shared_results_are_read_only(self):
+        plotted = []
+        parser = ExpressionParser(self.get_dummy_sparam_files(2, 2), [], [], None, lambda *args: plotted.append(args), None, None)
+        parser.eval('nws().s(2,1).plot()')
+        reference = plotted[0][1].copy()
+        with self.assertRaisesRegex(ValueError, 'read-only'):
+            parser.eval('nws().s(2,1).sps[0].s[0] = 0')
+        with self.assertRaisesRegex(ValueError, 'read-only'):
+            parser.eval('nws().s(2,1).map(lambda s: s.__imul__(2)).plot()')  # the callback gets the shared array
+        with self.assertRaisesRegex(ValueError, 'read-only'):
+            parser.eval('nws().s(2,1).sps[0].f[0] = 0')
+        plotted.clear()
+        parser.eval('nws().s(2,1).plot()')
+        self.assertArrayAlmostEqual(plotted[0][1], reference)
+
+
+    def test_loaded_networks_stay_writeable_after_evaluation(self):
+        files = self.get_dummy_sparam_files(2, 2)
+        parser = ExpressionParser(files, [], [], None, lambda *args: None, None, None)
+        parser.eval('nws().sweep().s(2,1).plot()\nnws().half().s(2,1).plot()')
+        for file in files:
+            self.assertTrue(file.nw.s.flags.writeable)
+        parser.eval('for n in nws().nws: n.nw.s[0,0,0] = 0')
+        for file in files:
+            self.assertEqual(file.nw.s[0,0,0], 0)
+
+
+    def test_parallel_networks_match_sequential_networks(self):
+        a, b = self.get_dummy_networks(6), self.get_dummy_networks(6)  # different numbers of ports, so they cannot be stacked
+        results = []
+        for threads in [1, 4]:
+            Settings.expression_threads = threads
+            self.assertEqual(Networks._get_parallel_workers([(nw,) for nw in a.nws], SParams), threads)
+            with self.assertLogs(level=logging.WARNING) as logs:
+                k = a.k()  # only valid for 2-ports, the others must warn
+            results.append((a.z(), a._binary_op(Network.__sub__, b, Networks), k, logs.output))
+        
+        (z_seq, diff_seq, k_seq, logs_seq), (z_par, diff_par, k_par, logs_par) = results
+        self.assertSequenceEqual([sp.name for sp in z_par.sps], [sp.name for sp in z_seq.sps])
+        for sp_par, sp_seq in zip(z_par.sps, z_seq.sps):
+            self.assertArrayAlmostEqual(sp_par.s, sp_seq.s)
+        self.assertSequenceEqual([nw.name for nw in diff_par.nws], [nw.name for nw in diff_seq.nws])
+        self.assertEqual(len(k_par.sps), 1)
+        self.assertEqual(len(k_seq.sps), 1)
+        self.assertSequenceEqual(logs_par, logs_seq)
+        self.assertEqual(len(logs_par), 5)
+        
+        self.assertEqual(Networks._get_parallel_workers([(nw,) for nw in a.nws], None), 1)  # e.g. plots
+        self.assertEqual(Networks._get_parallel_workers(list(zip(*Networks._broadcast(a, Components.Thru()))), Networks), 1)  # parametric networks
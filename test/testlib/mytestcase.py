@@ -1,7 +1,10 @@
 import unittest
 import pathlib
+import tempfile
+import os
 import numpy as np
 import numbers
+from lib import NetworkCache, Settings
 
 
 
@@ -13,6 +16,31 @@ class MyTestCase(unittest.TestCase):
         super().__init__(methodName)
 
 
+    def setUp(self) -> None:
+        # every test gets its own temporary directory, which also holds the network cache and the settings file; the settings
+        #   are reset to their defaults, so that tests neither depend on nor change the cache or the settings of the user
+        self._temp_dir = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+        NetworkCache.directory = os.path.join(self._temp_dir.name, 'cache')
+        self._user_settings_file = Settings._file
+        self._user_settings = {name: getattr(Settings, name) for name in Settings._defaults.keys()}
+        Settings._file = os.path.join(self._temp_dir.name, 'settings.json')
+        Settings._reset()
+        return super().setUp()
+
+
+    def tearDown(self) -> None:
+        Settings.__dict__.update(self._user_settings)  # without saving
+        Settings._file = self._user_settings_file
+        NetworkCache.directory = None
+        self._temp_dir.cleanup()
+        return super().tearDown()
+
+
+    @property
+    def temp_dir(self) -> str:
+        return self._temp_dir.name
+
+
     @property
     def root_dir(self) -> pathlib.Path:
         path = pathlib.Path('.').absolute()